@@ -3,8 +3,10 @@ from flask_cors import CORS
 from .models import db
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from datetime import timedelta
 import os
 from . import cloudinary_config  # Initialize cloudinary config
+from .utils import auth, metrics, json_provider
 
 def create_app():
     app = Flask(__name__)
@@ -13,12 +15,43 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///skoolmate.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY', 'super-secret-key')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.getenv('ACCESS_TOKEN_MINUTES', 15)))
+    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.getenv('REFRESH_TOKEN_DAYS', 30)))
+    app.config['TOKEN_VERSION_TTL'] = float(os.getenv('TOKEN_VERSION_TTL', 5))  # seconds a role change may take to reach other workers
+    app.config['TOKEN_REVOCATION_TTL'] = float(os.getenv('TOKEN_REVOCATION_TTL', 5))  # likewise for a logout
+    app.config['STATS_CACHE_TTL'] = float(os.getenv('STATS_CACHE_TTL', 5))
+    app.config['BACKUP_DIR'] = os.getenv('BACKUP_DIR')  # defaults to <instance>/backups
+    app.config['BACKUP_KEEP'] = int(os.getenv('BACKUP_KEEP', 7))
+    app.config['METRICS_WINDOW_SECONDS'] = int(os.getenv('METRICS_WINDOW_SECONDS', 300))
+    app.config['JSON_PROVIDER'] = os.getenv('JSON_PROVIDER', 'auto')  # auto, orjson or stdlib
+    # Hash method for new and upgraded passwords; logins rehash older hashes
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # Login password checks run on a bounded pool (0 = inline); excess waiters get a 503
+    app.config['LOGIN_HASH_WORKERS'] = int(os.getenv('LOGIN_HASH_WORKERS', os.cpu_count() or 1))
+    app.config['LOGIN_QUEUE_LIMIT'] = int(os.getenv('LOGIN_QUEUE_LIMIT', 32))
+    app.config['LOGIN_VERIFY_TIMEOUT'] = float(os.getenv('LOGIN_VERIFY_TIMEOUT', 10))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 0)) or None  # default: one per CPU
+    app.config['ONBOARDING_BATCH_SIZE'] = int(os.getenv('ONBOARDING_BATCH_SIZE', 200))  # students per import transaction
+    # Published results: students rendered per transaction and how long the live term is cached
+    app.config['PUBLISH_BATCH_SIZE'] = int(os.getenv('PUBLISH_BATCH_SIZE', 200))
+    app.config['PUBLISHED_TERM_TTL'] = float(os.getenv('PUBLISHED_TERM_TTL', 5))
+    # Acknowledge attendance once journaled and write it in coalesced batches
+    app.config['ATTENDANCE_WRITE_BEHIND'] = os.getenv('ATTENDANCE_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+    app.config['ATTENDANCE_FLUSH_MS'] = int(os.getenv('ATTENDANCE_FLUSH_MS', 250))
+    app.config['ATTENDANCE_JOURNAL'] = os.getenv('ATTENDANCE_JOURNAL')  # defaults to <instance>/attendance.journal
+    # Make relationships outside an endpoint's loader plan raise instead of lazy loading
+    app.config['SQLALCHEMY_RAISELOAD'] = os.getenv('SQLALCHEMY_RAISELOAD', '').lower() in ('1', 'true', 'yes')
+    # Create missing model indexes at startup; off only to run `flask schema dedupe` on an older database
+    app.config['ENSURE_INDEXES'] = os.getenv('ENSURE_INDEXES', '1').lower() in ('1', 'true', 'yes')
 
     # Initialize extensions
+    json_provider.init_app(app)  # orjson when installed; dates serialize as ISO 8601 either way
     db.init_app(app)
     jwt = JWTManager(app)
+    auth.init_app(app, jwt)  # role claims in tokens; stale token versions are rejected
     migrate = Migrate(app, db)
     CORS(app)  # Enable CORS for frontend communication
+    metrics.init_app(app)  # Request latency and uptime for /admin/settings/system-info
 
     # Register blueprints
     from .routes.student_routes import student_bp
@@ -36,6 +69,7 @@ def create_app():
     from .routes.results_routes import results_bp
     from .routes.auth_routes import auth_bp
     from .routes.subject_routes import subject_bp
+    from .routes.analytics_routes import analytics_bp
 
     # Remove duplicate or incorrect blueprint imports
     # 🔥 DELETE this line: from backend.app.routes.teacher_routes import teacher_bp
@@ -58,10 +92,27 @@ def create_app():
     app.register_blueprint(results_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(subject_bp)
+    app.register_blueprint(analytics_bp)
 
 
+    from .utils import stats_snapshot  # registers the snapshot write listeners
+    from .utils import attendance_rollups  # and the attendance rollup listeners
+    from .utils import student_summary  # and the per-student summary listeners
+    from .utils import publishing  # and the published payload invalidation listeners
+    from .utils.schema import ensure_columns, ensure_indexes
+    from .utils import write_behind
+    from .commands import register_commands
+    register_commands(app)
+
     # Create tables if not using Alembic migrations
     with app.app_context():
         db.create_all()
+        ensure_columns()
+        if app.config['ENSURE_INDEXES']:
+            ensure_indexes()  # fails startup if duplicates block a unique index; see `flask schema dedupe`
+        stats_snapshot.ensure_seeded()
+        attendance_rollups.ensure_seeded()
+        student_summary.ensure_seeded()
+    write_behind.init_app(app)  # replays journaled attendance left by a crash
    
     return app
@@ -0,0 +1,122 @@
+import click
+from flask.cli import AppGroup
+from .models import db, ResultsPublication
+from .utils import attendance_rollups, auth, publishing, schema, stats_snapshot, student_summary
+from .utils.attendance_sessions import migrate_from_attendance
+
+stats_cli = AppGroup('stats', help='Maintain the materialized statistics snapshot.')
+
+
+@stats_cli.command('rebuild')
+def rebuild_stats():
+    """Recompute every snapshot and rollup table from the fact tables."""
+    stats_snapshot.rebuild()
+    attendance_rollups.rebuild()
+    student_summary.rebuild()
+    db.session.commit()
+    click.echo('Statistics snapshot rebuilt.')
+
+
+@stats_cli.command('check')
+def check_stats():
+    """Compare the snapshot against a fresh aggregate."""
+    mismatches = stats_snapshot.check() + attendance_rollups.check() + student_summary.check()
+    db.session.rollback()
+    if not mismatches:
+        click.echo('Statistics snapshot is consistent.')
+        return
+    for m in mismatches:
+        click.echo(f"{m['table']}[{m['key']}].{m['column']}: expected {m['expected']}, found {m['actual']}")
+    raise SystemExit(1)
+
+
+@stats_cli.command('reconcile')
+def reconcile_stats():
+    """Recompute the student summaries that drifted from the fact tables."""
+    fixed = student_summary.reconcile()
+    db.session.commit()
+    click.echo(f"Reconciled {len(fixed)} student summaries.")
+
+
+attendance_cli = AppGroup('attendance', help='Attendance storage maintenance.')
+
+
+@attendance_cli.command('migrate-sessions')
+@click.option('--period', default=1, show_default=True, help='Lesson period assigned to migrated sessions.')
+def migrate_sessions(period):
+    """Fold per-student attendance rows into per-lesson sessions."""
+    stats = migrate_from_attendance(period)
+    click.echo(
+        f"Read {stats['rows_read']} attendance rows; migrated {stats['rows_migrated']} "
+        f"into {stats['sessions_written']} sessions."
+    )
+    if stats['unmapped']:
+        click.echo(f"{stats['unmapped']} rows skipped: no subject of that teacher has the student enrolled.")
+    if stats['unknown_status']:
+        click.echo(f"{stats['unknown_status']} rows skipped: status not in the session status set.")
+
+
+schema_cli = AppGroup('schema', help='Database schema maintenance.')
+
+
+@schema_cli.command('dedupe')
+@click.option('--apply', is_flag=True, help='Remove the duplicates and create the indexes; otherwise only report.')
+def dedupe(apply):
+    """Report, or with --apply remove, rows that block a missing unique index.
+
+    The newest row of each key is kept (the oldest exam, which receives the
+    results of the others). Rows with a NULL key column are left alone.
+    """
+    found = schema.deduplicate(apply=apply)
+    for index, rows in found.items():
+        click.echo(f"{index}: {rows} duplicate rows {'removed' if apply else 'would be removed'}.")
+    if not found:
+        click.echo('No duplicates block a missing unique index.')
+    if not apply:
+        return
+    if found:
+        # The aggregates counted the removed rows
+        stats_snapshot.rebuild()
+        attendance_rollups.rebuild()
+        student_summary.rebuild()
+        db.session.commit()
+    created = schema.ensure_indexes()
+    click.echo(f"Created {len(created)} indexes.")
+
+
+tokens_cli = AppGroup('tokens', help='Token revocation maintenance.')
+
+
+@tokens_cli.command('prune')
+def prune_tokens():
+    """Delete revocations of tokens that have since expired."""
+    removed = auth.prune_revoked()
+    db.session.commit()
+    click.echo(f"Pruned {removed} expired revocations.")
+
+
+results_cli = AppGroup('results', help='Results publishing.')
+
+
+@results_cli.command('publish')
+@click.argument('term')
+def publish_results(term):
+    """Render every student's portal payloads for TERM in the foreground."""
+    publication = ResultsPublication(term=term, status='rendering')
+    db.session.add(publication)
+    db.session.commit()
+    publication_id = publication.id
+    try:
+        publication = publishing.publish(publication_id)
+    except Exception as e:
+        publishing.mark_failed(publication_id, e)
+        raise click.ClickException(f"Publishing {term} failed: {e}")
+    click.echo(f"Published {publication.term}: {publication.rendered} of {publication.students} students rendered.")
+
+
+def register_commands(app):
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(attendance_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(results_cli)
@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import struct
 
 db = SQLAlchemy()
 
+def _wants(include, relation):
+    # ``include`` of None keeps the full nested representation
+    return include is None or relation in include
+
 # --- User Model ---
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,6 +15,8 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True)
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # admin, teacher, student
+    # Bumped when the claims in this user's tokens change; older tokens are rejected
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     student = db.relationship('Student', backref='user', uselist=False)
     teacher = db.relationship('Teacher', backref='user', uselist=False)
@@ -30,7 +37,7 @@ class Student(db.Model):
     gender = db.Column(db.String(10))
     date_of_birth = db.Column(db.Date)
     parent_contact = db.Column(db.String(20))
-    classroom_id = db.Column(db.Integer, db.ForeignKey('classroom.id'))
+    classroom_id = db.Column(db.Integer, db.ForeignKey('classroom.id'), index=True)
     image_url = db.Column(db.String(255), nullable=True)
 
     results = db.relationship('Result', backref='student', lazy=True)
@@ -41,19 +48,22 @@ class Student(db.Model):
     dorm_assignment = db.relationship('DormAssignment', backref='student', uselist=False)
     enrollments = db.relationship('Enrollment', backref='student', lazy=True)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "user_id": self.user_id,
             "full_name": self.full_name,
             "gender": self.gender,
-            "date_of_birth": self.date_of_birth.isoformat() if self.date_of_birth else None,
+            "date_of_birth": self.date_of_birth,
             "parent_contact": self.parent_contact,
             "classroom_id": self.classroom_id,
-            "image_url": self.image_url,
-            "user": self.user.to_dict() if self.user else None,
-            "classroom": self.classroom.to_dict() if self.classroom else None
+            "image_url": self.image_url
         }
+        if _wants(include, "user"):
+            data["user"] = self.user.to_dict() if self.user else None
+        if _wants(include, "classroom"):
+            data["classroom"] = self.classroom.to_dict() if self.classroom else None
+        return data
 
 # --- Teacher Model ---
 class Teacher(db.Model):
@@ -69,16 +79,19 @@ class Teacher(db.Model):
     appointments = db.relationship('Appointment', backref='teacher', lazy=True)
     attendance_records = db.relationship('Attendance', backref='teacher', lazy=True)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "user_id": self.user_id,
             "full_name": self.full_name,
             "image_url": self.image_url,
-            "department_id": self.department_id,
-            "user": self.user.to_dict() if self.user else None,
-            "department": self.department.to_dict() if self.department else None
+            "department_id": self.department_id
         }
+        if _wants(include, "user"):
+            data["user"] = self.user.to_dict() if self.user else None
+        if _wants(include, "department"):
+            data["department"] = self.department.to_dict() if self.department else None
+        return data
 
 # --- Classroom Model ---
 class Classroom(db.Model):
@@ -122,80 +135,106 @@ class Subject(db.Model):
     department_id = db.Column(db.Integer, db.ForeignKey('department.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "name": self.name,
             "teacher_id": self.teacher_id,
             "classroom_id": self.classroom_id,
             "department_id": self.department_id,
-            "teacher": self.teacher.to_dict() if self.teacher else None,
-            "department": self.department.to_dict() if self.department else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
+        if _wants(include, "teacher"):
+            data["teacher"] = self.teacher.to_dict() if self.teacher else None
+        if _wants(include, "department"):
+            data["department"] = self.department.to_dict() if self.department else None
+        return data
 
 # --- Exam Model ---
 class Exam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
-    date = db.Column(db.DateTime, default=datetime.utcnow)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'))
+    date = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # recency ordering
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), index=True)
     
     subject = db.relationship('Subject', backref='exams')
     results = db.relationship('Result', backref='exam', lazy=True)
 
-    def to_dict(self):
-        return {
+    # Exams are found or created by name within a subject
+    __table_args__ = (
+        db.Index('uq_exam_subject_name', 'subject_id', 'name', unique=True),
+    )
+
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "name": self.name,
-            "date": self.date.isoformat() if self.date else None,
-            "subject_id": self.subject_id,
-            "subject": self.subject.to_dict() if self.subject else None
+            "date": self.date,
+            "subject_id": self.subject_id
         }
+        if _wants(include, "subject"):
+            data["subject"] = self.subject.to_dict() if self.subject else None
+        return data
 
 # --- Result Model ---
 class Result(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'))
-    exam_id = db.Column(db.Integer, db.ForeignKey('exam.id'))
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), index=True)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exam.id'), index=True)
     report_id = db.Column(db.Integer, db.ForeignKey('report.id'))  # <-- Add this line
     score = db.Column(db.Float)
 
-    def to_dict(self):
-        return {
+    # One score per student per exam; gradebook imports upsert against it
+    __table_args__ = (
+        db.Index('uq_result_student_exam', 'student_id', 'exam_id', unique=True),
+    )
+
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "student_id": self.student_id,
             "exam_id": self.exam_id,
             "report_id": self.report_id,
-            "score": self.score,
-            "exam": self.exam.to_dict() if self.exam else None,
-            "student": self.student.to_dict() if self.student else None
+            "score": self.score
         }
+        if _wants(include, "exam"):
+            data["exam"] = self.exam.to_dict() if self.exam else None
+        if _wants(include, "student"):
+            data["student"] = self.student.to_dict() if self.student else None
+        return data
 
 
 # --- Attendance Model ---
 class Attendance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'))
-    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'))
-    date = db.Column(db.Date, nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), index=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
     status = db.Column(db.String(10))
 
-    def to_dict(self):
-        return {
+    # One mark per student, teacher and day; bulk registers upsert against it
+    __table_args__ = (
+        db.Index('uq_attendance_student_teacher_date', 'student_id', 'teacher_id', 'date', unique=True),
+    )
+
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "student_id": self.student_id,
             "teacher_id": self.teacher_id,
-            "date": self.date.isoformat() if self.date else None,
-            "status": self.status,
-            "student": self.student.to_dict() if self.student else None,
-            "teacher": self.teacher.to_dict() if self.teacher else None
+            "date": self.date,
+            "status": self.status
         }
+        if _wants(include, "student"):
+            data["student"] = self.student.to_dict() if self.student else None
+        if _wants(include, "teacher"):
+            data["teacher"] = self.teacher.to_dict() if self.teacher else None
+        return data
 
 # --- Fee Model ---
 class Fee(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'))
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), index=True)
     term = db.Column(db.String(50), nullable=False)
     amount_due = db.Column(db.Float, nullable=False)
     amount_paid = db.Column(db.Float, default=0.0)
@@ -210,7 +249,7 @@ class Fee(db.Model):
             "term": self.term,
             "amount_due": self.amount_due,
             "amount_paid": self.amount_paid,
-            "due_date": self.due_date.isoformat() if self.due_date else None,
+            "due_date": self.due_date,
             "is_paid": self.is_paid,
             "report_id": self.report_id
         }
@@ -231,7 +270,7 @@ class MpesaPayment(db.Model):
             "amount": self.amount,
             "transaction_id": self.transaction_id,
             "phone_number": self.phone_number,
-            "timestamp": self.timestamp.isoformat() if self.timestamp else None
+            "timestamp": self.timestamp
         }
 
 # --- Report Model ---
@@ -247,17 +286,22 @@ class Report(db.Model):
     results = db.relationship("Result", backref="report", lazy=True)
     fee_statement = db.relationship("Fee", backref="report", uselist=False)
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
-            "student": self.student.to_dict(),
+            "student_id": self.student_id,
             "term": self.term,
             "year": self.year,
-            "created_at": self.created_at.isoformat(),
-            "results": [r.to_dict() for r in self.results],
-            "fee_statement": self.fee_statement.to_dict() if self.fee_statement else None,
+            "created_at": self.created_at,
             "image_url": self.image_url
         }
+        if _wants(include, "student"):
+            data["student"] = self.student.to_dict()
+        if _wants(include, "results"):
+            data["results"] = [r.to_dict() for r in self.results]
+        if _wants(include, "fee_statement"):
+            data["fee_statement"] = self.fee_statement.to_dict() if self.fee_statement else None
+        return data
 
 # --- Book Model ---
 class Book(db.Model):
@@ -295,8 +339,8 @@ class BorrowRecord(db.Model):
             "id": self.id,
             "student_id": self.student_id,
             "book_id": self.book_id,
-            "borrowed_on": self.borrowed_on.isoformat(),
-            "returned_on": self.returned_on.isoformat() if self.returned_on else None,
+            "borrowed_on": self.borrowed_on,
+            "returned_on": self.returned_on,
             "fine": self.fine
         }
 
@@ -329,8 +373,8 @@ class DormAssignment(db.Model):
             "id": self.id,
             "student_id": self.student_id,
             "dorm_id": self.dorm_id,
-            "assigned_on": self.assigned_on.isoformat(),
-            "left_on": self.left_on.isoformat() if self.left_on else None
+            "assigned_on": self.assigned_on,
+            "left_on": self.left_on
         }
 
 # --- Department, Course, Enrollment ---
@@ -367,21 +411,24 @@ class Course(db.Model):
 
 class Enrollment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False, index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     subject = db.relationship('Subject', backref='enrollments')
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include=None):
+        data = {
             "id": self.id,
             "student_id": self.student_id,
             "subject_id": self.subject_id,
-            "created_at": getattr(self, 'created_at', None).isoformat() if getattr(self, 'created_at', None) else None,
-            "student": self.student.to_dict() if self.student else None,
-            "subject": self.subject.to_dict() if self.subject else None
+            "created_at": getattr(self, 'created_at', None)
         }
+        if _wants(include, "student"):
+            data["student"] = self.student.to_dict() if self.student else None
+        if _wants(include, "subject"):
+            data["subject"] = self.subject.to_dict() if self.subject else None
+        return data
 
 class FeePayment(db.Model):
     __tablename__ = 'fee_payments'
@@ -402,5 +449,286 @@ class FeePayment(db.Model):
             'payment_method': self.payment_method,
             'reference_number': self.reference_number,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at
+        }
+
+
+# --- Attendance Session Model ---
+# One row per lesson. The roster is the subject's students in enrollment order,
+# packed as little-endian uint32s; statuses holds one byte per roster slot.
+SESSION_STATUSES = (None, 'present', 'absent', 'late', 'excused')  # index = stored code
+SESSION_STATUS_CODES = {status: code for code, status in enumerate(SESSION_STATUSES) if status}
+
+class AttendanceSession(db.Model):
+    __tablename__ = 'attendance_session'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False, index=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('teacher.id'), index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    period = db.Column(db.Integer, nullable=False, default=1)
+    roster = db.Column(db.LargeBinary, nullable=False, default=b'')
+    statuses = db.Column(db.LargeBinary, nullable=False, default=b'')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('uq_attendance_session_lesson', 'subject_id', 'date', 'period', unique=True),
+    )
+
+    @property
+    def student_ids(self):
+        roster = self.roster or b''
+        return list(struct.unpack(f'<{len(roster) // 4}I', roster))
+
+    def records(self):
+        """Expand to ``{student_id: status}``; unmarked students map to None."""
+        return {student_id: SESSION_STATUSES[code]
+                for student_id, code in zip(self.student_ids, self.statuses or b'')}
+
+    def set_records(self, student_ids, statuses):
+        """Pack ``student_ids`` (roster order) and their ``{student_id: status}`` marks."""
+        self.roster = struct.pack(f'<{len(student_ids)}I', *student_ids)
+        self.statuses = bytes(SESSION_STATUS_CODES.get(statuses.get(student_id), 0)
+                              for student_id in student_ids)
+
+    def to_dict(self, expand=False):
+        counts = {status: 0 for status in SESSION_STATUS_CODES}
+        for code in self.statuses or b'':
+            if code:
+                counts[SESSION_STATUSES[code]] += 1
+        data = {
+            "id": self.id,
+            "subject_id": self.subject_id,
+            "teacher_id": self.teacher_id,
+            "date": self.date,
+            "period": self.period,
+            "student_count": len(self.statuses or b''),
+            "counts": counts,
+            "updated_at": self.updated_at
+        }
+        if expand:
+            data["records"] = [{"student_id": student_id, "status": status}
+                               for student_id, status in self.records().items()]
+        return data
+
+
+# --- Statistics Snapshot ---
+# Running aggregates kept current by utils/stats_snapshot.py so dashboards can
+# read a handful of rows instead of scanning the fact tables.
+class DepartmentResultStats(db.Model):
+    __tablename__ = 'stats_department_results'
+
+    department_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "department_id": self.department_id,
+            "score_sum": self.score_sum,
+            "score_count": self.score_count,
+            "average_score": (self.score_sum / self.score_count) if self.score_count else 0
+        }
+
+class TeacherAttendanceStats(db.Model):
+    __tablename__ = 'stats_teacher_attendance'
+
+    teacher_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "teacher_id": self.teacher_id,
+            "present_count": self.present_count,
+            "total_count": self.total_count
+        }
+
+class ClassroomAttendanceStats(db.Model):
+    __tablename__ = 'stats_classroom_attendance'
+
+    classroom_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "classroom_id": self.classroom_id,
+            "present_count": self.present_count,
+            "total_count": self.total_count
+        }
+
+class SchoolStats(db.Model):
+    __tablename__ = 'stats_school_totals'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # always 1
+    fees_due = db.Column(db.Float, nullable=False, default=0.0)
+    fees_paid = db.Column(db.Float, nullable=False, default=0.0)
+    unpaid_fees = db.Column(db.Integer, nullable=False, default=0)
+    payments_completed = db.Column(db.Float, nullable=False, default=0.0)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    attendance_total = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "fees_due": self.fees_due,
+            "fees_paid": self.fees_paid,
+            "unpaid_fees": self.unpaid_fees,
+            "payments_completed": self.payments_completed,
+            "attendance_present": self.attendance_present,
+            "attendance_total": self.attendance_total
+        }
+
+
+# --- Attendance Rollups ---
+# Status counts per classroom and day and per student and month, kept current
+# by utils/attendance_rollups.py; ``month`` is stored as YYYYMM.
+class ClassroomAttendanceDaily(db.Model):
+    __tablename__ = 'rollup_classroom_attendance_daily'
+
+    classroom_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date = db.Column(db.Date, primary_key=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "classroom_id": self.classroom_id,
+            "date": self.date,
+            "present_count": self.present_count,
+            "absent_count": self.absent_count,
+            "late_count": self.late_count,
+            "total_count": self.total_count
+        }
+
+class StudentAttendanceMonthly(db.Model):
+    __tablename__ = 'rollup_student_attendance_monthly'
+
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    month = db.Column(db.Integer, primary_key=True, autoincrement=False)  # YYYYMM
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "student_id": self.student_id,
+            "month": self.month,
+            "present_count": self.present_count,
+            "absent_count": self.absent_count,
+            "late_count": self.late_count,
+            "total_count": self.total_count
+        }
+
+# --- Student Summary ---
+# Running totals per student, kept current by utils/student_summary.py so the
+# student portal reads its headline figures by primary key. ``fees_paid`` is
+# what was recorded against Fee rows and ``payments_completed`` what was paid
+# through the portal; both count towards ``outstanding``. ``data_version``
+# increases with every change to the student's portal data; published
+# payloads (utils/publishing.py) are only served while it still matches.
+class StudentSummary(db.Model):
+    __tablename__ = 'student_summary'
+
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    attendance_total = db.Column(db.Integer, nullable=False, default=0)
+    fees_due = db.Column(db.Float, nullable=False, default=0.0)
+    fees_paid = db.Column(db.Float, nullable=False, default=0.0)
+    unpaid_fees = db.Column(db.Integer, nullable=False, default=0)
+    payments_completed = db.Column(db.Float, nullable=False, default=0.0)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.score_count if self.score_count else 0.0
+
+    @property
+    def total_paid(self):
+        return (self.fees_paid or 0.0) + (self.payments_completed or 0.0)
+
+    @property
+    def outstanding(self):
+        return (self.fees_due or 0.0) - self.total_paid
+
+    def to_dict(self):
+        return {
+            "student_id": self.student_id,
+            "score_sum": self.score_sum,
+            "score_count": self.score_count,
+            "attendance_present": self.attendance_present,
+            "attendance_total": self.attendance_total,
+            "fees_due": self.fees_due,
+            "fees_paid": self.fees_paid,
+            "unpaid_fees": self.unpaid_fees,
+            "payments_completed": self.payments_completed,
+            "outstanding": self.outstanding,
+            "data_version": self.data_version
+        }
+
+# --- Results publishing ---
+# Publishing a term pre-renders each student's portal payloads in the
+# background (utils/publishing.py). A payload is stored with the student's
+# data version it was rendered from and the SHA-256 of its bytes, which is
+# served as the ETag.
+class ResultsPublication(db.Model):
+    __tablename__ = 'results_publication'
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='rendering')  # rendering, published, failed
+    students = db.Column(db.Integer, nullable=False, default=0)
+    rendered = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "term": self.term,
+            "status": self.status,
+            "students": self.students,
+            "rendered": self.rendered,
+            "error": self.error,
+            "created_at": self.created_at,
+            "published_at": self.published_at
+        }
+
+class PublishedPayload(db.Model):
+    __tablename__ = 'published_payload'
+
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    term = db.Column(db.String(50), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # results, reports, dashboard
+    data_version = db.Column(db.Integer, nullable=False)
+    etag = db.Column(db.String(64), nullable=False)
+    body = db.Column(db.LargeBinary, nullable=False)
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# --- Token revocation ---
+# Persisted so logouts survive restarts; utils/auth.py mirrors the live rows in
+# memory. Rows can be pruned once ``expires_at`` has passed.
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    token_type = db.Column(db.String(10), nullable=False)  # access, refresh
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # UTC
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "jti": self.jti,
+            "token_type": self.token_type,
+            "user_id": self.user_id,
+            "expires_at": self.expires_at,
+            "revoked_at": self.revoked_at
         }
@@ -1,12 +1,17 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required
 from sqlalchemy import case
 from ..models import (
     User, Student, Teacher, Subject, Department, 
     Enrollment, Fee, Attendance, Result, Report,
-    Appointment, db
+    FeePayment, ResultsPublication, db
 )
+from ..utils.auth import current_principal
 from ..utils.decorators import admin_required
+from ..utils import analytics, backup, columnar, dashboard_stats, export, metrics, onboarding, passwords, publishing
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import USER_FILTERS, RESULT_FILTERS, DORM_ASSIGNMENT_FILTERS
 from datetime import datetime
 
 admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
@@ -15,48 +20,26 @@ admin_bp = Blueprint('admin_bp', __name__, url_prefix='/admin')
 @jwt_required()
 @admin_required
 def admin_dashboard():
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
+    stats = dashboard_stats.get_statistics()
     
-    # Get comprehensive statistics
-    stats = {
-        "total_students": Student.query.count(),
-        "total_teachers": Teacher.query.count(),
-        "total_subjects": Subject.query.count(),
-        "total_departments": Department.query.count(),
-        "pending_appointments": Appointment.query.count(),
-        "unpaid_fees": Fee.query.filter_by(is_paid=False).count()
-    }
-    
-    # Calculate financial metrics
-    total_fees_due = db.session.query(func.sum(Fee.amount_due)).scalar() or 0
-    total_fees_paid = db.session.query(func.sum(Fee.amount_paid)).scalar() or 0
-    
-    # Calculate attendance rate
-    total_attendance = Attendance.query.count()
-    present_count = Attendance.query.filter_by(status='present').count()
-    attendance_rate = (present_count / total_attendance * 100) if total_attendance > 0 else 0
-    
-    # Get recent enrollments (last 30 days)
-    thirty_days_ago = datetime.now() - timedelta(days=30)
-    recent_enrollments = Enrollment.query.filter(
-        Enrollment.created_at >= thirty_days_ago
-    ).count() if hasattr(Enrollment, 'created_at') else 0
-    
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = db.session.get(User, current_principal().user_id)
     
     return jsonify({
         "message": f"Welcome Admin {user.username}!",
-        "statistics": stats,
+        "statistics": {
+            key: stats[key] for key in (
+                "total_students", "total_teachers", "total_subjects",
+                "total_departments", "pending_appointments", "unpaid_fees"
+            )
+        },
         "financial": {
-            "total_revenue": float(total_fees_paid),
-            "outstanding_fees": float(total_fees_due - total_fees_paid),
-            "collection_rate": (total_fees_paid / total_fees_due * 100) if total_fees_due > 0 else 0
+            "total_revenue": stats["total_fees_paid"],
+            "outstanding_fees": stats["total_fees_due"] - stats["total_fees_paid"],
+            "collection_rate": dashboard_stats.collection_rate(stats)
         },
         "performance": {
-            "attendance_rate": round(attendance_rate, 1),
-            "recent_enrollments": recent_enrollments
+            "attendance_rate": round(analytics.attendance_rate(stats["present_count"], stats["total_attendance"]), 1),
+            "recent_enrollments": stats["recent_enrollments"]
         }
     })
 
@@ -65,8 +48,8 @@ def admin_dashboard():
 @jwt_required()
 @admin_required
 def get_all_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    query, serialize = prepare(apply_filters(User.query, USER_FILTERS), User)
+    return paginate(query, User.id, serialize)
 
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
 @jwt_required()
@@ -175,13 +158,12 @@ def create_subject():
 @jwt_required()
 @admin_required
 def fee_overview():
-    total_fees = Fee.query.with_entities(db.func.sum(Fee.amount_due)).scalar() or 0
-    paid_fees = Fee.query.with_entities(db.func.sum(Fee.amount_paid)).scalar() or 0
+    stats = dashboard_stats.get_statistics()
     
     return jsonify({
-        "total_fees_due": float(total_fees),
-        "total_fees_paid": float(paid_fees),
-        "collection_rate": (paid_fees / total_fees * 100) if total_fees > 0 else 0
+        "total_fees_due": stats["total_fees_due"],
+        "total_fees_paid": stats["total_fees_paid"],
+        "collection_rate": dashboard_stats.collection_rate(stats)
     })
 
 # Reports and Analytics
@@ -189,63 +171,25 @@ def fee_overview():
 @jwt_required()
 @admin_required
 def performance_analytics():
-    # Get attendance statistics
-    total_attendance = Attendance.query.count()
-    present_count = Attendance.query.filter_by(status='present').count()
+    stats = dashboard_stats.get_statistics()
     
     return jsonify({
-        "attendance_rate": (present_count / total_attendance * 100) if total_attendance > 0 else 0,
-        "total_records": total_attendance
+        "attendance_rate": analytics.attendance_rate(stats["present_count"], stats["total_attendance"]),
+        "total_records": stats["total_attendance"]
     })
 
 @admin_bp.route('/analytics', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_analytics():
-    from sqlalchemy import func
-    from ..models import Exam
-    
-    # Grade distribution analysis
-    results = Result.query.all()
-    grade_distribution = {
-        'A': len([r for r in results if r.score >= 80]),
-        'B': len([r for r in results if 70 <= r.score < 80]),
-        'C': len([r for r in results if 60 <= r.score < 70]),
-        'D': len([r for r in results if 50 <= r.score < 60]),
-        'F': len([r for r in results if r.score < 50])
-    }
-    
-    # Department performance
-    departments = Department.query.all()
-    dept_performance = []
-    for dept in departments:
-        dept_subjects = Subject.query.filter_by(department_id=dept.id).all()
-        if dept_subjects:
-            # Calculate average performance for department
-            dept_results = []
-            for subject in dept_subjects:
-                exams = Exam.query.filter_by(subject_id=subject.id).all()
-                for exam in exams:
-                    exam_results = Result.query.filter_by(exam_id=exam.id).all()
-                    dept_results.extend([r.score for r in exam_results])
-            
-            avg_score = sum(dept_results) / len(dept_results) if dept_results else 0
-            dept_performance.append({
-                'name': dept.name,
-                'average_score': round(avg_score, 1),
-                'total_students': len(set([r.student_id for r in Result.query.join(Exam).filter(Exam.subject_id.in_([s.id for s in dept_subjects])).all()]))
-            })
-    
-    # Attendance statistics
-    total_attendance = Attendance.query.count()
-    present_count = Attendance.query.filter_by(status='present').count()
-    attendance_rate = (present_count / total_attendance * 100) if total_attendance > 0 else 0
+    grade_distribution, total_results = analytics.grade_distribution()
+    present_count, total_attendance = analytics.attendance_totals()
     
     return jsonify({
         'grade_distribution': grade_distribution,
-        'department_performance': dept_performance,
-        'attendance_rate': round(attendance_rate, 1),
-        'total_results': len(results)
+        'department_performance': analytics.department_performance(),
+        'attendance_rate': round(analytics.attendance_rate(present_count, total_attendance), 1),
+        'total_results': total_results
     })
 
 # System Settings
@@ -315,8 +259,7 @@ def update_settings():
                 return jsonify({"error": "School name is required"}), 400
         
         # Log the settings update
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = db.session.get(User, current_principal().user_id)
         print(f"Settings updated by admin: {user.username}")
         
         return jsonify({
@@ -332,47 +275,55 @@ def update_settings():
 @admin_required
 def create_backup():
     try:
-        # In a real application, create actual backup
-        backup_info = {
-            "backup_id": f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "created_at": datetime.now().isoformat(),
-            "size": "2.5 MB",
-            "tables_included": ["users", "students", "teachers", "subjects", "results", "attendance"],
-            "status": "completed"
-        }
+        job, started = backup.start_backup()
+        if not started:
+            return jsonify({"error": "A backup is already in progress", "backup": job}), 409
         
         return jsonify({
-            "message": "Backup created successfully",
-            "backup": backup_info
-        })
+            "message": "Backup started",
+            "backup": job
+        }), 202
         
     except Exception as e:
         return jsonify({"error": f"Failed to create backup: {str(e)}"}), 500
 
+@admin_bp.route('/settings/backup/<string:backup_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_backup_status(backup_id):
+    job = backup.get_backup(backup_id) if backup_id.startswith('backup_') else None
+    if job is None:
+        return jsonify({"error": "Backup not found"}), 404
+    return jsonify(job)
+
+@admin_bp.route('/settings/backups', methods=['GET'])
+@jwt_required()
+@admin_required
+def list_backups():
+    return jsonify(backup.list_backups())
+
 @admin_bp.route('/settings/system-info', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_system_info():
     try:
-        # Get system information
+        stats = dashboard_stats.get_statistics()
+        runtime = metrics.system_snapshot()
+        
         system_info = {
             "version": "1.0.0",
             "database": {
-                "type": "SQLite",
-                "size": "15.2 MB",
-                "last_backup": "2024-01-15 10:30:00"
+                **runtime["database"],
+                "last_backup": backup.last_backup() or "Never"
             },
             "statistics": {
-                "total_users": User.query.count(),
-                "total_students": Student.query.count(),
-                "total_teachers": Teacher.query.count(),
-                "total_subjects": Subject.query.count()
+                key: stats[key] for key in (
+                    "total_users", "total_students", "total_teachers", "total_subjects"
+                )
             },
-            "server": {
-                "uptime": "5 days, 12 hours",
-                "memory_usage": "45%",
-                "disk_space": "78% used"
-            }
+            "server": runtime["server"],
+            "requests": runtime["requests"],
+            "login_pool": passwords.pool_snapshot()
         }
         
         return jsonify(system_info)
@@ -412,8 +363,8 @@ def create_dorm():
 @admin_required
 def get_dorm_assignments():
     from ..models import DormAssignment
-    assignments = DormAssignment.query.all()
-    return jsonify([assignment.to_dict() for assignment in assignments])
+    query, serialize = prepare(apply_filters(DormAssignment.query, DORM_ASSIGNMENT_FILTERS), DormAssignment)
+    return paginate(query, DormAssignment.id, serialize)
 
 @admin_bp.route('/dorm-assignments', methods=['POST'])
 @jwt_required()
@@ -438,14 +389,89 @@ def assign_student_to_dorm():
         db.session.rollback()
         return jsonify({"error": "Failed to assign student"}), 500
 
+# Student onboarding
+@admin_bp.route('/students/import', methods=['POST'])
+@jwt_required()
+@admin_required
+def import_students():
+    """Create student accounts in bulk from a CSV or XLSX intake list.
+
+    The response is NDJSON: one ``error`` line per rejected row, a
+    ``progress`` line per committed batch and a final ``done`` summary.
+    """
+    upload = request.files.get('file')
+    try:
+        if upload is not None and upload.filename.lower().endswith('.xlsx'):
+            rows = onboarding.parse_xlsx(upload.read())
+        elif upload is not None:
+            rows = onboarding.parse_csv(upload.read().decode('utf-8-sig'))
+        elif request.mimetype == 'text/csv':
+            rows = onboarding.parse_csv(request.get_data(as_text=True))
+        else:
+            return jsonify({"error": "Upload a CSV or XLSX file as 'file' or a text/csv body"}), 400
+    except UnicodeDecodeError:
+        return jsonify({"error": "CSV must be UTF-8"}), 400
+    except onboarding.OnboardingError as e:
+        return jsonify({"error": str(e)}), 400
+
+    batch_size = current_app.config.get('ONBOARDING_BATCH_SIZE', onboarding.DEFAULT_BATCH_SIZE)
+
+    def report():
+        try:
+            for event in onboarding.import_students(rows, batch_size):
+                yield current_app.json.dumps(event) + '\n'
+        except Exception as e:
+            db.session.rollback()
+            yield current_app.json.dumps({"event": "failed", "error": f"Import stopped: {str(e)}"}) + '\n'
+
+    return Response(stream_with_context(report()), mimetype='application/x-ndjson')
+
 # Results Management
 @admin_bp.route('/results', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_all_results():
-    from ..models import Result
-    results = Result.query.all()
-    return jsonify([result.to_dict() for result in results])
+    query = apply_filters(Result.query, RESULT_FILTERS)
+    encoding = columnar.requested_encoding()
+    if encoding:
+        return columnar.respond(export.CATALOG['results'](), Result.id, encoding, query)
+    query, serialize = prepare(query, Result, normalizable=True)
+    return paginate(query, Result.id, serialize)
+
+@admin_bp.route('/results/publish', methods=['POST'])
+@jwt_required()
+@admin_required
+def publish_results():
+    """Pre-render every student's results, reports and dashboard for a term."""
+    data = request.get_json(silent=True) or {}
+    term = str(data.get('term') or '').strip()
+    if not term:
+        return jsonify({"error": "term is required"}), 400
+    if len(term) > 50:
+        return jsonify({"error": "term must be at most 50 characters"}), 400
+    
+    try:
+        publication, started = publishing.start_publication(term)
+        if not started:
+            return jsonify({"error": "Results are already being published", "publication": publication.to_dict()}), 409
+        
+        return jsonify({
+            "message": f"Publishing results for {term}",
+            "publication": publication.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Failed to publish results: {str(e)}"}), 500
+
+@admin_bp.route('/results/publish/<int:publication_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_publication_status(publication_id):
+    publication = db.session.get(ResultsPublication, publication_id)
+    if publication is None:
+        return jsonify({"error": "Publication not found"}), 404
+    return jsonify(publication.to_dict())
 
 # Export Data
 @admin_bp.route('/export/<string:model_name>', methods=['GET'])
@@ -456,12 +482,35 @@ def export_data(model_name):
         'students': Student,
         'teachers': Teacher,
         'results': Result,
-        'fees': Fee
-        
+        'fees': Fee,
+        'attendance': Attendance,
+        'enrollments': Enrollment,
+        'payments': FeePayment
     }
     
     if model_name not in models:
         return jsonify({"error": "Invalid model name"}), 400
-        
-    records = models[model_name].query.all()
-    return jsonify([record.to_dict() for record in records])
\ No newline at end of file
+    
+    fmt = request.args.get('format')
+    if fmt is None:
+        records = models[model_name].query.all()
+        return jsonify([record.to_dict() for record in records])
+    
+    # Columnar mode: one list per column, read from Core rows
+    if fmt in columnar.ENCODINGS:
+        return columnar.respond(export.CATALOG[model_name](), models[model_name].id, fmt)
+    
+    # Streaming mode: flat rows through a server-side cursor, constant memory
+    if fmt not in export.FORMATS:
+        formats = list(export.FORMATS) + list(columnar.ENCODINGS)
+        return jsonify({"error": f"Unsupported format, use one of: {', '.join(formats)}"}), 400
+    
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', export.DEFAULT_BATCH_SIZE)
+    filename = f"{model_name}.{fmt}" + (".gz" if compress else "")
+    
+    return Response(
+        stream_with_context(export.stream_export(model_name, fmt, compress, batch_size)),
+        mimetype='application/gzip' if compress else export.FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from ..models import Classroom
+from ..utils import attendance_rollups
+from ..utils.pagination import parse_date
+
+analytics_bp = Blueprint('analytics_bp', __name__, url_prefix='/analytics')
+
+HEATMAP_DEFAULT_DAYS = 365
+HEATMAP_MAX_DAYS = 731
+
+@analytics_bp.route('/attendance/heatmap', methods=['GET'])
+@jwt_required()
+def attendance_heatmap():
+    """Dense date x classroom attendance matrix read from the daily rollup."""
+    try:
+        end = parse_date(request.args['to']) if request.args.get('to') else date.today()
+        start = parse_date(request.args['from']) if request.args.get('from') else \
+            end - timedelta(days=HEATMAP_DEFAULT_DAYS - 1)
+        classroom_id = int(request.args['classroom_id']) if request.args.get('classroom_id') else None
+    except ValueError:
+        return jsonify({"error": "from/to must be YYYY-MM-DD and classroom_id an integer"}), 400
+
+    days = (end - start).days + 1
+    if days < 1:
+        return jsonify({"error": "'from' must not be after 'to'"}), 400
+    if days > HEATMAP_MAX_DAYS:
+        return jsonify({"error": f"Range is limited to {HEATMAP_MAX_DAYS} days"}), 400
+
+    classrooms = Classroom.query.order_by(Classroom.id)
+    if classroom_id is not None:
+        classrooms = classrooms.filter(Classroom.id == classroom_id)
+    classrooms = classrooms.all()
+    if classroom_id is not None and not classrooms:
+        return jsonify({"error": "Classroom not found"}), 404
+
+    column = {c.id: i for i, c in enumerate(classrooms)}
+    rates = [[None] * len(classrooms) for _ in range(days)]
+    totals = [[0] * len(classrooms) for _ in range(days)]
+    for row in attendance_rollups.classroom_daily(list(column), start, end):
+        if not row.total_count:
+            continue
+        i, j = (row.date - start).days, column[row.classroom_id]
+        rates[i][j] = round(row.present_count / row.total_count * 100, 1)
+        totals[i][j] = row.total_count
+
+    return jsonify({
+        "from": start,
+        "to": end,
+        "dates": [start + timedelta(days=i) for i in range(days)],
+        "classrooms": [{"id": c.id, "name": c.name} for c in classrooms],
+        "attendance_rate": rates,  # rows follow "dates", columns follow "classrooms"; null = no records
+        "total_records": totals
+    })
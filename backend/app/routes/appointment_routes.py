@@ -1,11 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from flask_jwt_extended import jwt_required
 from ..models import Appointment
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import APPOINTMENT_FILTERS
 
 appointment_bp = Blueprint('appointment_bp', __name__)
 
 @appointment_bp.route('/appointments', methods=['GET'])
 @jwt_required()
 def get_appointments():
-    appointments = Appointment.query.all()
-    return jsonify([app.to_dict() for app in appointments])
\ No newline at end of file
+    query, serialize = prepare(apply_filters(Appointment.query, APPOINTMENT_FILTERS), Appointment)
+    return paginate(query, Appointment.id, serialize)
\ No newline at end of file
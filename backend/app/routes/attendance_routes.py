@@ -1,11 +1,73 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
-from ..models import Attendance
+from ..models import AttendanceSession, Subject, db
+from ..utils.pagination import apply_filters, paginate, parse_bool, parse_date
+from ..utils.filters import ATTENDANCE_SESSION_FILTERS
+from ..utils.auth import current_principal
+from ..utils.attendance_sessions import find_session, record_session
 
 attendance_bp = Blueprint('attendance_bp', __name__)
 
-@attendance_bp.route('/attendance', methods=['GET'])
+# Attendance sessions: one row per lesson with packed per-student statuses
+@attendance_bp.route('/attendance/sessions', methods=['GET'])
 @jwt_required()
-def get_attendance():
-    attendance = Attendance.query.all()
-    return jsonify([att.to_dict() for att in attendance])
\ No newline at end of file
+def get_attendance_sessions():
+    expand = parse_bool(request.args.get('expand', ''))
+    query = apply_filters(AttendanceSession.query, ATTENDANCE_SESSION_FILTERS)
+    return paginate(query, AttendanceSession.id, lambda session: session.to_dict(expand=expand))
+
+@attendance_bp.route('/attendance/sessions/<int:session_id>', methods=['GET'])
+@jwt_required()
+def get_attendance_session(session_id):
+    session = db.session.get(AttendanceSession, session_id)
+    if not session:
+        return jsonify({"error": "Attendance session not found"}), 404
+    return jsonify(session.to_dict(expand=True))
+
+@attendance_bp.route('/subjects/<int:subject_id>/attendance', methods=['GET'])
+@jwt_required()
+def get_lesson_attendance(subject_id):
+    try:
+        date = parse_date(request.args['date'])
+        period = int(request.args.get('period', 1))
+    except (KeyError, ValueError):
+        return jsonify({"error": "date (YYYY-MM-DD) is required; period must be an integer"}), 400
+
+    session = find_session(subject_id, date, period)
+    if not session:
+        return jsonify({"error": "No attendance recorded for this lesson"}), 404
+    return jsonify(session.to_dict(expand=True))
+
+@attendance_bp.route('/attendance/sessions', methods=['POST'])
+@jwt_required()
+def save_attendance_session():
+    data = request.get_json()
+    teacher_id = current_principal().teacher_id
+
+    if not teacher_id:
+        return jsonify({"error": "Teacher not found"}), 404
+
+    try:
+        subject_id = int(data['subject_id'])
+        date = parse_date(data['date'])
+        period = int(data.get('period', 1))
+        statuses = data['attendance']
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "subject_id, date (YYYY-MM-DD) and attendance are required"}), 400
+
+    subject = db.session.get(Subject, subject_id)
+    if not subject:
+        return jsonify({"error": "Subject not found"}), 404
+    if subject.teacher_id != teacher_id:
+        return jsonify({"error": "You do not teach this subject"}), 403
+
+    try:
+        session = record_session(subject_id, teacher_id, date, statuses, period)
+        db.session.commit()
+        return jsonify(session.to_dict(expand=True)), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Failed to save attendance session"}), 500
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import decode_token, get_jwt, jwt_required
+from sqlalchemy.exc import IntegrityError
 from ..models import User, db
+from ..utils.auth import issue_tokens, revoke
+from ..utils import passwords
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -28,7 +30,7 @@ def register():
     if User.query.filter((User.email == email) | (User.username == username)).first():
         return jsonify({"error": "User with that email or username already exists"}), 409
 
-    hashed_password = generate_password_hash(password)
+    hashed_password = passwords.hash_password(password)
 
     new_user = User(
         username=username,
@@ -56,8 +58,70 @@ def login():
 
     user = User.query.filter_by(email=email).first()
 
-    if user and check_password_hash(user.password, password):
-        access_token = create_access_token(identity=user.id)
-        return jsonify(access_token=access_token, user=user.to_dict()), 200
+    verified = False
+    if user is not None:
+        # Hand the connection back while the hash is checked on the bounded
+        # verification pool, so waiting logins cannot drain the connection pool
+        db.session.close()
+        try:
+            verified = passwords.verify_password(user, password)
+        except passwords.Overloaded:
+            return jsonify({"error": "Too many sign-ins in progress, please retry shortly"}), 503, {"Retry-After": "1"}
+        db.session.add(user)
+
+    if verified:
+        db.session.commit()  # keeps a hash upgraded to the configured method
+        # Role and profile ids travel in the token so requests skip identity lookups
+        return jsonify(**issue_tokens(user), user=user.to_dict()), 200
 
     return jsonify({"error": "Invalid credentials"}), 401
+
+# --------- Refresh Route ----------
+@auth_bp.route('/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    claims = get_jwt()
+    user = db.session.get(User, int(claims['sub']))
+    if not user:
+        return jsonify({"error": "User not found"}), 401
+
+    # Rotate: the presented refresh token cannot be used again. A reuse that
+    # beat the revocation cache (or hit another worker) fails the unique jti
+    try:
+        revoke(claims)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Token is no longer valid, refresh it or log in again"}), 401
+    # Claims are read afresh, so role changes take effect here
+    return jsonify(**issue_tokens(user)), 200
+
+# --------- Logout Route ----------
+@auth_bp.route('/auth/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    claims = get_jwt()
+
+    # Optionally revoke the session's refresh token along with the access token
+    refresh_claims = None
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        try:
+            refresh_claims = decode_token(refresh_token)
+        except Exception:
+            db.session.rollback()
+            return jsonify({"error": "Invalid refresh token"}), 400
+        if refresh_claims.get('sub') != claims['sub']:
+            db.session.rollback()
+            return jsonify({"error": "Refresh token belongs to another user"}), 400
+
+    # A concurrent logout with the same token fails the unique jti
+    try:
+        revoke(claims)
+        if refresh_claims is not None:
+            revoke(refresh_claims)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Token is no longer valid, refresh it or log in again"}), 401
+    return jsonify({"message": "Logged out"}), 200
@@ -1,14 +1,17 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 from ..models import Enrollment, db
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import ENROLLMENT_FILTERS
 
 enrollment_bp = Blueprint('enrollment_bp', __name__)
 
 @enrollment_bp.route('/enrollments', methods=['GET'])
 @jwt_required()
 def get_enrollments():
-    enrollments = Enrollment.query.all()
-    return jsonify([enrollment.to_dict() for enrollment in enrollments])
+    query, serialize = prepare(apply_filters(Enrollment.query, ENROLLMENT_FILTERS), Enrollment)
+    return paginate(query, Enrollment.id, serialize)
 
 @enrollment_bp.route('/enrollments', methods=['POST'])
 @jwt_required()
@@ -1,57 +1,27 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models import db, Student, Fee, FeePayment
+from flask_jwt_extended import jwt_required
+from ..models import db, Fee, FeePayment
 from datetime import datetime, timedelta
+from ..utils.auth import current_principal
 
 fee_bp = Blueprint('fee_bp', __name__)
 
-@fee_bp.route('/student/fees', methods=['GET'])
-@jwt_required()
-def get_student_fees():
-    current_user = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user['id']).first()
-    
-    if not student:
-        return jsonify({'error': 'Student not found'}), 404
-    
-    # Get all fees for student
-    fees = Fee.query.filter_by(student_id=student.id).all()
-    
-    # Get payment history
-    payments = FeePayment.query.filter_by(student_id=student.id).order_by(FeePayment.created_at.desc()).all()
-    
-    # Calculate totals
-    total_fees = sum(fee.amount for fee in fees)
-    total_paid = sum(payment.amount for payment in payments if payment.status == 'completed')
-    outstanding = total_fees - total_paid
-    
-    return jsonify({
-        'fees': [fee.to_dict() for fee in fees],
-        'payments': [payment.to_dict() for payment in payments],
-        'summary': {
-            'total_fees': total_fees,
-            'total_paid': total_paid,
-            'outstanding': outstanding
-        }
-    })
-
 @fee_bp.route('/student/fees/pay', methods=['POST'])
 @jwt_required()
 def process_payment():
-    current_user = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user['id']).first()
+    student_id = current_principal().student_id
     
-    if not student:
+    if not student_id:
         return jsonify({'error': 'Student not found'}), 404
     
     data = request.get_json()
     
     try:
         payment = FeePayment(
-            student_id=student.id,
+            student_id=student_id,
             amount=data['amount'],
             payment_method=data['payment_method'],
-            reference_number=f"PAY{datetime.now().strftime('%Y%m%d%H%M%S')}{student.id}",
+            reference_number=f"PAY{datetime.now().strftime('%Y%m%d%H%M%S')}{student_id}",
             status='completed'  # Mock payment - in real app, integrate with payment gateway
         )
         
@@ -1,11 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from flask_jwt_extended import jwt_required
 from ..models import Fee
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import FEE_FILTERS
 
 fees_bp = Blueprint('fees_bp', __name__)
 
 @fees_bp.route('/fees', methods=['GET'])
 @jwt_required()
 def get_fees():
-    fees = Fee.query.all()
-    return jsonify([fee.to_dict() for fee in fees])
\ No newline at end of file
+    query, serialize = prepare(apply_filters(Fee.query, FEE_FILTERS), Fee)
+    return paginate(query, Fee.id, serialize)
\ No newline at end of file
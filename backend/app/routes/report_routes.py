@@ -1,11 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from flask_jwt_extended import jwt_required
 from ..models import Report
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import REPORT_FILTERS
 
 report_bp = Blueprint('report_bp', __name__)
 
 @report_bp.route('/reports', methods=['GET'])
 @jwt_required()
 def get_reports():
-    reports = Report.query.all()
-    return jsonify([report.to_dict() for report in reports])
\ No newline at end of file
+    query, serialize = prepare(apply_filters(Report.query, REPORT_FILTERS), Report)
+    return paginate(query, Report.id, serialize)
\ No newline at end of file
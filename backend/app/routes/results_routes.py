@@ -1,11 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint
 from flask_jwt_extended import jwt_required
 from ..models import Result
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import RESULT_FILTERS
 
 results_bp = Blueprint('results_bp', __name__)
 
 @results_bp.route('/results', methods=['GET'])
 @jwt_required()
 def get_results():
-    results = Result.query.all()
-    return jsonify([result.to_dict() for result in results])
\ No newline at end of file
+    query, serialize = prepare(apply_filters(Result.query, RESULT_FILTERS), Result)
+    return paginate(query, Result.id, serialize)
\ No newline at end of file
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models import Student, Result, Fee, Report, Attendance, db
+from flask_jwt_extended import jwt_required
+from ..models import Student, Result, Fee, FeePayment, Report, Attendance, db
+from ..utils.pagination import apply_filters, paginate
+from ..utils.serialization import prepare
+from ..utils.filters import STUDENT_FILTERS
+from ..utils.auth import current_principal
+from ..utils import publishing, student_summary
 
 student_bp = Blueprint('student_bp', __name__)
 
@@ -8,8 +13,8 @@ student_bp = Blueprint('student_bp', __name__)
 @student_bp.route('/students', methods=['GET'])
 @jwt_required()
 def get_students():
-    students = Student.query.all()
-    return jsonify([student.to_dict() for student in students])
+    query, serialize = prepare(apply_filters(Student.query, STUDENT_FILTERS), Student)
+    return paginate(query, Student.id, serialize)
 
 # Create student (admin only)
 @student_bp.route('/students', methods=['POST'])
@@ -58,76 +63,77 @@ def create_student():
 @student_bp.route('/student/reports', methods=['GET'])
 @jwt_required()
 def get_my_reports():
-    current_user_id = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user_id).first()
-    if not student:
+    student_id = current_principal().student_id
+    if not student_id:
         return jsonify([])
     
-    reports = Report.query.filter_by(student_id=student.id).all()
-    return jsonify([report.to_dict() for report in reports])
+    published = publishing.serve('reports', student_id)
+    if published is not None:
+        return published
+    
+    query, serialize = prepare(Report.query.filter_by(student_id=student_id).order_by(Report.id), Report)
+    return jsonify([serialize(report) for report in query.all()])
 
 @student_bp.route('/student/fees', methods=['GET'])
 @jwt_required()
 def get_my_fees():
-    current_user_id = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user_id).first()
-    if not student:
-        return jsonify([])
+    student_id = current_principal().student_id
+    if not student_id:
+        return jsonify({"fees": [], "payments": [], "summary": {"total_fees": 0, "total_paid": 0, "outstanding": 0}})
+    
+    fees = Fee.query.filter_by(student_id=student_id).all()
+    payments = FeePayment.query.filter_by(student_id=student_id).order_by(FeePayment.created_at.desc()).all()
     
-    fees = Fee.query.filter_by(student_id=student.id).all()
-    return jsonify([fee.to_dict() for fee in fees])
+    # Totals are kept current on the student's summary row
+    summary = student_summary.summary_of(student_id)
+    
+    return jsonify({
+        "fees": [fee.to_dict() for fee in fees],
+        "payments": [payment.to_dict() for payment in payments],
+        "summary": {
+            "total_fees": summary.fees_due,
+            "total_paid": summary.total_paid,
+            "outstanding": summary.outstanding
+        }
+    })
 
 @student_bp.route('/student/results', methods=['GET'])
 @jwt_required()
 def get_my_results():
-    current_user_id = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user_id).first()
-    if not student:
+    student_id = current_principal().student_id
+    if not student_id:
         return jsonify([])
     
-    results = Result.query.filter_by(student_id=student.id).all()
-    return jsonify([result.to_dict() for result in results])
+    published = publishing.serve('results', student_id)
+    if published is not None:
+        return published
+    
+    query, serialize = prepare(Result.query.filter_by(student_id=student_id).order_by(Result.id), Result)
+    return jsonify([serialize(result) for result in query.all()])
 
 @student_bp.route('/student/attendance', methods=['GET'])
 @jwt_required()
 def get_my_attendance():
     from ..models import Attendance
-    current_user_id = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user_id).first()
-    if not student:
+    student_id = current_principal().student_id
+    if not student_id:
         return jsonify([])
     
-    attendance = Attendance.query.filter_by(student_id=student.id).all()
-    return jsonify([att.to_dict() for att in attendance])
+    query, serialize = prepare(Attendance.query.filter_by(student_id=student_id), Attendance)
+    return jsonify([serialize(att) for att in query.all()])
 
 @student_bp.route('/student/dashboard', methods=['GET'])
 @jwt_required()
 def get_student_dashboard():
-    from ..models import Attendance, Exam
-    from sqlalchemy import func
-    
-    current_user_id = get_jwt_identity()
-    student = Student.query.filter_by(user_id=current_user_id).first()
-    if not student:
+    student_id = current_principal().student_id
+    if not student_id:
         return jsonify({"error": "Student not found"}), 404
     
-    # Calculate GPA
-    results = Result.query.filter_by(student_id=student.id).all()
-    gpa = sum(r.score for r in results) / len(results) if results else 0
-    
-    # Calculate attendance rate
-    total_attendance = Attendance.query.filter_by(student_id=student.id).count()
-    present_count = Attendance.query.filter_by(student_id=student.id, status='present').count()
-    attendance_rate = (present_count / total_attendance * 100) if total_attendance > 0 else 0
-    
-    # Get unpaid fees
-    unpaid_fees = Fee.query.filter_by(student_id=student.id, is_paid=False).count()
+    published = publishing.serve('dashboard', student_id)
+    if published is not None:
+        return published
     
-    return jsonify({
-        "student": student.to_dict(),
-        "gpa": round(gpa, 2),
-        "attendance_rate": round(attendance_rate, 1),
-        "total_subjects": len(set(r.exam.subject_id for r in results if r.exam)),
-        "unpaid_fees": unpaid_fees,
-        "recent_results": [r.to_dict() for r in results[-5:]]  # Last 5 results
-    })
\ No newline at end of file
+    data = publishing.dashboard(student_id)
+    if data is None:
+        return jsonify({"error": "Student not found"}), 404
+    return jsonify(data)
\ No newline at end of file
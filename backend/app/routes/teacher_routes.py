@@ -1,8 +1,15 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models import Teacher, Subject, Student, Enrollment, Result, Attendance, Exam, db
+from flask_jwt_extended import jwt_required
+from ..models import Teacher, Subject, Student, Enrollment, Result, Attendance, Exam, TeacherAttendanceStats, db
 from datetime import datetime
+from ..utils.auth import current_principal
 from ..utils.decorators import teacher_required
+from ..utils.pagination import apply_filters, paginate, parse_date
+from ..utils.serialization import prepare, loader_plan
+from ..utils.filters import TEACHER_FILTERS, ATTENDANCE_FILTERS
+from ..utils.attendance import record_register
+from ..utils.gradebook import GradebookError, import_scores, parse_csv, pivot, resolve_exam
+from ..utils import columnar, export, write_behind
 
 teacher_bp = Blueprint('teacher_bp', __name__)
 
@@ -10,8 +17,8 @@ teacher_bp = Blueprint('teacher_bp', __name__)
 @teacher_bp.route('/teachers', methods=['GET'])
 @jwt_required()
 def get_teachers():
-    teachers = Teacher.query.all()
-    return jsonify([teacher.to_dict() for teacher in teachers])
+    query, serialize = prepare(apply_filters(Teacher.query, TEACHER_FILTERS), Teacher)
+    return paginate(query, Teacher.id, serialize)
 
 # Create teacher (admin only)
 @teacher_bp.route('/teachers', methods=['POST'])
@@ -35,26 +42,25 @@ def create_teacher():
 @teacher_bp.route('/teacher/my-subjects', methods=['GET'])
 @jwt_required()
 def get_my_subjects():
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
+    teacher_id = current_principal().teacher_id
     
-    if not teacher:
-        # If admin, return all subjects
-        subjects = Subject.query.all()
-        return jsonify([subject.to_dict() for subject in subjects])
-    
-    subjects = Subject.query.filter_by(teacher_id=teacher.id).all()
-    return jsonify([subject.to_dict() for subject in subjects])
+    query = Subject.query.options(*loader_plan(Subject))
+    if teacher_id:
+        query = query.filter_by(teacher_id=teacher_id)
+    # Admins (no teacher profile) see all subjects
+    return jsonify([subject.to_dict() for subject in query.all()])
 
 @teacher_bp.route('/teacher/subjects/<int:subject_id>/students', methods=['GET'])
 @jwt_required()
 def get_subject_students(subject_id):
     try:
-        enrollments = Enrollment.query.filter_by(subject_id=subject_id).all()
-        students = []
-        for enrollment in enrollments:
-            if enrollment.student:
-                students.append(enrollment.student.to_dict())
+        students = [
+            student.to_dict() for student in Student.query.options(*loader_plan(Student))
+            .join(Enrollment, Enrollment.student_id == Student.id)
+            .filter(Enrollment.subject_id == subject_id)
+            .order_by(Enrollment.id)
+            .all()
+        ]
         
         print(f"Found {len(students)} students for subject {subject_id}")
         return jsonify(students)
@@ -65,33 +71,34 @@ def get_subject_students(subject_id):
 @teacher_bp.route('/teacher/enrollments', methods=['GET'])
 @jwt_required()
 def get_enrollments():
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
-    
-    if not teacher:
-        # If admin, return all enrollments
-        enrollments = Enrollment.query.all()
-        return jsonify([enrollment.to_dict() for enrollment in enrollments])
-    
-    subjects = Subject.query.filter_by(teacher_id=teacher.id).all()
-    enrollments = []
-    for subject in subjects:
-        subject_enrollments = Enrollment.query.filter_by(subject_id=subject.id).all()
-        enrollments.extend(subject_enrollments)
-    
-    return jsonify([enrollment.to_dict() for enrollment in enrollments])
+    teacher_id = current_principal().teacher_id
+    
+    query = Enrollment.query
+    if teacher_id:
+        taught = db.session.query(Subject.id).filter(Subject.teacher_id == teacher_id)
+        query = query.filter(Enrollment.subject_id.in_(taught))
+    # Admins (no teacher profile) see all enrollments
+    query, serialize = prepare(query, Enrollment, normalizable=True)
+    enrollments = query.order_by(Enrollment.subject_id, Enrollment.id).all()
+    return jsonify(serialize.many(enrollments))
 
 @teacher_bp.route('/teacher/subjects/<int:subject_id>/results', methods=['GET'])
 @jwt_required()
 def get_subject_results(subject_id):
     try:
-        results = Result.query.join(Exam).filter(Exam.subject_id == subject_id).all()
+        query, serialize = prepare(
+            Result.query.join(Exam).filter(Exam.subject_id == subject_id), Result, normalizable=True
+        )
+        results = query.all()
+        if serialize.normalized:
+            return jsonify(serialize.many(results))
+        
         results_data = []
         for result in results:
-            result_dict = result.to_dict()
+            result_dict = serialize(result)
             # Ensure we have exam name for display
-            if result.exam:
-                result_dict['exam_name'] = result.exam.name
+            if result_dict.get('exam'):
+                result_dict['exam_name'] = result_dict['exam']['name']
             results_data.append(result_dict)
         
         print(f"Found {len(results_data)} results for subject {subject_id}")
@@ -100,6 +107,18 @@ def get_subject_results(subject_id):
         print(f"Error fetching results: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@teacher_bp.route('/teacher/subjects/<int:subject_id>/gradebook', methods=['GET'])
+@jwt_required()
+@teacher_required
+def get_subject_gradebook(subject_id):
+    """Compact students x exams matrix; the server-side pivot of the results list above."""
+    subject = db.session.get(Subject, subject_id)
+    if not subject:
+        return jsonify({"error": "Subject not found"}), 404
+    if subject.teacher_id != current_principal().teacher_id:
+        return jsonify({"error": "You do not teach this subject"}), 403
+    return jsonify(pivot(subject_id))
+
 @teacher_bp.route('/results', methods=['POST'])
 @jwt_required()
 def add_result():
@@ -113,20 +132,8 @@ def add_result():
             if field not in data or not data[field]:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        # Create or find exam first
-        exam = Exam.query.filter_by(
-            name=data['exam_name'],
-            subject_id=data['subject_id']
-        ).first()
-        
-        if not exam:
-            exam = Exam(
-                name=data['exam_name'],
-                subject_id=data['subject_id']
-            )
-            db.session.add(exam)
-            db.session.flush()  # Get the exam ID
-            print(f"Created new exam: {exam.name} with ID: {exam.id}")
+        # Find or create the exam; the unique (subject_id, name) index settles races
+        exam, _ = resolve_exam(data['subject_id'], data['exam_name'])
         
         # Check if result already exists for this student and exam
         existing_result = Result.query.filter_by(
@@ -154,6 +161,53 @@ def add_result():
         print(f"Error adding result: {str(e)}")
         return jsonify({"error": f"Failed to add result: {str(e)}"}), 500
 
+@teacher_bp.route('/results/bulk', methods=['POST'])
+@jwt_required()
+def import_results():
+    """Upsert a whole exam's scores from a CSV or JSON gradebook."""
+    teacher_id = current_principal().teacher_id
+    if not teacher_id:
+        return jsonify({"error": "Teacher not found"}), 404
+
+    # CSV as a multipart "file" or a text/csv body (fields in the form or query
+    # string), otherwise JSON {"subject_id", "exam_name", "scores": [...]}
+    upload = request.files.get('file')
+    try:
+        if upload is not None or request.mimetype == 'text/csv':
+            text = upload.read().decode('utf-8-sig') if upload is not None else request.get_data(as_text=True)
+            params = request.form if upload is not None else request.args
+            rows = parse_csv(text)
+        else:
+            params = request.get_json(silent=True) or {}
+            rows = params.get('scores')
+            if not isinstance(rows, list):
+                return jsonify({"error": "scores must be a list of {student_id, score}"}), 400
+        subject_id = int(params.get('subject_id'))
+        exam_name = (params.get('exam_name') or '').strip()
+    except (TypeError, ValueError, UnicodeDecodeError, GradebookError) as e:
+        message = str(e) if isinstance(e, GradebookError) else "subject_id and a UTF-8 gradebook are required"
+        return jsonify({"error": message}), 400
+    if not exam_name:
+        return jsonify({"error": "Missing required field: exam_name"}), 400
+    partial = str(params.get('partial', request.args.get('partial', ''))).lower() in ('1', 'true', 'yes')
+
+    subject = db.session.get(Subject, subject_id)
+    if not subject:
+        return jsonify({"error": "Subject not found"}), 404
+    if subject.teacher_id != teacher_id:
+        return jsonify({"error": "You do not teach this subject"}), 403
+
+    try:
+        report = import_scores(subject, exam_name, rows, partial)
+        if report["errors"] and not partial:
+            db.session.rollback()
+            return jsonify({"error": "Gradebook has invalid rows; nothing was saved", **report}), 422
+        db.session.commit()
+        return jsonify(report), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Failed to import results: {str(e)}"}), 500
+
 @teacher_bp.route('/results/<int:result_id>', methods=['PUT'])
 @jwt_required()
 def update_result(result_id):
@@ -191,89 +245,54 @@ def delete_result(result_id):
 @teacher_bp.route('/teacher/dashboard', methods=['GET'])
 @jwt_required()
 def get_teacher_dashboard():
-    from ..models import Attendance
-    from sqlalchemy import func, desc
-    from datetime import datetime, timedelta
-    
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
-    
+    from sqlalchemy import func, desc, distinct
+    from ..utils import analytics
+
+    teacher_id = current_principal().teacher_id
+    teacher = db.session.get(Teacher, teacher_id, options=loader_plan(Teacher)) if teacher_id else None
+
     if not teacher:
         return jsonify({"error": "Teacher not found"}), 404
-    
-    # Get teacher's subjects
-    subjects = Subject.query.filter_by(teacher_id=teacher.id).all()
-    subject_ids = [s.id for s in subjects]
-    
-    # Get enrollments for teacher's subjects
-    enrollments = Enrollment.query.filter(Enrollment.subject_id.in_(subject_ids)).all()
-    total_students = len(set(e.student_id for e in enrollments))
-    
-    # Calculate attendance stats
-    attendance_records = Attendance.query.filter(
-        Attendance.teacher_id == teacher.id
-    ).all()
-    
-    total_attendance = len(attendance_records)
-    present_count = len([a for a in attendance_records if a.status == 'present'])
-    attendance_rate = (present_count / total_attendance * 100) if total_attendance > 0 else 0
-    
-    # Get recent results through exam relationship
-    recent_results = Result.query.join(Exam).filter(
-        Exam.subject_id.in_(subject_ids)
-    ).order_by(desc(Result.id)).limit(10).all()
-    
-    # Calculate average grades per subject
-    subject_averages = []
-    for subject in subjects:
-        results = Result.query.join(Exam).filter(Exam.subject_id == subject.id).all()
-        if results:
-            avg_score = sum(r.score for r in results) / len(results)
-            subject_averages.append({
-                'subject': subject.name,
-                'average': round(avg_score, 1),
-                'total_students': len(set(r.student_id for r in results))
-            })
-    
-    # Get low attendance students (< 75%)
-    low_attendance_students = []
-    for enrollment in enrollments:
-        student_attendance = Attendance.query.filter_by(
-            student_id=enrollment.student_id,
-            teacher_id=teacher.id
-        ).all()
-        
-        if student_attendance:
-            present = len([a for a in student_attendance if a.status == 'present'])
-            rate = (present / len(student_attendance)) * 100
-            if rate < 75:
-                low_attendance_students.append({
-                    'student': enrollment.student.full_name,
-                    'attendance_rate': round(rate, 1)
-                })
-    
+
+    # Everything below is grouped in SQL; the query count does not grow with subjects or students
+    subject_ids = db.session.query(Subject.id).filter(Subject.teacher_id == teacher.id)
+    enrolled = db.session.query(Enrollment.student_id).filter(Enrollment.subject_id.in_(subject_ids))
+
+    total_subjects, total_students = db.session.query(
+        db.session.query(func.count(Subject.id)).filter(Subject.teacher_id == teacher.id).scalar_subquery(),
+        db.session.query(func.count(distinct(Enrollment.student_id)))
+            .filter(Enrollment.subject_id.in_(subject_ids)).scalar_subquery()
+    ).one()
+
+    # Per-teacher totals come from the statistics snapshot
+    totals = db.session.get(TeacherAttendanceStats, teacher.id)
+    attendance_rate = analytics.attendance_rate(totals.present_count, totals.total_count) if totals else 0
+
+    recent_results = Result.query.options(*loader_plan(Result)) \
+        .join(Exam).filter(Exam.subject_id.in_(subject_ids)) \
+        .order_by(desc(Result.id)).limit(10).all()
+
     return jsonify({
         'teacher': teacher.to_dict(),
-        'total_subjects': len(subjects),
+        'total_subjects': total_subjects,
         'total_students': total_students,
         'attendance_rate': round(attendance_rate, 1),
         'total_results': len(recent_results),
-        'subject_averages': subject_averages,
+        'subject_averages': analytics.subject_averages(teacher.id),
         'recent_results': [r.to_dict() for r in recent_results],
-        'low_attendance_students': low_attendance_students[:5],  # Top 5
+        'low_attendance_students': analytics.low_attendance_students(teacher.id, enrolled),
         'unread_messages': 0  # Placeholder for messaging system
     })
 
 @teacher_bp.route('/teacher/subjects', methods=['GET'])
 @jwt_required()
 def get_teacher_subjects():
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
+    teacher_id = current_principal().teacher_id
     
-    if not teacher:
+    if not teacher_id:
         return jsonify({'subjects': []})
     
-    subjects = Subject.query.filter_by(teacher_id=teacher.id).all()
+    subjects = Subject.query.filter_by(teacher_id=teacher_id).all()
     subjects_data = []
     
     for subject in subjects:
@@ -290,10 +309,9 @@ def get_teacher_subjects():
 @jwt_required()
 def mark_attendance():
     data = request.get_json()
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
+    teacher_id = current_principal().teacher_id
     
-    if not teacher:
+    if not teacher_id:
         return jsonify({"error": "Teacher not found"}), 404
     
     try:
@@ -304,27 +322,15 @@ def mark_attendance():
         # Parse date string to date object
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
         
-        for student_id, status in attendance_data.items():
-            # Check if attendance already exists
-            existing = Attendance.query.filter_by(
-                student_id=int(student_id),
-                teacher_id=teacher.id,
-                date=date_obj
-            ).first()
-            
-            if existing:
-                existing.status = status
-            else:
-                attendance = Attendance(
-                    student_id=int(student_id),
-                    teacher_id=teacher.id,
-                    date=date_obj,
-                    status=status
-                )
-                db.session.add(attendance)
-        
+        if write_behind.enabled():
+            # Acknowledged once journaled; the flusher writes it shortly
+            queued = write_behind.submit(teacher_id, date_obj, attendance_data)
+            return jsonify({"message": "Attendance queued", "queued": queued}), 202
+
+        # One upsert for the whole register
+        counts = record_register(teacher_id, date_obj, attendance_data)
         db.session.commit()
-        return jsonify({"message": "Attendance marked successfully"}), 201
+        return jsonify({"message": "Attendance marked successfully", **counts}), 201
         
     except Exception as e:
         db.session.rollback()
@@ -334,10 +340,9 @@ def mark_attendance():
 @jwt_required()
 def mark_bulk_attendance():
     data = request.get_json()
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
+    teacher_id = current_principal().teacher_id
     
-    if not teacher:
+    if not teacher_id:
         return jsonify({"error": "Teacher not found"}), 404
     
     try:
@@ -348,30 +353,17 @@ def mark_bulk_attendance():
         # Parse date string to date object
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
         
-        # Get all students in the subject
-        enrollments = Enrollment.query.filter_by(subject_id=subject_id).all()
-        
-        for enrollment in enrollments:
-            # Check if attendance already exists for this date
-            existing = Attendance.query.filter_by(
-                student_id=enrollment.student_id,
-                teacher_id=teacher.id,
-                date=date_obj
-            ).first()
-            
-            if existing:
-                existing.status = bulk_status
-            else:
-                attendance = Attendance(
-                    student_id=enrollment.student_id,
-                    teacher_id=teacher.id,
-                    date=date_obj,
-                    status=bulk_status
-                )
-                db.session.add(attendance)
-        
+        # Every student in the subject, written in one upsert
+        enrolled = db.session.query(Enrollment.student_id).filter_by(subject_id=subject_id)
+        student_ids = [student_id for student_id, in enrolled]
+        statuses = {student_id: bulk_status for student_id in student_ids}
+        if write_behind.enabled():
+            queued = write_behind.submit(teacher_id, date_obj, statuses)
+            return jsonify({"message": f"Bulk attendance queued as {bulk_status}", "queued": queued}), 202
+
+        counts = record_register(teacher_id, date_obj, statuses)
         db.session.commit()
-        return jsonify({"message": f"Bulk attendance marked as {bulk_status}"}), 201
+        return jsonify({"message": f"Bulk attendance marked as {bulk_status}", **counts}), 201
         
     except Exception as e:
         db.session.rollback()
@@ -408,29 +400,35 @@ def remove_enrollment(enrollment_id):
 @teacher_bp.route('/attendance', methods=['GET'])
 @jwt_required()
 def get_attendance():
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
-    
-    if not teacher:
+    principal = current_principal()
+    
+    # Admins see every mark; teachers only their own
+    if principal.role == 'admin':
+        query = Attendance.query
+    elif principal.teacher_id:
+        query = Attendance.query.filter_by(teacher_id=principal.teacher_id)
+    else:
         return jsonify({"error": "Teacher not found"}), 404
     
     subject_id = request.args.get('subject_id')
     date = request.args.get('date')
     
-    query = Attendance.query.filter_by(teacher_id=teacher.id)
-    
     if subject_id:
-        # Get students enrolled in the subject
-        enrollments = Enrollment.query.filter_by(subject_id=subject_id).all()
-        student_ids = [e.student_id for e in enrollments]
-        query = query.filter(Attendance.student_id.in_(student_ids))
+        # Restrict to students enrolled in the subject
+        enrolled = db.session.query(Enrollment.student_id).filter(Enrollment.subject_id == subject_id)
+        query = query.filter(Attendance.student_id.in_(enrolled))
     
     if date:
-        date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-        query = query.filter_by(date=date_obj)
+        query = query.filter_by(date=parse_date(date))
+    
+    query = apply_filters(query, ATTENDANCE_FILTERS)
+    encoding = columnar.requested_encoding()
+    if encoding:
+        return columnar.respond(export.CATALOG['attendance'](), Attendance.id, encoding, query)
     
-    attendance_records = query.all()
-    return jsonify([record.to_dict() for record in attendance_records])
+    query, serialize = prepare(query, Attendance)
+    # Buffered write-behind marks show up before they are flushed
+    return paginate(query, Attendance.id, serialize, overlay=write_behind.overlay(query))
 
 @teacher_bp.route('/teachers/<int:teacher_id>', methods=['DELETE'])
 @jwt_required()
@@ -448,13 +446,12 @@ def delete_teacher(teacher_id):
 @teacher_bp.route('/teacher/subject/<int:subject_id>', methods=['GET'])
 @jwt_required()
 def get_subject_overview(subject_id):
-    current_user_id = get_jwt_identity()
-    teacher = Teacher.query.filter_by(user_id=current_user_id).first()
+    teacher_id = current_principal().teacher_id
     
-    if not teacher:
+    if not teacher_id:
         return jsonify({"error": "Teacher not found"}), 404
     
-    subject = Subject.query.filter_by(id=subject_id, teacher_id=teacher.id).first()
+    subject = Subject.query.filter_by(id=subject_id, teacher_id=teacher_id).first()
     if not subject:
         return jsonify({"error": "Subject not found or unauthorized"}), 404
     
@@ -0,0 +1,119 @@
+from sqlalchemy import case, func, distinct, select
+from ..models import db, Department, Subject, Exam, Result, Attendance, Student
+
+# Lower bound (inclusive) of each letter grade; anything below the last band is an F.
+GRADE_BANDS = [('A', 80), ('B', 70), ('C', 60), ('D', 50)]
+
+# Statements issued by get_analytics once the caller is authorized:
+# grade buckets, department rollup and attendance totals. Held by check_query_budget.py.
+ANALYTICS_QUERY_BUDGET = 3
+
+
+def grade_bucket(score):
+    """SQL expression mapping a score column to its letter grade (NULL stays NULL)."""
+    whens = [(score.is_(None), None)]
+    whens += [(score >= lower, grade) for grade, lower in GRADE_BANDS]
+    return case(*whens, else_='F')
+
+
+def grade_distribution():
+    """Return ({'A': n, ..., 'F': n}, total_results) from a single GROUP BY."""
+    bucket = grade_bucket(Result.score).label('grade')
+    rows = db.session.query(bucket, func.count(Result.id)).group_by(bucket).all()
+
+    distribution = {grade: 0 for grade, _ in GRADE_BANDS}
+    distribution['F'] = 0
+    total = 0
+    for grade, count in rows:
+        total += count
+        if grade is not None:
+            distribution[grade] = count
+    return distribution, total
+
+
+def department_performance():
+    """Average score and distinct students per department that has subjects."""
+    rows = db.session.query(
+        Department.name,
+        func.avg(Result.score),
+        func.count(distinct(Result.student_id))
+    ).join(Subject, Subject.department_id == Department.id) \
+     .outerjoin(Exam, Exam.subject_id == Subject.id) \
+     .outerjoin(Result, Result.exam_id == Exam.id) \
+     .group_by(Department.id, Department.name) \
+     .order_by(Department.id) \
+     .all()
+
+    return [{
+        'name': name,
+        'average_score': round(float(avg_score or 0), 1),
+        'total_students': total_students
+    } for name, avg_score, total_students in rows]
+
+
+def attendance_totals(*criteria):
+    """Return (present, total) attendance counts in one round trip."""
+    present, total = db.session.query(
+        func.coalesce(func.sum(case((Attendance.status == 'present', 1), else_=0)), 0),
+        func.count(Attendance.id)
+    ).filter(*criteria).one()
+    return int(present), int(total)
+
+
+def attendance_rate(present, total):
+    return (present / total * 100) if total > 0 else 0
+
+
+def subject_averages(teacher_id):
+    """Average score and distinct students for each of a teacher's subjects that has results."""
+    rows = db.session.query(
+        Subject.name,
+        func.avg(Result.score),
+        func.count(distinct(Result.student_id))
+    ).join(Exam, Exam.subject_id == Subject.id) \
+     .join(Result, Result.exam_id == Exam.id) \
+     .filter(Subject.teacher_id == teacher_id) \
+     .group_by(Subject.id, Subject.name) \
+     .order_by(Subject.id) \
+     .all()
+
+    return [{
+        'subject': name,
+        'average': round(float(avg_score or 0), 1),
+        'total_students': total_students
+    } for name, avg_score, total_students in rows]
+
+
+def subjects_examined(student_id):
+    """Labeled scalar subquery counting the distinct subjects ``student_id`` has results in.
+
+    The rest of a student's dashboard figures come from their StudentSummary row.
+    """
+    return select(func.count(distinct(Exam.subject_id))) \
+        .select_from(Result) \
+        .join(Exam, Result.exam_id == Exam.id) \
+        .where(Result.student_id == student_id) \
+        .scalar_subquery().label('total_subjects')
+
+
+def low_attendance_students(teacher_id, student_ids, threshold=75, limit=5):
+    """Students below ``threshold`` percent present with ``teacher_id``, lowest rate first.
+
+    ``student_ids`` is a subquery of the students to consider.
+    """
+    present = func.sum(case((Attendance.status == 'present', 1), else_=0))
+    rate = (present * 100.0 / func.count(Attendance.id)).label('rate')
+    rows = db.session.query(Student.full_name, rate) \
+        .select_from(Attendance) \
+        .join(Student, Student.id == Attendance.student_id) \
+        .filter(Attendance.teacher_id == teacher_id, Attendance.student_id.in_(student_ids)) \
+        .group_by(Attendance.student_id, Student.full_name) \
+        .having(rate < threshold) \
+        .order_by(rate, Attendance.student_id) \
+        .limit(limit) \
+        .all()
+
+    return [{
+        'student': full_name,
+        'attendance_rate': round(float(student_rate), 1)
+    } for full_name, student_rate in rows]
@@ -0,0 +1,57 @@
+from ..models import db, Attendance
+from . import attendance_rollups, stats_snapshot, student_summary
+from .stats_snapshot import _classrooms_of
+from .upsert import existing_rows, upsert_rows
+
+# Natural key of an attendance mark; backed by a unique index on Attendance
+ATTENDANCE_KEY = ('student_id', 'teacher_id', 'date')
+
+
+def register_rows(teacher_id, date, statuses):
+    """Attendance rows for one register; ``statuses`` maps student_id to status."""
+    rows = [{
+        "student_id": int(student_id),
+        "teacher_id": teacher_id,
+        "date": date,
+        "status": status
+    } for student_id, status in statuses.items()]
+    # Last mark wins if a student appears twice (e.g. "5" and 5)
+    return list({row["student_id"]: row for row in rows}.values())
+
+
+def write_marks(rows):
+    """Upsert attendance ``rows`` (unique on ATTENDANCE_KEY) in one statement.
+
+    Returns ``{"inserted": n, "updated": n}``; the caller commits.
+    """
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+    connection = db.session.connection()
+    table = Attendance.__table__
+    keys = [tuple(row[col] for col in ATTENDANCE_KEY) for row in rows]
+    statuses = existing_rows(connection, table, ATTENDANCE_KEY, keys, ['status'])
+    inserted, updated = upsert_rows(connection, table, ATTENDANCE_KEY, rows, ['status'], existing=statuses)
+
+    # Core writes skip the ORM listeners that keep the snapshot, rollups and
+    # summaries current; patch them with the same marks the listeners would
+    marks = []
+    for row, key in zip(rows, keys):
+        if key in statuses:
+            if statuses[key][0] == row["status"]:
+                continue
+            marks.append((*key, statuses[key][0], -1))
+        marks.append((*key, row["status"], 1))
+    if marks:
+        classrooms = _classrooms_of(connection, (row["student_id"] for row in rows))
+        stats_snapshot.apply_marks(connection, marks, classrooms)
+        attendance_rollups.apply_marks(connection, marks, classrooms)
+        student_summary.apply_marks(connection, marks)
+    return {"inserted": inserted, "updated": updated}
+
+
+def record_register(teacher_id, date, statuses):
+    """Write a whole register in bulk, overwriting existing marks for the day."""
+    return write_marks(register_rows(teacher_id, date, statuses))
+
+
+__all__ = ["ATTENDANCE_KEY", "record_register", "register_rows", "write_marks"]
@@ -0,0 +1,172 @@
+from sqlalchemy import case, delete, event, extract, func, insert, select
+from ..models import db, Attendance, Student, ClassroomAttendanceDaily, StudentAttendanceMonthly
+from .stats_snapshot import _changed, _classrooms_of, _mark, _previous, track
+from .upsert import accumulate, increment_many
+
+_DAILY = ClassroomAttendanceDaily.__table__
+_MONTHLY = StudentAttendanceMonthly.__table__
+
+_COUNTED = ('present', 'absent', 'late')
+
+
+def _count(status):
+    return func.coalesce(func.sum(case((Attendance.status == status, 1), else_=0)), 0)
+
+
+_COUNTS = [_count(status).label(f'{status}_count') for status in _COUNTED] + \
+    [func.count(Attendance.id).label('total_count')]
+_MONTH = (extract('year', Attendance.date) * 100 + extract('month', Attendance.date))
+
+
+track(Student, 'classroom_id')
+
+
+def month_key(day):
+    return day.year * 100 + day.month
+
+
+# --- Fresh aggregates ---
+def _daily_rows(connection, *criteria):
+    stmt = select(Student.classroom_id.label('classroom_id'), Attendance.date.label('date'), *_COUNTS) \
+        .join(Student, Attendance.student_id == Student.id) \
+        .where(Student.classroom_id.isnot(None), *criteria) \
+        .group_by(Student.classroom_id, Attendance.date)
+    return [dict(row) for row in connection.execute(stmt).mappings()]
+
+
+def _monthly_rows(connection, *criteria):
+    month = _MONTH.label('month')
+    stmt = select(Attendance.student_id.label('student_id'), month, *_COUNTS) \
+        .where(Attendance.student_id.isnot(None), *criteria) \
+        .group_by(Attendance.student_id, month)
+    rows = [dict(row) for row in connection.execute(stmt).mappings()]
+    for row in rows:
+        row['month'] = int(row['month'])
+    return rows
+
+
+def _replace(connection, table, where, rows):
+    connection.execute(delete(table).where(*where))
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+# --- Maintenance ---
+def refresh_classrooms(connection, classroom_ids):
+    keys = [k for k in set(classroom_ids) if k is not None]
+    if keys:
+        _replace(connection, _DAILY, [_DAILY.c.classroom_id.in_(keys)],
+                 _daily_rows(connection, Student.classroom_id.in_(keys)))
+
+
+def rebuild(connection=None):
+    """Recompute both rollups from the Attendance table. The caller commits."""
+    connection = connection or db.session.connection()
+    _replace(connection, _DAILY, [], _daily_rows(connection))
+    _replace(connection, _MONTHLY, [], _monthly_rows(connection))
+
+
+def ensure_seeded():
+    """Build the rollups once for databases that predate them."""
+    has_rollups = db.session.query(select(_DAILY).exists()).scalar() or \
+        db.session.query(select(_MONTHLY).exists()).scalar()
+    if not has_rollups and db.session.query(select(Attendance.id).exists()).scalar():
+        rebuild()
+        db.session.commit()
+
+
+def check(connection=None):
+    """Compare the rollups with a fresh aggregate; returns a list of mismatches."""
+    connection = connection or db.session.connection()
+    mismatches = []
+    for table, keys, fresh in (
+        (_DAILY, ('classroom_id', 'date'), _daily_rows(connection)),
+        (_MONTHLY, ('student_id', 'month'), _monthly_rows(connection)),
+    ):
+        expected = {tuple(row[k] for k in keys): row for row in fresh}
+        actual = {tuple(row[k] for k in keys): dict(row)
+                  for row in connection.execute(select(table)).mappings()}
+        for key in sorted(set(expected) | set(actual)):
+            want, have = expected.get(key, {}), actual.get(key, {})
+            for column in ('present_count', 'absent_count', 'late_count', 'total_count'):
+                if int(want.get(column) or 0) != int(have.get(column) or 0):
+                    mismatches.append({
+                        "table": table.name, "key": key, "column": column,
+                        "expected": want.get(column) or 0, "actual": have.get(column) or 0
+                    })
+    return mismatches
+
+
+# --- Reads ---
+def classroom_daily(classroom_ids, start, end):
+    """Rollup rows for ``classroom_ids`` (None for all) between two dates inclusive."""
+    query = ClassroomAttendanceDaily.query.filter(
+        ClassroomAttendanceDaily.date >= start, ClassroomAttendanceDaily.date <= end
+    )
+    if classroom_ids is not None:
+        query = query.filter(ClassroomAttendanceDaily.classroom_id.in_(classroom_ids))
+    return query.all()
+
+
+def student_totals(student_id):
+    """Return (present, total) for a student from the monthly rollup."""
+    present, total = db.session.query(
+        func.coalesce(func.sum(StudentAttendanceMonthly.present_count), 0),
+        func.coalesce(func.sum(StudentAttendanceMonthly.total_count), 0)
+    ).filter(StudentAttendanceMonthly.student_id == student_id).one()
+    return int(present), int(total)
+
+
+# --- Write-time listeners ---
+def apply_marks(connection, marks, classrooms=None):
+    """Patch both rollups with signed attendance marks (see ``stats_snapshot``).
+
+    ``classrooms`` maps student ids to classroom ids; it is looked up when
+    omitted.
+    """
+    if classrooms is None:
+        classrooms = _classrooms_of(connection, (mark[0] for mark in marks))
+    daily, monthly = {}, {}
+    for student_id, _, day, status, sign in marks:
+        if student_id is None or day is None:
+            continue
+        deltas = {f'{s}_count': sign for s in _COUNTED if s == status}
+        deltas['total_count'] = sign
+        if classrooms.get(student_id) is not None:
+            accumulate(daily, (classrooms[student_id], day), deltas)
+        accumulate(monthly, (student_id, month_key(day)), deltas)
+    increment_many(connection, _DAILY, ('classroom_id', 'date'), daily)
+    increment_many(connection, _MONTHLY, ('student_id', 'month'), monthly)
+
+
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_update')
+def _attendance_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'date', 'status'):
+        apply_marks(connection, [_mark(target, -1), _mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_deleted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, -1)])
+
+
+@event.listens_for(Student, 'after_update')
+def _student_updated(mapper, connection, target):
+    if _changed(target, 'classroom_id'):
+        refresh_classrooms(connection, [_previous(target, 'classroom_id'), target.classroom_id])
+
+
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    refresh_classrooms(connection, [_previous(target, 'classroom_id')])
+
+
+__all__ = [
+    "classroom_daily", "student_totals", "month_key", "apply_marks", "refresh_classrooms",
+    "rebuild", "ensure_seeded", "check"
+]
@@ -0,0 +1,111 @@
+from itertools import groupby
+from sqlalchemy import func
+from ..models import db, Attendance, AttendanceSession, Enrollment, Subject, SESSION_STATUS_CODES
+from .attendance import register_rows, write_marks
+
+MIGRATION_BATCH_SIZE = 5000
+
+
+def current_roster(subject_id):
+    """Students enrolled in ``subject_id``, in enrollment order."""
+    return [student_id for student_id, in db.session.query(Enrollment.student_id)
+            .filter(Enrollment.subject_id == subject_id).order_by(Enrollment.id)]
+
+
+def find_session(subject_id, date, period=1):
+    """The session for one lesson: a single-row fetch on the unique lesson index."""
+    return AttendanceSession.query.filter_by(subject_id=subject_id, date=date, period=period).first()
+
+
+def _merge(session, roster, marks):
+    # Keep the stored roster order; students marked but not on it are appended
+    known = set(roster)
+    roster = roster + [student_id for student_id in marks if student_id not in known]
+    session.set_records(roster, marks)
+
+
+def record_session(subject_id, teacher_id, date, statuses, period=1):
+    """Create or update the session for a lesson with ``{student_id: status}`` marks.
+
+    A new session takes the subject's current enrollment as its roster and
+    ``teacher_id`` as its teacher; an existing one keeps its teacher. The
+    marks are also upserted into Attendance under the session's teacher, which
+    the reports, statistics and student portal read, in the same transaction. Raises ValueError for
+    statuses outside SESSION_STATUS_CODES; the caller commits.
+    """
+    unknown = sorted({status for status in statuses.values() if status not in SESSION_STATUS_CODES})
+    if unknown:
+        raise ValueError(f"Unknown attendance status: {', '.join(map(str, unknown))}")
+    marks = {int(student_id): status for student_id, status in statuses.items()}
+
+    session = find_session(subject_id, date, period)
+    if session is None:
+        session = AttendanceSession(subject_id=subject_id, teacher_id=teacher_id, date=date, period=period)
+        db.session.add(session)
+        roster, existing = current_roster(subject_id), {}
+    else:
+        roster, existing = session.student_ids, session.records()
+    _merge(session, roster, {**existing, **marks})
+    write_marks(register_rows(session.teacher_id, date, marks))
+    return session
+
+
+def migrate_from_attendance(period=1):
+    """Fold per-student Attendance rows into one session per subject and day.
+
+    Legacy rows carry no subject, so a (teacher, student) pair is attributed
+    to the lowest-id subject that teacher teaches and the student is enrolled
+    in; rows with no such subject are counted as unmapped. Existing session
+    marks take precedence, so the migration can be re-run. Returns counts.
+    """
+    subject_for = {
+        (teacher_id, student_id): subject_id
+        for teacher_id, student_id, subject_id in db.session.query(
+            Subject.teacher_id, Enrollment.student_id, func.min(Subject.id)
+        ).join(Enrollment, Enrollment.subject_id == Subject.id)
+         .group_by(Subject.teacher_id, Enrollment.student_id)
+    }
+    rosters = {}
+    for subject_id, student_id in db.session.query(Enrollment.subject_id, Enrollment.student_id).order_by(Enrollment.id):
+        rosters.setdefault(subject_id, []).append(student_id)
+
+    stats = {"rows_read": 0, "rows_migrated": 0, "unmapped": 0, "unknown_status": 0, "sessions_written": 0}
+    rows = db.session.query(Attendance.date, Attendance.teacher_id, Attendance.student_id, Attendance.status) \
+        .order_by(Attendance.date, Attendance.id).yield_per(MIGRATION_BATCH_SIZE)
+
+    # Collect one day at a time, then write that day's sessions together
+    days = []
+    for day, day_rows in groupby(rows, key=lambda row: row.date):
+        lessons = {}
+        for _, teacher_id, student_id, status in day_rows:
+            stats["rows_read"] += 1
+            subject_id = subject_for.get((teacher_id, student_id))
+            if subject_id is None:
+                stats["unmapped"] += 1
+                continue
+            if status not in SESSION_STATUS_CODES:
+                stats["unknown_status"] += 1
+                continue
+            lessons.setdefault((subject_id, teacher_id), {})[student_id] = status
+            stats["rows_migrated"] += 1
+        if lessons:
+            days.append((day, lessons))
+
+    for day, lessons in days:
+        existing = {s.subject_id: s for s in AttendanceSession.query.filter_by(date=day, period=period)}
+        for (subject_id, teacher_id), marks in lessons.items():
+            session = existing.get(subject_id)
+            if session is None:
+                session = AttendanceSession(subject_id=subject_id, teacher_id=teacher_id, date=day, period=period)
+                db.session.add(session)
+                roster, stored = rosters.get(subject_id, []), {}
+                existing[subject_id] = session
+            else:
+                roster, stored = session.student_ids, session.records()
+            _merge(session, roster, {**marks, **{k: v for k, v in stored.items() if v is not None}})
+            stats["sessions_written"] += 1
+        db.session.commit()
+    return stats
+
+
+__all__ = ["current_roster", "find_session", "record_session", "migrate_from_attendance"]
@@ -0,0 +1,263 @@
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app, g, has_app_context, jsonify
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session, object_session
+from ..models import db, User, Teacher, Student, RevokedToken
+from .stats_snapshot import _changed, _previous, track
+
+DEFAULT_VERSION_TTL = 5  # seconds
+DEFAULT_REVOCATION_TTL = 5  # seconds
+_CHANGED = 'token_versions_changed'
+_REVOKED = 'tokens_revoked'
+_NEW_USERS = 'token_versions_new_users'
+
+
+class Principal:
+    """The caller of the current request, as described by the token's claims."""
+    __slots__ = ('user_id', 'role', 'teacher_id', 'student_id')
+
+    def __init__(self, user_id, role, teacher_id=None, student_id=None):
+        self.user_id = user_id
+        self.role = role
+        self.teacher_id = teacher_id
+        self.student_id = student_id
+
+    def __repr__(self):
+        return f"<Principal user={self.user_id} role={self.role}>"
+
+
+def claims_for(user):
+    """Claims minted into a user's tokens so requests need no identity lookups."""
+    return {
+        "role": user.role,
+        "teacher_id": user.teacher.id if user.teacher else None,
+        "student_id": user.student.id if user.student else None,
+        "ver": user.token_version or 0
+    }
+
+
+def issue_token(user):
+    return create_access_token(identity=str(user.id), additional_claims=claims_for(user))
+
+
+def issue_tokens(user):
+    """A short-lived access token with claims and a refresh token to renew it."""
+    return {
+        "access_token": issue_token(user),
+        "refresh_token": create_refresh_token(identity=str(user.id))
+    }
+
+
+def current_principal():
+    """Principal of the verified token, built once per request."""
+    principal = g.get('principal')
+    if principal is None:
+        claims = get_jwt()
+        principal = g.principal = Principal(
+            int(claims['sub']), claims.get('role'), claims.get('teacher_id'), claims.get('student_id')
+        )
+    return principal
+
+
+# --- Token versions ---
+# Bumping a user's version makes every token minted before it stale. Versions
+# are checked against an in-process map of the users that have ever been
+# bumped, reloaded every TOKEN_VERSION_TTL seconds and right after a local bump
+# commits, so verifying a token does not query the database.
+class _VersionCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = None
+        self.expires_at = 0.0
+
+
+def _cache():
+    return current_app.extensions.setdefault('token_versions', _VersionCache())
+
+
+def known_versions():
+    ttl = current_app.config.get('TOKEN_VERSION_TTL', DEFAULT_VERSION_TTL)
+    cache = _cache()
+    if cache.versions is not None and time.monotonic() < cache.expires_at:
+        return cache.versions
+
+    with cache.lock:
+        if cache.versions is not None and time.monotonic() < cache.expires_at:
+            return cache.versions
+        cache.versions = dict(db.session.execute(
+            select(User.id, User.token_version).where(User.token_version > 0)
+        ).tuples().all())
+        cache.expires_at = time.monotonic() + ttl
+        return cache.versions
+
+
+def invalidate():
+    _cache().expires_at = 0.0
+
+
+def is_stale(claims):
+    """True for access tokens without role claims or minted before the user's last bump.
+
+    Refresh tokens carry no claims to go stale; /auth/refresh reads them afresh.
+    """
+    if claims.get('type') == 'refresh':
+        return False
+    if 'ver' not in claims or 'role' not in claims:
+        return True
+    return claims['ver'] < known_versions().get(int(claims['sub']), 0)
+
+
+# --- Revocation ---
+# Revoked tokens are persisted in RevokedToken and mirrored in an in-process
+# map of jti -> expiry, rebuilt from the live rows every TOKEN_REVOCATION_TTL
+# seconds. Local revocations are added as soon as they commit, so checking a
+# token is a dict lookup.
+class _RevocationCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jtis = None
+        self.expires_at = 0.0
+
+
+def _revocations():
+    return current_app.extensions.setdefault('revoked_tokens', _RevocationCache())
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def revoked_jtis():
+    ttl = current_app.config.get('TOKEN_REVOCATION_TTL', DEFAULT_REVOCATION_TTL)
+    cache = _revocations()
+    if cache.jtis is not None and time.monotonic() < cache.expires_at:
+        return cache.jtis
+
+    with cache.lock:
+        if cache.jtis is not None and time.monotonic() < cache.expires_at:
+            return cache.jtis
+        # Expired tokens fail verification anyway, so only live rows are kept
+        cache.jtis = dict(db.session.execute(
+            select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > _utcnow())
+        ).tuples().all())
+        cache.expires_at = time.monotonic() + ttl
+        return cache.jtis
+
+
+def is_revoked(claims):
+    return claims['jti'] in revoked_jtis()
+
+
+def revoke(claims):
+    """Record the revocation of a decoded token; the caller commits."""
+    jti = claims['jti']
+    if is_revoked(claims):
+        return
+    expires_at = datetime.fromtimestamp(claims['exp'], timezone.utc).replace(tzinfo=None)
+    db.session.add(RevokedToken(
+        jti=jti, token_type=claims.get('type', 'access'), user_id=int(claims['sub']), expires_at=expires_at
+    ))
+    db.session.info.setdefault(_REVOKED, {})[jti] = expires_at
+
+
+def prune_revoked():
+    """Delete revocations of tokens that have expired; returns rows removed. The caller commits."""
+    return db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= _utcnow())).rowcount
+
+
+def init_app(app, jwt):
+    @jwt.token_in_blocklist_loader
+    def _token_is_blocked(jwt_header, jwt_payload):
+        return is_stale(jwt_payload) or is_revoked(jwt_payload)
+
+    @jwt.revoked_token_loader
+    def _blocked_token(jwt_header, jwt_payload):
+        return jsonify({"error": "Token is no longer valid, refresh it or log in again"}), 401
+
+
+# --- Write-time listeners ---
+track(Teacher, 'user_id')
+track(Student, 'user_id')
+
+
+def _mark_changed(target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED] = True
+
+
+def _bump(connection, target, user_id):
+    if user_id is not None:
+        connection.execute(
+            update(User).where(User.id == user_id).values(token_version=User.token_version + 1)
+        )
+        _mark_changed(target)
+
+
+@event.listens_for(User, 'before_update')
+def _user_updating(mapper, connection, target):
+    if _changed(target, 'role'):
+        target.token_version = (target.token_version or 0) + 1
+        _mark_changed(target)
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_NEW_USERS, set()).add(target.id)
+
+
+# Gaining or losing a teacher/student profile changes the claims; a profile
+# created along with its user cannot have been issued a token yet
+@event.listens_for(Teacher, 'after_insert')
+@event.listens_for(Student, 'after_insert')
+def _profile_inserted(mapper, connection, target):
+    session = object_session(target)
+    if session is None or target.user_id not in session.info.get(_NEW_USERS, ()):
+        _bump(connection, target, target.user_id)
+
+
+@event.listens_for(Teacher, 'after_update')
+@event.listens_for(Student, 'after_update')
+def _profile_updated(mapper, connection, target):
+    if _changed(target, 'user_id'):
+        _bump(connection, target, _previous(target, 'user_id'))
+        _bump(connection, target, target.user_id)
+
+
+@event.listens_for(Teacher, 'after_delete')
+@event.listens_for(Student, 'after_delete')
+def _profile_deleted(mapper, connection, target):
+    _bump(connection, target, _previous(target, 'user_id'))
+
+
+@event.listens_for(Session, 'after_commit')
+def _auth_state_committed(session):
+    session.info.pop(_NEW_USERS, None)
+    changed = session.info.pop(_CHANGED, False)
+    revoked = session.info.pop(_REVOKED, None)
+    if not has_app_context():
+        return
+    if changed:
+        invalidate()
+    if revoked:
+        jtis = _revocations().jtis
+        if jtis is not None:
+            jtis.update(revoked)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _auth_state_rolled_back(session):
+    for key in (_NEW_USERS, _CHANGED, _REVOKED):
+        session.info.pop(key, None)
+
+
+__all__ = [
+    "Principal", "claims_for", "issue_token", "issue_tokens", "current_principal",
+    "known_versions", "invalidate", "is_stale", "revoked_jtis", "is_revoked", "revoke",
+    "prune_revoked", "init_app"
+]
@@ -0,0 +1,263 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from ..models import db
+from .metrics import human_size
+
+DEFAULT_KEEP = 7
+SQLITE_PAGES_PER_STEP = 256  # pages copied before yielding to writers
+SQLITE_STEP_SLEEP = 0.005    # seconds between steps
+_COPY_CHUNK = 1024 * 1024
+_JOB_HISTORY = 20
+
+
+class BackupError(Exception):
+    pass
+
+
+class _HashingWriter:
+    """File wrapper that tracks the SHA-256 and size of everything written."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+class _LineCounter:
+    """Passes COPY output through to ``target`` while counting rows."""
+
+    def __init__(self, target):
+        self.target = target
+        self.lines = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.lines += data.count(b'\n')
+        return self.target.write(data)
+
+
+def backup_dir(app=None):
+    app = app or current_app
+    path = app.config.get('BACKUP_DIR') or os.path.join(app.instance_path, 'backups')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# --- Dialect engines ---
+def _backup_sqlite(engine, target):
+    source_path = engine.url.database
+    if not source_path or source_path == ':memory:':
+        raise BackupError("In-memory SQLite databases cannot be backed up")
+
+    staging = target + '.tmp'
+    source = sqlite3.connect(source_path)
+    copy = sqlite3.connect(staging)
+    try:
+        # Online backup API: copies a few pages at a time so writers are not blocked
+        source.backup(copy, pages=SQLITE_PAGES_PER_STEP, sleep=SQLITE_STEP_SLEEP)
+        tables = [row[0] for row in copy.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        row_counts = {t: copy.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in tables}
+    finally:
+        copy.close()
+        source.close()
+
+    try:
+        with open(staging, 'rb') as src, open(target, 'wb') as out:
+            writer = _HashingWriter(out)
+            with gzip.GzipFile(fileobj=writer, mode='wb') as gz:
+                while True:
+                    chunk = src.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    gz.write(chunk)
+    finally:
+        os.remove(staging)
+    return writer, row_counts
+
+
+def _backup_postgresql(engine, target):
+    raw = engine.raw_connection()
+    driver_conn = raw.driver_connection
+    row_counts = {}
+    try:
+        driver_conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = driver_conn.cursor()
+        with open(target, 'wb') as out:
+            writer = _HashingWriter(out)
+            with gzip.GzipFile(fileobj=writer, mode='wb') as gz:
+                # One snapshot for every table; each is streamed with COPY TO STDOUT
+                for table in db.metadata.sorted_tables:
+                    columns = ', '.join(f'"{c.name}"' for c in table.columns)
+                    gz.write(f'COPY "{table.name}" ({columns}) FROM stdin;\n'.encode('utf-8'))
+                    counter = _LineCounter(gz)
+                    cursor.copy_expert(f'COPY "{table.name}" ({columns}) TO STDOUT', counter)
+                    gz.write(b'\\.\n\n')
+                    row_counts[table.name] = counter.lines
+    finally:
+        # The connection goes back to the pool; restore its session, or discard it
+        try:
+            driver_conn.rollback()
+            driver_conn.set_session(isolation_level='DEFAULT', readonly=False)
+        except Exception:
+            raw.invalidate()
+        raw.close()
+    return writer, row_counts
+
+
+_ENGINES = {
+    'sqlite': ('sqlite3.gz', _backup_sqlite),
+    'postgresql': ('sql.gz', _backup_postgresql),
+}
+
+
+# --- Manifests and rotation ---
+def _manifest_path(directory, backup_id):
+    return os.path.join(directory, f"{backup_id}.json")
+
+
+def list_backups(app=None):
+    directory = backup_dir(app)
+    manifests = []
+    for path in glob.glob(os.path.join(directory, 'backup_*.json')):
+        with open(path) as f:
+            manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m['created_at'], reverse=True)
+
+
+def last_backup(app=None):
+    backups = list_backups(app)
+    return backups[0]['created_at'] if backups else None
+
+
+def rotate(app=None):
+    app = app or current_app
+    keep = app.config.get('BACKUP_KEEP', DEFAULT_KEEP)
+    directory = backup_dir(app)
+    for manifest in list_backups(app)[keep:]:
+        for path in (
+            os.path.join(directory, manifest['file']),
+            os.path.join(directory, manifest['file'] + '.sha256'),
+            _manifest_path(directory, manifest['backup_id'])
+        ):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_backup(job, app=None):
+    """Write a compressed, checksummed backup and fill in ``job``; returns the job."""
+    app = app or current_app
+    engine = db.engine
+    dialect = engine.dialect.name
+    if dialect not in _ENGINES:
+        raise BackupError(f"Backups are not supported for {dialect} databases")
+
+    extension, engine_backup = _ENGINES[dialect]
+    directory = backup_dir(app)
+    filename = f"{job['backup_id']}.{extension}"
+    target = os.path.join(directory, filename)
+
+    started = time.monotonic()
+    writer, row_counts = engine_backup(engine, target)
+    checksum = writer.sha256.hexdigest()
+    with open(target + '.sha256', 'w') as f:
+        f.write(f"{checksum}  {filename}\n")
+
+    job.update({
+        "status": "completed",
+        "database_type": dialect,
+        "file": filename,
+        "size": human_size(writer.size),
+        "size_bytes": writer.size,
+        "checksum": f"sha256:{checksum}",
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "tables_included": sorted(row_counts),
+        "row_counts": row_counts,
+        "completed_at": datetime.now().isoformat()
+    })
+    with open(_manifest_path(directory, job['backup_id']), 'w') as f:
+        json.dump(job, f, indent=2)
+    rotate(app)
+    return job
+
+
+# --- Background execution ---
+class _BackupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+        self.jobs = {}
+        self.running = None
+
+
+def _state(app):
+    return app.extensions.setdefault('backup', _BackupState())
+
+
+def _run_in_background(app, state, job):
+    with app.app_context():
+        try:
+            run_backup(job, app)
+        except Exception as e:
+            job.update({"status": "failed", "error": str(e)})
+        finally:
+            db.session.remove()
+            with state.lock:
+                state.running = None
+
+
+def start_backup():
+    """Queue a backup off the request thread.
+
+    Returns ``(job, started)``; ``started`` is False when a backup is already running.
+    """
+    app = current_app._get_current_object()
+    state = _state(app)
+    with state.lock:
+        if state.running is not None:
+            return state.running, False
+        now = datetime.now()
+        job = {
+            "backup_id": f"backup_{now.strftime('%Y%m%d_%H%M%S')}",
+            "created_at": now.isoformat(),
+            "status": "running"
+        }
+        state.jobs[job['backup_id']] = job
+        state.running = job
+        for stale in list(state.jobs)[:-_JOB_HISTORY]:
+            del state.jobs[stale]
+    state.executor.submit(_run_in_background, app, state, job)
+    return job, True
+
+
+def get_backup(backup_id):
+    job = _state(current_app).jobs.get(backup_id)
+    if job is not None:
+        return job
+    path = _manifest_path(backup_dir(), backup_id)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+__all__ = ["BackupError", "start_backup", "get_backup", "run_backup", "list_backups", "last_backup", "rotate"]
@@ -0,0 +1,109 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask import request, jsonify, make_response, abort, Response
+from ..models import db
+from .json_provider import _dumpb
+from .pagination import _arg, page_limit, wants_page
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for the binary variant
+    msgpack = None
+
+# Encoding name (as used by ?format=) -> response media type
+ENCODINGS = {
+    'columns': 'application/vnd.skoolmate.columns+json',
+    'msgpack': 'application/vnd.skoolmate.columns+msgpack',
+}
+# Extra Accept values that select an encoding
+_ACCEPT_ALIASES = {
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+}
+
+
+def requested_encoding():
+    """Columnar encoding asked for by ``?format=`` or the ``Accept`` header, else None.
+
+    Only an explicit media type opts in; ``*/*`` keeps the row-oriented JSON.
+    """
+    fmt = request.args.get('format')
+    if fmt in ENCODINGS:
+        return fmt
+    accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+    for encoding, mimetype in ENCODINGS.items():
+        if mimetype in accepted:
+            return encoding
+    for mimetype, encoding in _ACCEPT_ALIASES.items():
+        if mimetype in accepted:
+            return encoding
+    return None
+
+
+def _fields(stmt):
+    """Narrow ``stmt`` to ``?fields=``; the id column is always kept for the cursor."""
+    raw = request.args.get('fields')
+    if not raw:
+        return stmt
+    wanted = {part.strip() for part in raw.split(',') if part.strip()} | {'id'}
+    return stmt.with_only_columns(*[c for c in stmt.selected_columns if c.name in wanted])
+
+
+def columns_of(stmt):
+    """``{columns, data}`` built straight from the Core result rows of ``stmt``."""
+    result = db.session.execute(stmt)
+    columns = list(result.keys())
+    rows = result.all()
+    values = zip(*rows) if rows else [() for _ in columns]
+    return {"columns": columns, "data": {c: list(v) for c, v in zip(columns, values)}}
+
+
+def _msgpack_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+def encode(body, encoding):
+    """Response carrying a columnar ``body`` in ``encoding``."""
+    if encoding == 'msgpack':
+        if msgpack is None:
+            abort(make_response(jsonify({"error": "MessagePack encoding is not available on this server"}), 406))
+        data = msgpack.packb(body, default=_msgpack_default, use_bin_type=True)
+    else:
+        data = _dumpb(body)
+    return Response(data, mimetype=ENCODINGS[encoding], headers={"Vary": "Accept"})
+
+
+def respond(stmt, id_column, encoding, query=None):
+    """Columnar response for a flat Core projection, bypassing the ORM.
+
+    ``query`` is the endpoint's filtered ORM query; only its WHERE clause is
+    reused. ``?limit=``/``?after_id=`` page by ``id_column`` as in ``paginate``
+    and add ``next_cursor`` and ``limit`` to the body. Rows come from the
+    database only, so write-behind marks appear once flushed.
+    """
+    criteria = query.statement.whereclause if query is not None else None
+    if criteria is not None:
+        stmt = stmt.where(criteria)
+    stmt = _fields(stmt)
+    if not wants_page():
+        return encode(columns_of(stmt), encoding)
+
+    limit = page_limit()
+    after_id = _arg('after_id', int)
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    body = columns_of(stmt.limit(limit + 1))
+    next_cursor = None
+    if len(body["data"]["id"]) > limit:
+        for values in body["data"].values():
+            del values[limit:]
+        next_cursor = body["data"]["id"][-1]
+    body.update({"next_cursor": next_cursor, "limit": limit})
+    return encode(body, encoding)
+
+
+__all__ = ["ENCODINGS", "columns_of", "encode", "requested_encoding", "respond"]
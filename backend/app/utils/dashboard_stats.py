@@ -0,0 +1,84 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, func
+from ..models import (
+    db, User, Student, Teacher, Subject, Department,
+    Appointment, Enrollment, SchoolStats
+)
+from .stats_snapshot import SCHOOL_ROW
+
+DEFAULT_TTL = 5  # seconds
+RECENT_ENROLLMENT_DAYS = 30
+
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def _snapshot(column):
+    # Fee and attendance totals come from the maintained snapshot row
+    return func.coalesce(select(column).where(SchoolStats.id == SCHOOL_ROW).scalar_subquery(), 0)
+
+
+def compute_statistics():
+    """Every admin headline figure in a single SELECT of scalar subqueries."""
+    since = datetime.now() - timedelta(days=RECENT_ENROLLMENT_DAYS)
+    stmt = select(
+        _count(User).label('total_users'),
+        _count(Student).label('total_students'),
+        _count(Teacher).label('total_teachers'),
+        _count(Subject).label('total_subjects'),
+        _count(Department).label('total_departments'),
+        _count(Appointment).label('pending_appointments'),
+        _snapshot(SchoolStats.unpaid_fees).label('unpaid_fees'),
+        _snapshot(SchoolStats.fees_due).label('total_fees_due'),
+        _snapshot(SchoolStats.fees_paid).label('total_fees_paid'),
+        _snapshot(SchoolStats.attendance_total).label('total_attendance'),
+        _snapshot(SchoolStats.attendance_present).label('present_count'),
+        _count(Enrollment, Enrollment.created_at >= since).label('recent_enrollments')
+    )
+    row = db.session.execute(stmt).mappings().one()
+    stats = dict(row)
+    stats['total_fees_due'] = float(stats['total_fees_due'])
+    stats['total_fees_paid'] = float(stats['total_fees_paid'])
+    return stats
+
+
+class _StatsCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.expires_at = 0.0
+
+
+def _cache():
+    return current_app.extensions.setdefault('dashboard_stats', _StatsCache())
+
+
+def get_statistics():
+    """Cached view of compute_statistics(), refreshed every STATS_CACHE_TTL seconds."""
+    ttl = current_app.config.get('STATS_CACHE_TTL', DEFAULT_TTL)
+    cache = _cache()
+    now = time.monotonic()
+    if cache.value is not None and now < cache.expires_at:
+        return cache.value
+
+    with cache.lock:
+        # Another thread may have refreshed while we waited for the lock
+        if cache.value is not None and time.monotonic() < cache.expires_at:
+            return cache.value
+        cache.value = compute_statistics()
+        cache.expires_at = time.monotonic() + ttl
+        return cache.value
+
+
+def invalidate():
+    _cache().expires_at = 0.0
+
+
+def collection_rate(stats):
+    due = stats['total_fees_due']
+    return (stats['total_fees_paid'] / due * 100) if due > 0 else 0
+
@@ -1,28 +1,21 @@
 from functools import wraps
 from flask import request, jsonify
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-from ..models import User
+from flask_jwt_extended import verify_jwt_in_request
+from .auth import current_principal
 
-def admin_required(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        verify_jwt_in_request()  # 👈 Ensure JWT is present
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if user and user.role == 'admin':
-            return fn(*args, **kwargs)
-        return jsonify({"error": "Admin access required"}), 403
-    return wrapper
+def role_required(role, message):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()  # 👈 Ensure JWT is present
+            # The role comes from the token's claims; no user lookup needed
+            if current_principal().role == role:
+                return fn(*args, **kwargs)
+            return jsonify({"error": message}), 403
+        return wrapper
+    return decorator
 
-def teacher_required(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        verify_jwt_in_request()  # 👈 Ensure JWT is present
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        if user and user.role == 'teacher':
-            return fn(*args, **kwargs)
-        return jsonify({"error": "Teacher access required"}), 403
-    return wrapper
+admin_required = role_required('admin', "Admin access required")
+teacher_required = role_required('teacher', "Teacher access required")
 
-__all__ = ["teacher_required", "admin_required"]
+__all__ = ["teacher_required", "admin_required", "role_required"]
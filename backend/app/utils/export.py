@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from sqlalchemy import select
+from ..models import (
+    db, User, Student, Teacher, Classroom, Department, Subject, Exam,
+    Result, Fee, Attendance, Enrollment, FeePayment
+)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+DEFAULT_BATCH_SIZE = 1000
+_FLUSH_BYTES = 64 * 1024
+
+
+# Flat column projections per exportable model. Joins only pull in display
+# names so each row is a single tuple straight from the cursor.
+def _students():
+    return select(
+        Student.id, Student.user_id, Student.full_name, Student.gender,
+        Student.date_of_birth, Student.parent_contact, Student.classroom_id,
+        Classroom.name.label('classroom'), User.username, User.email, Student.image_url
+    ).outerjoin(Classroom, Student.classroom_id == Classroom.id) \
+     .outerjoin(User, Student.user_id == User.id) \
+     .order_by(Student.id)
+
+
+def _teachers():
+    return select(
+        Teacher.id, Teacher.user_id, Teacher.full_name, Teacher.department_id,
+        Department.name.label('department'), User.username, User.email, Teacher.image_url
+    ).outerjoin(Department, Teacher.department_id == Department.id) \
+     .outerjoin(User, Teacher.user_id == User.id) \
+     .order_by(Teacher.id)
+
+
+def _results():
+    return select(
+        Result.id, Result.student_id, Student.full_name.label('student_name'),
+        Result.exam_id, Exam.name.label('exam_name'), Exam.date.label('exam_date'),
+        Exam.subject_id, Subject.name.label('subject_name'), Result.score, Result.report_id
+    ).outerjoin(Student, Result.student_id == Student.id) \
+     .outerjoin(Exam, Result.exam_id == Exam.id) \
+     .outerjoin(Subject, Exam.subject_id == Subject.id) \
+     .order_by(Result.id)
+
+
+def _fees():
+    return select(
+        Fee.id, Fee.student_id, Fee.term, Fee.amount_due, Fee.amount_paid,
+        Fee.due_date, Fee.is_paid, Fee.report_id
+    ).order_by(Fee.id)
+
+
+def _attendance():
+    return select(
+        Attendance.id, Attendance.student_id, Student.full_name.label('student_name'),
+        Attendance.teacher_id, Attendance.date, Attendance.status
+    ).outerjoin(Student, Attendance.student_id == Student.id) \
+     .order_by(Attendance.id)
+
+
+def _enrollments():
+    return select(
+        Enrollment.id, Enrollment.student_id, Student.full_name.label('student_name'),
+        Enrollment.subject_id, Subject.name.label('subject_name'), Enrollment.created_at
+    ).outerjoin(Student, Enrollment.student_id == Student.id) \
+     .outerjoin(Subject, Enrollment.subject_id == Subject.id) \
+     .order_by(Enrollment.id)
+
+
+def _payments():
+    return select(
+        FeePayment.id, FeePayment.student_id, FeePayment.amount, FeePayment.payment_method,
+        FeePayment.reference_number, FeePayment.status, FeePayment.created_at
+    ).order_by(FeePayment.id)
+
+
+CATALOG = {
+    'students': _students,
+    'teachers': _teachers,
+    'results': _results,
+    'fees': _fees,
+    'attendance': _attendance,
+    'enrollments': _enrollments,
+    'payments': _payments,
+}
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(stmt, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield row tuples through a server-side cursor, ``batch_size`` at a time."""
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_plain(v) for v in row])
+        if buffer.tell() >= _FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_chunks(columns, rows):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({c: _plain(v) for c, v in zip(columns, row)})
+        lines.append(line)
+        size += len(line) + 1
+        if size >= _FLUSH_BYTES:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines, size = [], 0
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(model_name, fmt, compress=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Encoded chunks for ``model_name`` in ``fmt``; memory use is bounded by the batch size."""
+    stmt = CATALOG[model_name]()
+    columns = [c.name for c in stmt.selected_columns]
+    encode = _csv_chunks if fmt == 'csv' else _ndjson_chunks
+    chunks = encode(columns, iter_rows(stmt, batch_size))
+    return _gzip(chunks) if compress else chunks
+
+
+__all__ = ["CATALOG", "FORMATS", "iter_rows", "stream_export"]
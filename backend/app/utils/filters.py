@@ -0,0 +1,74 @@
+from sqlalchemy import select
+from ..models import (
+    User, Student, Teacher, Exam, Result, Attendance, Enrollment,
+    Fee, Report, Appointment, DormAssignment, AttendanceSession
+)
+from .pagination import parse_date, parse_bool
+
+# Query-string filters accepted by the list endpoints, in the
+# ``{param: (converter, criterion)}`` form understood by apply_filters.
+
+STUDENT_FILTERS = {
+    'classroom_id': (int, lambda v: Student.classroom_id == v),
+}
+
+TEACHER_FILTERS = {
+    'department_id': (int, lambda v: Teacher.department_id == v),
+}
+
+RESULT_FILTERS = {
+    'exam_id': (int, lambda v: Result.exam_id == v),
+    'student_id': (int, lambda v: Result.student_id == v),
+    'subject_id': (int, lambda v: Result.exam_id.in_(select(Exam.id).where(Exam.subject_id == v))),
+}
+
+ATTENDANCE_FILTERS = {
+    'student_id': (int, lambda v: Attendance.student_id == v),
+    'teacher_id': (int, lambda v: Attendance.teacher_id == v),
+    'status': (str, lambda v: Attendance.status == v),
+    'from': (parse_date, lambda v: Attendance.date >= v),
+    'to': (parse_date, lambda v: Attendance.date <= v),
+    'classroom_id': (int, lambda v: Attendance.student_id.in_(
+        select(Student.id).where(Student.classroom_id == v)
+    )),
+}
+
+ATTENDANCE_SESSION_FILTERS = {
+    'subject_id': (int, lambda v: AttendanceSession.subject_id == v),
+    'teacher_id': (int, lambda v: AttendanceSession.teacher_id == v),
+    'date': (parse_date, lambda v: AttendanceSession.date == v),
+    'from': (parse_date, lambda v: AttendanceSession.date >= v),
+    'to': (parse_date, lambda v: AttendanceSession.date <= v),
+    'period': (int, lambda v: AttendanceSession.period == v),
+}
+
+ENROLLMENT_FILTERS = {
+    'student_id': (int, lambda v: Enrollment.student_id == v),
+    'subject_id': (int, lambda v: Enrollment.subject_id == v),
+}
+
+FEE_FILTERS = {
+    'student_id': (int, lambda v: Fee.student_id == v),
+    'term': (str, lambda v: Fee.term == v),
+    'is_paid': (parse_bool, lambda v: Fee.is_paid == v),
+}
+
+REPORT_FILTERS = {
+    'student_id': (int, lambda v: Report.student_id == v),
+    'term': (str, lambda v: Report.term == v),
+    'year': (int, lambda v: Report.year == v),
+}
+
+APPOINTMENT_FILTERS = {
+    'student_id': (int, lambda v: Appointment.student_id == v),
+    'teacher_id': (int, lambda v: Appointment.teacher_id == v),
+}
+
+USER_FILTERS = {
+    'role': (str, lambda v: User.role == v),
+}
+
+DORM_ASSIGNMENT_FILTERS = {
+    'dorm_id': (int, lambda v: DormAssignment.dorm_id == v),
+    'student_id': (int, lambda v: DormAssignment.student_id == v),
+}
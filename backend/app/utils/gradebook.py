@@ -0,0 +1,190 @@
+import csv
+import io
+import math
+from sqlalchemy import func, select, union
+from sqlalchemy.exc import IntegrityError
+from ..models import db, Exam, Result, Student, Enrollment
+from . import stats_snapshot, student_summary
+from .upsert import on_conflict_insert, supports_on_conflict, upsert_rows
+
+MAX_SCORE = 100
+RESULT_KEY = ('student_id', 'exam_id')
+
+
+class GradebookError(Exception):
+    """The upload as a whole cannot be read."""
+
+
+def parse_csv(text):
+    """Rows of a CSV gradebook with a header containing student_id and score."""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'student_id', 'score'} <= {f.strip() for f in reader.fieldnames}:
+        raise GradebookError("CSV header must include student_id and score")
+    return [{key.strip(): value for key, value in row.items() if key} for row in reader]
+
+
+def resolve_exam(subject_id, name):
+    """Find or create the exam named ``name`` for a subject, safely under concurrency.
+
+    Relies on the unique (subject_id, name) index: a concurrent creator's row
+    wins and is returned instead of a duplicate being inserted.
+    """
+    exam = Exam.query.filter_by(subject_id=subject_id, name=name).first()
+    if exam:
+        return exam, False
+
+    connection = db.session.connection()
+    if supports_on_conflict(connection):
+        stmt = on_conflict_insert(connection, Exam.__table__) \
+            .values(subject_id=subject_id, name=name) \
+            .on_conflict_do_nothing(index_elements=['subject_id', 'name'])
+        created = connection.execute(stmt).rowcount == 1
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.add(Exam(subject_id=subject_id, name=name))
+            created = True
+        except IntegrityError:
+            created = False
+    return Exam.query.filter_by(subject_id=subject_id, name=name).one(), created
+
+
+def _parse_score(value):
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("score must be a number")
+    if math.isnan(score) or not 0 <= score <= MAX_SCORE:
+        raise ValueError(f"score must be between 0 and {MAX_SCORE}")
+    return score
+
+
+def validate(subject_id, rows):
+    """Check every row before anything is written.
+
+    Returns ``(valid, errors)``: ``valid`` maps student_id to score and
+    ``errors`` lists ``{"row", "student_id", "error"}`` using 1-based row
+    numbers. A student may appear only once per upload.
+    """
+    parsed, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        raw_id = row.get('student_id') if isinstance(row, dict) else None
+        try:
+            student_id = int(raw_id)
+        except (TypeError, ValueError):
+            errors.append({"row": number, "student_id": raw_id, "error": "student_id must be an integer"})
+            continue
+        try:
+            score = _parse_score(row.get('score'))
+        except ValueError as e:
+            errors.append({"row": number, "student_id": student_id, "error": str(e)})
+            continue
+        parsed.append((number, student_id, score))
+
+    # One query for existence and enrollment of every student in the upload
+    ids = {student_id for _, student_id, _ in parsed}
+    known = dict(db.session.execute(
+        select(Student.id, Enrollment.id)
+        .outerjoin(Enrollment, (Enrollment.student_id == Student.id) & (Enrollment.subject_id == subject_id))
+        .where(Student.id.in_(ids))
+    ).tuples().all()) if ids else {}
+
+    valid = {}
+    for number, student_id, score in parsed:
+        if student_id not in known:
+            error = "student not found"
+        elif known[student_id] is None:
+            error = "student is not enrolled in this subject"
+        elif student_id in valid:
+            error = "duplicate student_id in upload"
+        else:
+            valid[student_id] = score
+            continue
+        errors.append({"row": number, "student_id": student_id, "error": error})
+    return valid, sorted(errors, key=lambda e: e["row"])
+
+
+def import_scores(subject, exam_name, rows, partial=False):
+    """Validate ``rows`` and upsert them as results of one exam in one transaction.
+
+    With errors and ``partial`` False nothing is written. Returns a report;
+    the caller commits.
+    """
+    valid, errors = validate(subject.id, rows)
+    report = {
+        "rows_received": len(rows),
+        "inserted": 0,
+        "updated": 0,
+        "errors": errors,
+        "exam": None
+    }
+    if (errors and not partial) or not valid:
+        return report
+
+    exam, created = resolve_exam(subject.id, exam_name)
+    connection = db.session.connection()
+    inserted, updated = upsert_rows(connection, Result.__table__, RESULT_KEY, [
+        {"student_id": student_id, "exam_id": exam.id, "score": score}
+        for student_id, score in valid.items()
+    ], ['score'])
+    # Core writes skip the listeners that keep the department snapshot and student summaries current
+    stats_snapshot.refresh_departments(connection, [subject.department_id])
+    student_summary.refresh(connection, valid)
+
+    report.update({"inserted": inserted, "updated": updated, "exam": exam.to_dict(set()), "exam_created": created})
+    return report
+
+
+def _summary(values):
+    scores = [v for v in values if v is not None]
+    if not scores:
+        return {"mean": None, "min": None, "max": None, "count": 0}
+    return {
+        "mean": round(sum(scores) / len(scores), 2),
+        "min": min(scores),
+        "max": max(scores),
+        "count": len(scores)
+    }
+
+
+def pivot(subject_id):
+    """Students x exams score matrix for a subject, with per-row and per-column summaries.
+
+    Rows are the students enrolled in the subject or holding one of its
+    results, ordered by name; columns are the subject's exams by date.
+    Missing scores are None.
+    """
+    exams = Exam.query.filter_by(subject_id=subject_id).order_by(Exam.date, Exam.id).all()
+    exam_ids = select(Exam.id).where(Exam.subject_id == subject_id)
+
+    roster = union(
+        select(Enrollment.student_id).where(Enrollment.subject_id == subject_id),
+        select(Result.student_id).where(Result.exam_id.in_(exam_ids))
+    ).subquery()
+    students = db.session.query(Student.id, Student.full_name) \
+        .filter(Student.id.in_(select(roster.c.student_id))) \
+        .order_by(Student.full_name, Student.id).all()
+
+    # Every score of the subject in one grouped query
+    cells = db.session.query(Result.student_id, Result.exam_id, func.avg(Result.score)) \
+        .filter(Result.exam_id.in_(exam_ids)) \
+        .group_by(Result.student_id, Result.exam_id).all()
+
+    row_of = {student_id: i for i, (student_id, _) in enumerate(students)}
+    column_of = {exam.id: j for j, exam in enumerate(exams)}
+    scores = [[None] * len(exams) for _ in students]
+    for student_id, exam_id, score in cells:
+        if student_id in row_of and score is not None:
+            scores[row_of[student_id]][column_of[exam_id]] = round(float(score), 2)
+
+    return {
+        "subject_id": subject_id,
+        "students": [{"id": student_id, "name": name} for student_id, name in students],
+        "exams": [{"id": exam.id, "name": exam.name, "date": exam.date} for exam in exams],
+        "scores": scores,
+        "student_stats": [_summary(row) for row in scores],
+        "exam_stats": [_summary(column) for column in zip(*scores)] if students else [_summary([]) for _ in exams]
+    }
+
+
+__all__ = ["GradebookError", "parse_csv", "resolve_exam", "validate", "import_scores", "pivot"]
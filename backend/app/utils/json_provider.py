@@ -0,0 +1,123 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    # date/datetime as ISO 8601, matching what orjson emits natively
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class IsoJSONProvider(DefaultJSONProvider):
+    """Flask's stdlib provider, but dates serialize as ISO 8601 instead of HTTP dates."""
+
+    default = staticmethod(_default)
+
+    def dumpb(self, obj):
+        return self.dumps(obj).encode('utf-8')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """orjson-backed provider: native date/datetime handling and bytes output."""
+
+    options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def _orjson_default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return DefaultJSONProvider.default(obj)
+
+    def dumpb(self, obj):
+        return orjson.dumps(obj, default=self._orjson_default, option=self.options)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for stdlib options (indent, sort_keys, ...) get stdlib output
+            kwargs.setdefault('default', _default)
+            return json.dumps(obj, **kwargs)
+        return self.dumpb(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumpb(obj), mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    'orjson': OrjsonProvider,
+    'stdlib': IsoJSONProvider,
+}
+
+
+def init_app(app):
+    """Install the JSON provider named by JSON_PROVIDER ('auto', 'orjson' or 'stdlib')."""
+    name = app.config.get('JSON_PROVIDER', 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson else 'stdlib'
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but the orjson package is not installed")
+    app.json = PROVIDERS[name](app)
+
+
+def _dumpb(obj):
+    provider = current_app.json
+    dumpb = getattr(provider, 'dumpb', None)
+    return dumpb(obj) if dumpb else provider.dumps(obj).encode('utf-8')
+
+
+STREAM_FLUSH_BYTES = 64 * 1024
+STREAM_ENCODE_ROWS = 256  # rows encoded per encoder call
+
+
+def iter_json_array(items, serialize=None):
+    """Encode ``items`` as a JSON array, yielding ~64 KB chunks as rows are produced."""
+    buffer = bytearray(b'[')
+    batch = []
+    first = True
+
+    def encode():
+        nonlocal first
+        if not first:
+            buffer.extend(b',')
+        first = False
+        # Encode the batch as one list and drop its brackets
+        buffer.extend(memoryview(_dumpb(batch))[1:-1])
+        batch.clear()
+
+    for item in items:
+        batch.append(serialize(item) if serialize else item)
+        if len(batch) >= STREAM_ENCODE_ROWS:
+            encode()
+            if len(buffer) >= STREAM_FLUSH_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    if batch:
+        encode()
+    buffer.extend(b']')
+    yield bytes(buffer)
+
+
+def stream_json_array(items, serialize=None):
+    """Chunked ``application/json`` response for a list endpoint."""
+    return Response(
+        stream_with_context(iter_json_array(items, serialize)),
+        mimetype=current_app.json.mimetype
+    )
+
+
+__all__ = ["IsoJSONProvider", "OrjsonProvider", "init_app", "iter_json_array", "stream_json_array"]
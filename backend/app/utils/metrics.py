@@ -0,0 +1,194 @@
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict, deque
+from flask import current_app, g, request
+from sqlalchemy import text
+from ..models import db
+
+DEFAULT_WINDOW_SECONDS = 300
+MAX_SAMPLES_PER_BLUEPRINT = 10000
+PERCENTILES = (50, 95, 99)
+
+
+class RequestMetrics:
+    """Per-blueprint request counts and latencies over a sliding time window."""
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.totals = defaultdict(int)
+        self.errors = defaultdict(int)         # 5xx responses
+        self.client_errors = defaultdict(int)  # 4xx responses
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES_PER_BLUEPRINT))
+
+    def record(self, blueprint, duration, status_code=200):
+        now = time.monotonic()
+        with self.lock:
+            self.totals[blueprint] += 1
+            if status_code >= 500:
+                self.errors[blueprint] += 1
+            elif status_code >= 400:
+                self.client_errors[blueprint] += 1
+            self.samples[blueprint].append((now, duration))
+
+    def _trim(self, samples, now):
+        cutoff = now - self.window_seconds
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+
+    def snapshot(self):
+        now = time.monotonic()
+        report = {}
+        with self.lock:
+            for blueprint, samples in self.samples.items():
+                self._trim(samples, now)
+                durations = sorted(d for _, d in samples)
+                report[blueprint] = {
+                    "total_requests": self.totals[blueprint],
+                    "errors": self.errors[blueprint],
+                    "client_errors": self.client_errors[blueprint],
+                    "window_requests": len(durations),
+                    **{f"p{p}_ms": _percentile(durations, p) for p in PERCENTILES}
+                }
+        return report
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return round(sorted_values[rank - 1] * 1000, 2)
+
+
+def init_app(app):
+    metrics = RequestMetrics(app.config.get('METRICS_WINDOW_SECONDS', DEFAULT_WINDOW_SECONDS))
+    app.extensions['metrics'] = metrics
+
+    @app.before_request
+    def _start_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _note_status(response):
+        g._response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        started = g.pop('_request_started', None)
+        # An exception that escaped without a response counts as a 500
+        status_code = 500 if exc is not None else g.pop('_response_status', 500)
+        if started is not None:
+            metrics.record(request.blueprint or 'app', time.perf_counter() - started, status_code)
+
+    return metrics
+
+
+# --- Process and host ---
+def _read_proc_kb(path, field):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def process_rss_bytes():
+    rss_kb = _read_proc_kb('/proc/self/status', 'VmRSS')
+    if rss_kb is not None:
+        return rss_kb * 1024
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes elsewhere; it is the peak, not current RSS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def total_memory_bytes():
+    total_kb = _read_proc_kb('/proc/meminfo', 'MemTotal')
+    return total_kb * 1024 if total_kb is not None else None
+
+
+def human_size(num_bytes):
+    if num_bytes is None:
+        return 'N/A'
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if num_bytes < 1024 or unit == 'TB':
+            return f"{num_bytes:.1f} {unit}" if unit != 'B' else f"{num_bytes} B"
+        num_bytes /= 1024
+
+
+def human_duration(seconds):
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes = seconds // 60
+    if days:
+        return f"{days} days, {hours} hours"
+    if hours:
+        return f"{hours} hours, {minutes} minutes"
+    return f"{minutes} minutes"
+
+
+# --- Database ---
+def database_size_bytes():
+    engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        path = engine.url.database
+        if not path or path == ':memory:':
+            return None
+        return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+    if engine.dialect.name == 'postgresql':
+        return db.session.execute(text("SELECT pg_database_size(current_database())")).scalar()
+    return None
+
+
+def pool_status():
+    pool = db.engine.pool
+    status = {"class": type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            status[name] = fn()
+    return status
+
+
+def system_snapshot():
+    """Live process, host, database and request metrics for the system-info endpoint."""
+    app = current_app
+    metrics = app.extensions['metrics']
+
+    rss = process_rss_bytes()
+    total_memory = total_memory_bytes()
+    uptime = time.time() - metrics.started_at
+    disk = shutil.disk_usage(app.instance_path if os.path.isdir(app.instance_path) else os.getcwd())
+    db_size = database_size_bytes()
+
+    return {
+        "database": {
+            "type": {'sqlite': 'SQLite', 'postgresql': 'PostgreSQL'}.get(db.engine.dialect.name, db.engine.dialect.name),
+            "size": human_size(db_size),
+            "size_bytes": db_size,
+            "pool": pool_status()
+        },
+        "server": {
+            "uptime": human_duration(uptime),
+            "uptime_seconds": round(uptime, 1),
+            "memory_usage": f"{rss / total_memory * 100:.0f}%" if rss and total_memory else human_size(rss),
+            "rss_bytes": rss,
+            "disk_space": f"{disk.used / disk.total * 100:.0f}% used",
+            "disk_free_bytes": disk.free,
+            "pid": os.getpid()
+        },
+        "requests": metrics.snapshot()
+    }
@@ -0,0 +1,259 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from ..models import db, User, Student, Classroom
+from .passwords import hash_many
+
+try:
+    import openpyxl
+except ImportError:  # optional: only needed for .xlsx uploads
+    openpyxl = None
+
+DEFAULT_BATCH_SIZE = 200
+REQUIRED = ('username', 'password', 'full_name')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+$')
+
+
+class OnboardingError(Exception):
+    """The upload as a whole cannot be read."""
+
+
+def _check_header(fields):
+    missing = [name for name in REQUIRED if name not in fields]
+    if missing:
+        raise OnboardingError(f"Header must include {', '.join(REQUIRED)}; missing {', '.join(missing)}")
+
+
+def parse_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    _check_header({f.strip() for f in reader.fieldnames or [] if f})
+    return [{key.strip(): value for key, value in row.items() if key} for row in reader]
+
+
+def parse_xlsx(data):
+    """Rows of the first worksheet, keyed by its header row."""
+    if openpyxl is None:
+        raise OnboardingError("XLSX uploads need the openpyxl package; upload CSV instead")
+    try:
+        sheet = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True).worksheets[0]
+    except Exception:
+        raise OnboardingError("File is not a readable XLSX workbook")
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+    _check_header(set(header))
+    return [{key: value for key, value in zip(header, row) if key}
+            for row in rows if any(cell is not None for cell in row)]
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet numbers such as phone numbers
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    return datetime.strptime(text, '%Y-%m-%d').date() if text else None
+
+
+def classroom_name(row):
+    """Classroom name from class_name + stream, as create_student builds it."""
+    class_name, stream = _text(row.get('class_name')), _text(row.get('stream'))
+    return f"{class_name}{stream}" if class_name and stream else None
+
+
+def _clean(row):
+    """Cleaned fields of one row; raises ValueError naming the first problem."""
+    fields = {name: _text(row.get(name)) for name in (
+        'username', 'email', 'password', 'full_name', 'gender', 'parent_contact'
+    )}
+    missing = [name for name in REQUIRED if not fields[name]]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} required")
+    if fields['email'] and not _EMAIL.match(fields['email']):
+        raise ValueError("email is not valid")
+    try:
+        fields['date_of_birth'] = _date(row.get('date_of_birth'))
+    except ValueError:
+        raise ValueError("date_of_birth must be YYYY-MM-DD")
+    classroom_id = _text(row.get('classroom_id'))
+    try:
+        fields['classroom_id'] = int(classroom_id) if classroom_id else None
+    except ValueError:
+        raise ValueError("classroom_id must be an integer")
+    fields['classroom'] = None if fields['classroom_id'] else classroom_name(row)
+    return fields
+
+
+def validate(rows):
+    """Check every row before any password is hashed.
+
+    Returns ``(valid, errors)``: ``valid`` holds ``(row_number, fields)`` with
+    cleaned values and ``errors`` lists ``{"row", "username", "error"}`` using
+    1-based row numbers. Usernames and emails must be new and unique within
+    the upload.
+    """
+    parsed, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        try:
+            parsed.append((number, _clean(row)))
+        except ValueError as e:
+            errors.append({"row": number, "username": _text(row.get('username')) or None, "error": str(e)})
+
+    # One query each for names and emails already taken
+    usernames = {f['username'] for _, f in parsed}
+    emails = {f['email'] for _, f in parsed if f['email']}
+    taken_usernames = set(db.session.execute(
+        select(User.username).where(User.username.in_(usernames))
+    ).scalars()) if usernames else set()
+    taken_emails = set(db.session.execute(
+        select(User.email).where(User.email.in_(emails))
+    ).scalars()) if emails else set()
+    classroom_ids = {f['classroom_id'] for _, f in parsed if f['classroom_id']}
+    known_classrooms = set(db.session.execute(
+        select(Classroom.id).where(Classroom.id.in_(classroom_ids))
+    ).scalars()) if classroom_ids else set()
+
+    valid, seen_usernames, seen_emails = [], set(), set()
+    for number, fields in parsed:
+        if fields['username'] in taken_usernames:
+            error = "username already exists"
+        elif fields['email'] and fields['email'] in taken_emails:
+            error = "email already exists"
+        elif fields['username'] in seen_usernames:
+            error = "duplicate username in upload"
+        elif fields['email'] and fields['email'] in seen_emails:
+            error = "duplicate email in upload"
+        elif fields['classroom_id'] and fields['classroom_id'] not in known_classrooms:
+            error = "classroom not found"
+        else:
+            seen_usernames.add(fields['username'])
+            if fields['email']:
+                seen_emails.add(fields['email'])
+            valid.append((number, fields))
+            continue
+        errors.append({"row": number, "username": fields['username'], "error": error})
+    return valid, sorted(errors, key=lambda e: e["row"])
+
+
+def resolve_classrooms(names):
+    """Map each classroom name to its id, creating the missing ones. The caller commits."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    # Oldest classroom wins if a name is already duplicated
+    found = {}
+    for classroom_id, name in db.session.execute(
+        select(Classroom.id, Classroom.name).where(Classroom.name.in_(names)).order_by(Classroom.id.desc())
+    ):
+        found[name] = classroom_id
+    created = [Classroom(name=name) for name in sorted(names - set(found))]
+    if created:
+        db.session.add_all(created)
+        db.session.flush()
+        found.update({classroom.name: classroom.id for classroom in created})
+    return found
+
+
+def _records(fields, password_hash, classrooms):
+    user = User(
+        username=fields['username'],
+        email=fields['email'] or None,
+        password=password_hash,
+        role='student'
+    )
+    student = Student(
+        user=user,
+        full_name=fields['full_name'],
+        gender=fields['gender'] or None,
+        date_of_birth=fields['date_of_birth'],
+        parent_contact=fields['parent_contact'] or None,
+        classroom_id=fields['classroom_id'] or classrooms.get(fields['classroom'])
+    )
+    return user, student
+
+
+def _insert_batch(batch, classrooms):
+    """Insert one batch in one transaction; returns ``(created, errors)``.
+
+    If the batch conflicts with rows written meanwhile, each row is retried
+    on its own so only the conflicting ones fail.
+    """
+    try:
+        for number, fields, password_hash in batch:
+            db.session.add_all(_records(fields, password_hash, classrooms))
+        db.session.commit()
+        return len(batch), []
+    except IntegrityError:
+        db.session.rollback()
+
+    created, errors = 0, []
+    for number, fields, password_hash in batch:
+        try:
+            db.session.add_all(_records(fields, password_hash, classrooms))
+            db.session.commit()
+            created += 1
+        except IntegrityError:
+            db.session.rollback()
+            errors.append({"row": number, "username": fields['username'], "error": "username or email already exists"})
+    return created, errors
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_students(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Create a User and Student per row, yielding report events as it goes.
+
+    Events are dicts with an ``event`` of ``error`` (one per rejected row),
+    ``progress`` (after every committed batch) and a final ``done``. Passwords
+    are hashed on a thread pool while earlier batches are inserted.
+    """
+    total = len(rows)
+    valid, errors = validate(rows)
+    for error in errors:
+        yield {"event": "error", **error}
+
+    classrooms = resolve_classrooms(fields['classroom'] for _, fields in valid)
+    db.session.commit()
+
+    created, processed, failed = 0, len(errors), len(errors)
+    hashes = hash_many(fields['password'] for _, fields in valid)
+    hashed = ((number, fields, password_hash) for (number, fields), password_hash in zip(valid, hashes))
+    for batch in _batches(hashed, batch_size):
+        done, batch_errors = _insert_batch(batch, classrooms)
+        created, processed, failed = created + done, processed + len(batch), failed + len(batch_errors)
+        for error in batch_errors:
+            yield {"event": "error", **error}
+        yield {"event": "progress", "processed": processed, "total": total, "created": created}
+
+    yield {
+        "event": "done",
+        "rows_received": total,
+        "created": created,
+        "failed": failed,
+        "classrooms": len(classrooms)
+    }
+
+
+__all__ = [
+    "OnboardingError", "parse_csv", "parse_xlsx", "classroom_name", "validate",
+    "resolve_classrooms", "import_students"
+]
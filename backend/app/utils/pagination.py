@@ -0,0 +1,104 @@
+from datetime import datetime
+from flask import request, jsonify, make_response, abort
+from .json_provider import stream_json_array
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 500  # rows fetched per round trip when streaming an unpaged list
+
+
+def _bad_request(message):
+    abort(make_response(jsonify({"error": message}), 400))
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_bool(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _arg(name, convert):
+    raw = request.args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return convert(raw)
+    except (TypeError, ValueError):
+        _bad_request(f"Invalid value for '{name}': {raw}")
+
+
+def apply_filters(query, spec):
+    """Narrow ``query`` with the query-string filters described by ``spec``.
+
+    ``spec`` maps a parameter name to ``(converter, criterion_factory)``;
+    parameters absent from the request are ignored.
+    """
+    for name, (convert, criterion) in spec.items():
+        value = _arg(name, convert)
+        if value is not None:
+            query = query.filter(criterion(value))
+    return query
+
+
+def wants_page():
+    return 'limit' in request.args or 'after_id' in request.args
+
+
+def page_limit():
+    limit = _arg('limit', int)
+    if limit is None:
+        return DEFAULT_LIMIT
+    if limit < 1:
+        _bad_request("'limit' must be positive")
+    return min(limit, MAX_LIMIT)
+
+
+def keyset_page(query, id_column):
+    """Fetch one page ordered by ``id_column`` after ?after_id=, up to ?limit= rows.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    limit = page_limit()
+    after_id = _arg('after_id', int)
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], id_column.key)
+    return rows, None
+
+
+def paginate(query, id_column, serialize, overlay=None):
+    """Response for a list endpoint.
+
+    With ``?limit=`` or ``?after_id=`` the body is ``{items, next_cursor, limit}``;
+    otherwise it stays the plain array existing clients expect, streamed in
+    chunks as rows are fetched. Serializers with a ``many`` method render the
+    whole page at once, and a dict result (such as a normalized payload) is
+    merged into the envelope. ``overlay`` merges not-yet-written rows into the
+    id range each response covers.
+    """
+    render = getattr(serialize, 'many', None) or (lambda rows: [serialize(row) for row in rows])
+    if not wants_page():
+        rows = query.order_by(id_column).yield_per(STREAM_BATCH_SIZE)
+        if overlay is not None:
+            rows = overlay.apply(rows)
+        if getattr(serialize, 'normalized', False):
+            # The side table needs every row before anything can be written
+            return jsonify(render(list(rows)))
+        return stream_json_array(rows, serialize)
+
+    rows, next_cursor = keyset_page(query, id_column)
+    if overlay is not None:
+        rows = list(overlay.apply(rows, _arg('after_id', int), next_cursor))
+    body = render(rows)
+    if not isinstance(body, dict):
+        body = {"items": body}
+    return jsonify({**body, "next_cursor": next_cursor, "limit": page_limit()})
+
+
+__all__ = ["apply_filters", "keyset_page", "page_limit", "paginate", "parse_date", "parse_bool", "wants_page"]
@@ -0,0 +1,177 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from functools import lru_cache, partial
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+DEFAULT_QUEUE_LIMIT = 32
+DEFAULT_VERIFY_TIMEOUT = 10  # seconds
+
+_pool_lock = threading.Lock()
+
+
+# --- Hashing ---
+def password_method():
+    """Werkzeug hash method for new hashes, e.g. 'scrypt' or 'pbkdf2:sha256:600000'."""
+    return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    # Werkzeug expands defaults into the stored prefix ('scrypt' -> 'scrypt:32768:8:1')
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+def hash_password(password):
+    return generate_password_hash(password, password_method())
+
+
+def needs_rehash(password_hash):
+    """True when ``password_hash`` was made with a method or cost other than the configured one."""
+    return password_hash.split('$', 1)[0] != _method_prefix(password_method())
+
+
+def hash_workers():
+    return current_app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+
+
+def hash_many(passwords, workers=None):
+    """Yield the hash of each of ``passwords`` in order, computed across a thread pool.
+
+    Hashing is deliberately slow and CPU bound, so a batch is spread over
+    PASSWORD_HASH_WORKERS threads (default: one per CPU) instead of running
+    serially. hashlib releases the GIL while hashing, so the threads run in
+    parallel, and no worker process re-imports the app.
+    """
+    passwords = list(passwords)
+    generate = partial(generate_password_hash, method=password_method())
+    workers = min(workers or hash_workers(), len(passwords))
+    if workers <= 1:
+        yield from map(generate, passwords)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash') as pool:
+        yield from pool.map(generate, passwords)
+
+
+# --- Verification ---
+class Overloaded(Exception):
+    """The verification pool is full or too slow; the caller should retry later."""
+
+
+class VerificationPool:
+    """Bounded pool that runs password checks off the request threads.
+
+    At most ``workers`` checks run at once (hashlib releases the GIL while
+    hashing, so the threads run in parallel) and at most ``queue_limit`` more
+    wait. Further submissions are refused at once, so a login storm cannot
+    occupy every server thread and starve cheap requests.
+    """
+
+    def __init__(self, workers, queue_limit=DEFAULT_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-check')
+        self.lock = threading.Lock()
+        self.pending = 0  # submitted and not yet finished, running ones included
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _call(self, fn, args):
+        with self.lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+
+    def _finished(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def run(self, fn, *args, timeout=None):
+        """Run ``fn(*args)`` in the pool and wait for it; raises Overloaded."""
+        with self.lock:
+            if self.pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise Overloaded()
+            self.pending += 1
+        future = self.executor.submit(self._call, fn, args)
+        future.add_done_callback(self._finished)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            with self.lock:
+                self.timeouts += 1
+            raise Overloaded()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.running,
+                "queue_depth": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
+
+
+def verification_pool():
+    """The app's pool, created on first use; None when LOGIN_HASH_WORKERS is 0 (inline checks)."""
+    workers = current_app.config.get('LOGIN_HASH_WORKERS')
+    if workers == 0:
+        return None
+    pool = current_app.extensions.get('password_pool')
+    if pool is None:
+        with _pool_lock:
+            pool = current_app.extensions.get('password_pool')
+            if pool is None:
+                pool = current_app.extensions['password_pool'] = VerificationPool(
+                    workers or os.cpu_count() or 1,
+                    current_app.config.get('LOGIN_QUEUE_LIMIT', DEFAULT_QUEUE_LIMIT)
+                )
+    return pool
+
+
+def pool_snapshot():
+    pool = verification_pool()
+    return pool.snapshot() if pool is not None else {"workers": 0}
+
+
+def _run(fn, *args):
+    pool = verification_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.run(fn, *args, timeout=current_app.config.get('LOGIN_VERIFY_TIMEOUT', DEFAULT_VERIFY_TIMEOUT))
+
+
+def verify_password(user, password):
+    """Check ``password`` against ``user`` in the verification pool; raises Overloaded.
+
+    On success a hash made with an outdated method or cost is replaced with a
+    fresh one (also computed in the pool); the caller commits. When the pool
+    refuses the rehash the login still succeeds and the upgrade waits for a
+    later one.
+    """
+    if not _run(check_password_hash, user.password, password):
+        return False
+    if needs_rehash(user.password):
+        try:
+            user.password = _run(generate_password_hash, password, password_method())
+        except Overloaded:
+            pass
+    return True
+
+
+__all__ = [
+    "Overloaded", "VerificationPool", "hash_many", "hash_password", "hash_workers", "needs_rehash",
+    "password_method", "pool_snapshot", "verification_pool", "verify_password"
+]
@@ -0,0 +1,366 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import delete, event, select
+from sqlalchemy.exc import SQLAlchemyError
+from ..models import (
+    db, User, Student, Teacher, Classroom, Department, Subject, Exam, Result, Report, Fee,
+    StudentSummary, ResultsPublication, PublishedPayload
+)
+from . import analytics, student_summary
+from .json_provider import _dumpb
+from .serialization import loader_plan
+from .stats_snapshot import _changed, _previous, track
+from .upsert import upsert_rows
+
+KINDS = ('results', 'reports', 'dashboard')
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_TERM_TTL = 5  # seconds
+_PAYLOADS = PublishedPayload.__table__
+_PAYLOAD_KEY = ('student_id', 'term', 'kind')
+
+
+# --- Payloads ---
+# Each renderer returns what the matching /student endpoint sends without
+# query arguments, for many students at once, keyed by student id.
+def _grouped(model, student_ids):
+    rows = model.query.options(*loader_plan(model)) \
+        .filter(model.student_id.in_(student_ids)) \
+        .order_by(model.id).all()
+    payloads = {student_id: [] for student_id in student_ids}
+    for row in rows:
+        payloads[row.student_id].append(row.to_dict())
+    return payloads
+
+
+def dashboard(student_id):
+    """The /student/dashboard payload, or None if the student does not exist."""
+    # The student and their running summary, both by primary key, in one SELECT
+    row = db.session.execute(
+        select(Student, StudentSummary, analytics.subjects_examined(student_id))
+        .outerjoin(StudentSummary, StudentSummary.student_id == Student.id)
+        .where(Student.id == student_id)
+        .options(*loader_plan(Student))
+    ).first()
+    if not row:
+        return None
+    summary = row.StudentSummary or student_summary.summary_of(student_id)
+
+    # Newest exams first, walking the exam date index
+    recent_results = Result.query.options(*loader_plan(Result)) \
+        .join(Exam, Result.exam_id == Exam.id) \
+        .filter(Result.student_id == student_id) \
+        .order_by(Exam.date.desc(), Result.id.desc()) \
+        .limit(5).all()
+
+    return {
+        "student": row.Student.to_dict(),
+        "gpa": round(summary.average_score, 2),
+        "attendance_rate": round(analytics.attendance_rate(summary.attendance_present, summary.attendance_total), 1),
+        "total_subjects": row.total_subjects,
+        "unpaid_fees": summary.unpaid_fees,
+        "recent_results": [r.to_dict() for r in recent_results]
+    }
+
+
+def _dashboards(student_ids):
+    payloads = {}
+    for student_id in student_ids:
+        payload = dashboard(student_id)
+        if payload is not None:
+            payloads[student_id] = payload
+    return payloads
+
+
+RENDERERS = {
+    'results': lambda student_ids: _grouped(Result, student_ids),
+    'reports': lambda student_ids: _grouped(Report, student_ids),
+    'dashboard': _dashboards,
+}
+
+
+def data_versions(student_ids):
+    """Current data version of each of ``student_ids``; 0 for students without a summary."""
+    versions = dict.fromkeys(student_ids, 0)
+    versions.update(db.session.execute(
+        select(StudentSummary.student_id, StudentSummary.data_version)
+        .where(StudentSummary.student_id.in_(student_ids))
+    ).tuples().all())
+    return versions
+
+
+def _store(term, kind, payloads, versions):
+    """Encode and upsert ``payloads``; returns ``{student_id: (etag, body)}``. The caller commits."""
+    now = datetime.utcnow()
+    encoded, rows = {}, []
+    for student_id, payload in payloads.items():
+        body = _dumpb(payload)
+        etag = hashlib.sha256(body).hexdigest()
+        encoded[student_id] = (etag, body)
+        rows.append({
+            "student_id": student_id, "term": term, "kind": kind,
+            "data_version": versions[student_id], "etag": etag, "body": body, "rendered_at": now
+        })
+    if rows:
+        upsert_rows(db.session.connection(), _PAYLOADS, _PAYLOAD_KEY, rows,
+                    ['data_version', 'etag', 'body', 'rendered_at'])
+    return encoded
+
+
+def render_batch(term, student_ids):
+    """Render and store every kind of payload for ``student_ids``. The caller commits.
+
+    Versions are read before rendering, so a write that lands meanwhile
+    leaves the payload a version behind and it is rendered again on demand.
+    """
+    versions = data_versions(student_ids)
+    for kind in KINDS:
+        _store(term, kind, RENDERERS[kind](student_ids), versions)
+
+
+# --- Publishing ---
+def publish(publication_id, batch_size=None):
+    """Render every student's payloads for a publication, committing per batch.
+
+    The term goes live once all batches are stored; payloads of other terms
+    are then dropped.
+    """
+    batch_size = batch_size or current_app.config.get('PUBLISH_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    publication = db.session.get(ResultsPublication, publication_id)
+    term = publication.term
+    student_ids = db.session.execute(select(Student.id).order_by(Student.id)).scalars().all()
+    publication.students = len(student_ids)
+    db.session.commit()
+
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        render_batch(term, batch)
+        db.session.get(ResultsPublication, publication_id).rendered = start + len(batch)
+        db.session.commit()
+        db.session.expunge_all()  # keep the identity map to one batch
+
+    publication = db.session.get(ResultsPublication, publication_id)
+    publication.status = 'published'
+    publication.published_at = datetime.utcnow()
+    db.session.execute(delete(_PAYLOADS).where(_PAYLOADS.c.term != term))
+    db.session.commit()
+    invalidate()  # other processes see the new term within PUBLISHED_TERM_TTL
+    return publication
+
+
+def mark_failed(publication_id, error):
+    """Record why a publication stopped; its term never went live."""
+    db.session.rollback()
+    publication = db.session.get(ResultsPublication, publication_id)
+    publication.status = 'failed'
+    publication.error = str(error)[:255]
+    db.session.commit()
+
+
+class _PublishState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='publish-results')
+        self.running = None
+
+
+def _state(app):
+    return app.extensions.setdefault('results_publishing', _PublishState())
+
+
+def _run_in_background(app, state, publication_id):
+    with app.app_context():
+        try:
+            publish(publication_id)
+        except Exception as e:
+            mark_failed(publication_id, e)
+        finally:
+            db.session.remove()
+            with state.lock:
+                state.running = None
+
+
+def start_publication(term):
+    """Queue the rendering of ``term`` off the request thread.
+
+    Returns ``(publication, started)``; ``started`` is False when a
+    publication is already rendering.
+    """
+    app = current_app._get_current_object()
+    state = _state(app)
+    with state.lock:
+        if state.running is not None:
+            return db.session.get(ResultsPublication, state.running), False
+        publication = ResultsPublication(term=term, status='rendering')
+        db.session.add(publication)
+        db.session.commit()
+        state.running = publication.id
+    state.executor.submit(_run_in_background, app, state, publication.id)
+    return publication, True
+
+
+# --- Serving ---
+class _TermCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.term = None
+        self.expires_at = 0.0
+
+
+def _terms():
+    return current_app.extensions.setdefault('published_term', _TermCache())
+
+
+def published_term():
+    """Term of the latest finished publication, re-read every PUBLISHED_TERM_TTL seconds."""
+    ttl = current_app.config.get('PUBLISHED_TERM_TTL', DEFAULT_TERM_TTL)
+    cache = _terms()
+    if time.monotonic() < cache.expires_at:
+        return cache.term
+
+    with cache.lock:
+        if time.monotonic() < cache.expires_at:
+            return cache.term
+        cache.term = db.session.execute(
+            select(ResultsPublication.term)
+            .where(ResultsPublication.status == 'published')
+            .order_by(ResultsPublication.published_at.desc(), ResultsPublication.id.desc())
+            .limit(1)
+        ).scalar()
+        cache.expires_at = time.monotonic() + ttl
+        return cache.term
+
+
+def invalidate():
+    _terms().expires_at = 0.0
+
+
+def _respond(etag, body):
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def serve(kind, student_id):
+    """Published ``kind`` payload of a student as a conditional response.
+
+    Returns None when no term is published or the request has query
+    arguments; the endpoint then renders as usual. A payload rendered from
+    an older data version is rendered again and stored before it is served.
+    """
+    if request.args:
+        return None
+    term = published_term()
+    if term is None:
+        return None
+
+    version = data_versions([student_id])[student_id]
+    row = db.session.execute(
+        select(PublishedPayload.data_version, PublishedPayload.etag, PublishedPayload.body)
+        .where(PublishedPayload.student_id == student_id, PublishedPayload.term == term,
+               PublishedPayload.kind == kind)
+    ).first()
+    if row is not None and row.data_version == version:
+        return _respond(row.etag, row.body)
+
+    payloads = RENDERERS[kind]([student_id])
+    if student_id not in payloads:
+        return None
+    try:
+        etag, body = _store(term, kind, payloads, {student_id: version})[student_id]
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        body = _dumpb(payloads[student_id])
+        etag = hashlib.sha256(body).hexdigest()
+    return _respond(etag, body)
+
+
+# --- Invalidation ---
+# Totals kept by the student summary advance its data version on every write;
+# the listeners below cover the rest of what the payloads embed. Changes to
+# shared rows (exams, subjects, teachers, ...) drop every stored payload.
+# Attributes of shared rows that appear in the payloads
+_SHARED = {
+    Exam: ('name', 'date', 'subject_id'),
+    Subject: ('name', 'teacher_id', 'classroom_id', 'department_id'),
+    Teacher: ('user_id', 'full_name', 'image_url', 'department_id'),
+    Classroom: ('name',),
+    Department: ('name',),
+}
+
+
+track(Report, 'student_id')
+
+
+def _drop_all(connection):
+    connection.execute(delete(_PAYLOADS))
+
+
+@event.listens_for(Result, 'after_update')
+def _result_moved(mapper, connection, target):
+    if _changed(target, 'exam_id', 'report_id'):
+        student_summary.bump(connection, [target.student_id])
+
+
+@event.listens_for(Report, 'after_insert')
+def _report_inserted(mapper, connection, target):
+    student_summary.bump(connection, [target.student_id])
+
+
+@event.listens_for(Report, 'after_update')
+def _report_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'term', 'year', 'image_url'):
+        student_summary.bump(connection, [_previous(target, 'student_id'), target.student_id])
+
+
+@event.listens_for(Report, 'after_delete')
+def _report_deleted(mapper, connection, target):
+    student_summary.bump(connection, [_previous(target, 'student_id')])
+
+
+@event.listens_for(Fee, 'after_update')
+def _fee_moved(mapper, connection, target):
+    if _changed(target, 'term', 'due_date', 'report_id'):
+        student_summary.bump(connection, [target.student_id])
+
+
+@event.listens_for(Student, 'after_update')
+def _student_updated(mapper, connection, target):
+    if _changed(target, *(column.key for column in Student.__table__.columns)):
+        student_summary.bump(connection, [target.id])
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    if _changed(target, 'username', 'email', 'role'):
+        _drop_all(connection)
+
+
+@event.listens_for(Exam, 'after_update')
+@event.listens_for(Subject, 'after_update')
+@event.listens_for(Teacher, 'after_update')
+@event.listens_for(Classroom, 'after_update')
+@event.listens_for(Department, 'after_update')
+def _shared_updated(mapper, connection, target):
+    if _changed(target, *_SHARED[mapper.class_]):
+        _drop_all(connection)
+
+
+@event.listens_for(Exam, 'after_delete')
+@event.listens_for(Subject, 'after_delete')
+@event.listens_for(Teacher, 'after_delete')
+@event.listens_for(Classroom, 'after_delete')
+@event.listens_for(Department, 'after_delete')
+def _shared_deleted(mapper, connection, target):
+    _drop_all(connection)
+
+
+__all__ = [
+    "KINDS", "RENDERERS", "dashboard", "data_versions", "render_batch", "publish", "mark_failed", "start_publication",
+    "published_term", "invalidate", "serve"
+]
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from ..models import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(budget=None):
+    """Count SQL statements executed on the app engine inside the block.
+
+    When ``budget`` is given, raise ``QueryBudgetExceeded`` if the block
+    issued more statements than allowed.
+    """
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._record)
+
+    if budget is not None and counter.count > budget:
+        raise QueryBudgetExceeded(
+            f"Expected at most {budget} queries, got {counter.count}:\n" + "\n".join(counter.statements)
+        )
+
+
+__all__ = ["count_queries", "QueryCounter", "QueryBudgetExceeded"]
@@ -0,0 +1,130 @@
+from sqlalchemy import delete, func, inspect, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.schema import CreateColumn
+from ..models import db, Exam, Result
+
+
+def _drop_duplicates(connection, table, index, apply):
+    """Rows sharing a key of a unique index, bar the newest; removed when ``apply``.
+
+    Rows with a NULL key column never conflict and are left alone.
+    """
+    columns = list(index.columns)
+    complete = [column.isnot(None) for column in columns]
+    keep = select(func.max(table.c.id)).where(*complete).group_by(*columns)
+    duplicates = [table.c.id.not_in(keep), *complete]
+    if not apply:
+        return connection.execute(select(func.count()).select_from(table).where(*duplicates)).scalar()
+    return connection.execute(delete(table).where(*duplicates)).rowcount
+
+
+def _merge_duplicate_exams(connection, table, index, apply):
+    """Exams sharing a subject and name, bar the oldest; folded into it when ``apply``.
+
+    Results of the folded exams move to the one kept.
+    """
+    exams = Exam.__table__
+    groups = connection.execute(
+        select(exams.c.subject_id, exams.c.name, func.min(exams.c.id), func.count(exams.c.id))
+        .where(exams.c.subject_id.isnot(None), exams.c.name.isnot(None))
+        .group_by(exams.c.subject_id, exams.c.name)
+        .having(func.count(exams.c.id) > 1)
+    ).all()
+    if not apply:
+        return sum(count - 1 for *_, count in groups)
+    removed = 0
+    for subject_id, name, keep, _ in groups:
+        duplicates = select(exams.c.id).where(
+            exams.c.subject_id == subject_id, exams.c.name == name, exams.c.id != keep
+        )
+        connection.execute(
+            update(Result.__table__).where(Result.__table__.c.exam_id.in_(duplicates)).values(exam_id=keep)
+        )
+        removed += connection.execute(delete(exams).where(exams.c.id.in_(duplicates))).rowcount
+    return removed
+
+
+# Unique indexes whose duplicates must be merged rather than dropped
+_MERGES = {
+    'uq_exam_subject_name': _merge_duplicate_exams,
+}
+
+
+def _missing_indexes(connection):
+    """``(table, index)`` for each index declared on the models but absent from the database."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        missing.extend((table, index) for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def ensure_columns():
+    """Add columns declared on the models that an older database's tables lack.
+
+    Like indexes, columns added to existing models are skipped by
+    ``db.create_all``. New columns must be nullable or carry a server default.
+    Returns the names of the columns added.
+    """
+    added = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                spec = CreateColumn(column).compile(dialect=connection.dialect)
+                table_name = connection.dialect.identifier_preparer.format_table(table)
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {spec}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def deduplicate(apply=False):
+    """Rows blocking each missing unique index, as ``{index name: rows}``.
+
+    By default only counts them. With ``apply`` they are merged or removed
+    (keeping the newest row, or the oldest exam) in one transaction; the
+    caller then rebuilds the aggregates that counted them.
+    """
+    found = {}
+    with db.engine.begin() as connection:
+        for table, index in _missing_indexes(connection):
+            if index.unique and 'id' in table.c:
+                rows = _MERGES.get(index.name, _drop_duplicates)(connection, table, index, apply)
+                if rows:
+                    found[index.name] = rows
+    return found
+
+
+def ensure_indexes():
+    """Create indexes declared on the models that an older database is missing.
+
+    ``db.create_all`` skips tables that already exist, so indexes added to
+    existing models would otherwise only appear on fresh databases. Existing
+    rows are never changed here: an index that cannot be created raises
+    RuntimeError. Returns the names of the indexes created.
+    """
+    created = []
+    with db.engine.begin() as connection:
+        for table, index in _missing_indexes(connection):
+            try:
+                index.create(connection)
+            except IntegrityError as e:
+                raise RuntimeError(
+                    f"Cannot create unique index {index.name} on {table.name}: existing rows share a key. "
+                    "Review them with `ENSURE_INDEXES=0 flask schema dedupe` and remove them with "
+                    "`ENSURE_INDEXES=0 flask schema dedupe --apply`."
+                ) from e
+            except SQLAlchemyError as e:
+                raise RuntimeError(f"Cannot create index {index.name} on {table.name}: {e}") from e
+            created.append(index.name)
+    return created
@@ -0,0 +1,160 @@
+from flask import request, current_app, jsonify, make_response, abort
+from sqlalchemy.orm import selectinload, raiseload
+from ..models import (
+    User, Student, Teacher, Classroom, Department, Subject, Exam,
+    Result, Attendance, Fee, Report, Enrollment
+)
+
+# Relationships each model's to_dict() embeds, and the model they point at.
+# Loader plans are derived from this map so they always match what is emitted.
+RELATIONS = {
+    Student: {'user': User, 'classroom': Classroom},
+    Teacher: {'user': User, 'department': Department},
+    Subject: {'teacher': Teacher, 'department': Department},
+    Exam: {'subject': Subject},
+    Result: {'exam': Exam, 'student': Student},
+    Attendance: {'student': Student, 'teacher': Teacher},
+    Enrollment: {'student': Student, 'subject': Subject},
+    Report: {'student': Student, 'results': Result, 'fee_statement': Fee},
+}
+
+
+def _strict():
+    return current_app.config.get('SQLALCHEMY_RAISELOAD', False)
+
+
+def loader_plan(model, include=None, strict=None):
+    """Loader options that fetch exactly the relationships ``model.to_dict`` emits.
+
+    Every relationship path is loaded with ``selectinload`` so a list costs one
+    query per path regardless of its length, and shared parents (the same
+    teacher or department on many rows) are fetched once. With ``strict`` any
+    relationship outside the plan raises instead of lazy loading.
+    """
+    strict = _strict() if strict is None else strict
+    options = []
+    for name, related in RELATIONS.get(model, {}).items():
+        if include is not None and name not in include:
+            continue
+        options.append(selectinload(getattr(model, name)).options(*loader_plan(related, None, strict)))
+    if strict:
+        options.append(raiseload('*'))
+    return options
+
+
+def _csv_arg(name):
+    raw = request.args.get(name)
+    if raw is None:
+        return None
+    return {part.strip() for part in raw.split(',') if part.strip()}
+
+
+def sparse_args(model):
+    """Parse ``?fields=`` and ``?include=`` for ``model``.
+
+    ``include`` names the relationships to embed; when only ``fields`` is
+    given, the relationships listed there are embedded. Neither means the
+    full nested representation.
+    """
+    fields = _csv_arg('fields')
+    include = _csv_arg('include')
+    relations = RELATIONS.get(model, {})
+
+    if include is None and fields is not None:
+        include = fields & set(relations)
+    if include is not None:
+        unknown = include - set(relations)
+        if unknown:
+            abort(make_response(jsonify({
+                "error": f"Cannot include {', '.join(sorted(unknown))}; "
+                         f"available: {', '.join(relations) or 'none'}"
+            }), 400))
+        if fields is not None:
+            fields |= include
+    return fields, include
+
+
+# Type names used as keys of the normalized ``included`` side table
+TYPE_NAMES = {
+    User: 'users', Student: 'students', Teacher: 'teachers', Classroom: 'classrooms',
+    Department: 'departments', Subject: 'subjects', Exam: 'exams', Result: 'results',
+    Attendance: 'attendance', Fee: 'fees', Report: 'reports', Enrollment: 'enrollments',
+}
+
+
+def wants_normalized():
+    return request.args.get('normalize', '').lower() in ('1', 'true', 'yes')
+
+
+def _flat(obj, model):
+    # Foreign keys only; related entities go to the side table
+    return obj.to_dict(set()) if model in RELATIONS else obj.to_dict()
+
+
+def normalize(objects, model, fields=None, include=None):
+    """JSON:API-style payload: flat rows plus each related entity exactly once.
+
+    Returns ``{"data": [...], "included": {type: {id: entity}}}``.
+    """
+    included = {}
+
+    def visit(obj, obj_model, relations):
+        for name, related_model in RELATIONS.get(obj_model, {}).items():
+            if relations is not None and name not in relations:
+                continue
+            value = getattr(obj, name)
+            children = value if isinstance(value, list) else ([value] if value is not None else [])
+            bucket = included.setdefault(TYPE_NAMES[related_model], {})
+            for child in children:
+                key = str(child.id)
+                if key in bucket:
+                    continue
+                bucket[key] = _flat(child, related_model)
+                visit(child, related_model, None)
+
+    data = []
+    for obj in objects:
+        row = _flat(obj, model)
+        if fields is not None:
+            row = {key: value for key, value in row.items() if key in fields}
+        data.append(row)
+        visit(obj, model, include)
+    return {"data": data, "included": included}
+
+
+class Serializer:
+    """Per-request row serializer honouring ``?fields=``, ``?include=`` and ``?normalize=``."""
+
+    def __init__(self, model, fields=None, include=None, normalized=False):
+        self.model = model
+        self.fields = fields
+        self.include = include
+        self.normalized = normalized
+
+    def __call__(self, obj):
+        if self.include is not None and self.model in RELATIONS:
+            data = obj.to_dict(self.include)
+        else:
+            data = obj.to_dict()
+        if self.fields is not None:
+            data = {key: value for key, value in data.items() if key in self.fields}
+        return data
+
+    def many(self, objects):
+        if self.normalized:
+            return normalize(objects, self.model, self.fields, self.include)
+        return [self(obj) for obj in objects]
+
+
+def prepare(query, model, normalizable=False):
+    """Attach the request's loader plan to ``query`` and return ``(query, serialize)``.
+
+    Endpoints that pass ``normalizable=True`` honour ``?normalize=1`` through
+    ``serialize.many``.
+    """
+    fields, include = sparse_args(model)
+    serialize = Serializer(model, fields, include, normalizable and wants_normalized())
+    return query.options(*loader_plan(model, include)), serialize
+
+
+__all__ = ["RELATIONS", "TYPE_NAMES", "Serializer", "loader_plan", "normalize", "prepare", "sparse_args", "wants_normalized"]
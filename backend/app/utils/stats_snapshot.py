@@ -0,0 +1,400 @@
+import math
+from sqlalchemy import event, select, func, case, inspect, or_
+from sqlalchemy.orm import Session
+from ..models import (
+    db, Result, Exam, Subject, Student, Attendance, Fee, FeePayment,
+    DepartmentResultStats, TeacherAttendanceStats, ClassroomAttendanceStats, SchoolStats
+)
+from .upsert import accumulate, increment, increment_many, replace_rows
+
+SCHOOL_ROW = 1
+
+_DEPARTMENTS = DepartmentResultStats.__table__
+_TEACHERS = TeacherAttendanceStats.__table__
+_CLASSROOMS = ClassroomAttendanceStats.__table__
+_SCHOOL = SchoolStats.__table__
+
+_PRESENT = case((Attendance.status == 'present', 1), else_=0)
+
+
+# --- Helpers ---
+# Listeners patch aggregates with the difference between an attribute's old
+# and new value. After a commit every attribute is expired, and by default
+# assigning to an expired attribute does not load the value it replaces, so
+# the listeners would only ever add. Tracked attributes load it first.
+_TRACKED = {}
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+
+def track(model, *attrs):
+    """Keep the pre-flush value of ``attrs`` available to ``_previous``.
+
+    Every attribute an update or delete listener reads through ``_previous``
+    must be tracked.
+    """
+    for attr in attrs:
+        if attr not in _TRACKED.setdefault(model, set()):
+            event.listen(getattr(model, attr), 'set', _keep_previous, active_history=True, retval=True)
+            _TRACKED[model].add(attr)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_tracked(session, flush_context, instances):
+    # Rows being deleted are read by the after_delete listeners once they are
+    # gone from the database; load their expired tracked values while they exist
+    for target in session.deleted:
+        unloaded = inspect(target).unloaded & _TRACKED.get(type(target), set())
+        if unloaded:
+            session.refresh(target, attribute_names=list(unloaded))
+
+
+def _previous(target, attr):
+    """Value of ``attr`` as it was before the pending flush."""
+    history = inspect(target).attrs[attr].history
+    if history.has_changes():
+        return history.deleted[0] if history.deleted else None
+    return getattr(target, attr)
+
+
+def _changed(target, *attrs):
+    state = inspect(target)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _department_of_subject(connection, subject_id):
+    if subject_id is None:
+        return None
+    return connection.execute(
+        select(Subject.department_id).where(Subject.id == subject_id)
+    ).scalar()
+
+
+def _department_of_exam(connection, exam_id):
+    if exam_id is None:
+        return None
+    return connection.execute(
+        select(Subject.department_id).join(Exam, Exam.subject_id == Subject.id).where(Exam.id == exam_id)
+    ).scalar()
+
+
+def _classrooms_of(connection, student_ids):
+    keys = {k for k in student_ids if k is not None}
+    if not keys:
+        return {}
+    return dict(connection.execute(
+        select(Student.id, Student.classroom_id).where(Student.id.in_(keys))
+    ).tuples().all())
+
+
+# Attendance is patched in signed marks, (student_id, teacher_id, date, status, sign),
+# shared by the listeners here, the rollups, the summaries and bulk writes
+_MARK = ('student_id', 'teacher_id', 'date', 'status')
+
+
+def _mark(target, sign):
+    """``target`` as a mark: its current values for +1, its values before the flush for -1."""
+    if sign > 0:
+        return (*(getattr(target, attr) for attr in _MARK), sign)
+    return (*(_previous(target, attr) for attr in _MARK), sign)
+
+
+track(Result, 'score', 'exam_id')
+track(Attendance, *_MARK)
+track(Fee, 'amount_due', 'amount_paid', 'is_paid')
+track(FeePayment, 'amount', 'status')
+track(Exam, 'subject_id')
+track(Subject, 'department_id')
+track(Student, 'classroom_id')
+
+
+# --- Fresh aggregates (used by rebuild, refresh and the consistency check) ---
+def _department_rows(connection, department_ids=None):
+    stmt = select(
+        Subject.department_id.label('department_id'),
+        func.coalesce(func.sum(Result.score), 0.0).label('score_sum'),
+        func.count(Result.score).label('score_count')
+    ).select_from(Result) \
+     .join(Exam, Result.exam_id == Exam.id) \
+     .join(Subject, Exam.subject_id == Subject.id) \
+     .where(Subject.department_id.isnot(None))
+    if department_ids is not None:
+        stmt = stmt.where(Subject.department_id.in_(department_ids))
+    stmt = stmt.group_by(Subject.department_id)
+    return [dict(row) for row in connection.execute(stmt).mappings()]
+
+
+def _teacher_rows(connection, teacher_ids=None):
+    stmt = select(
+        Attendance.teacher_id.label('teacher_id'),
+        func.sum(_PRESENT).label('present_count'),
+        func.count(Attendance.id).label('total_count')
+    ).where(Attendance.teacher_id.isnot(None))
+    if teacher_ids is not None:
+        stmt = stmt.where(Attendance.teacher_id.in_(teacher_ids))
+    stmt = stmt.group_by(Attendance.teacher_id)
+    return [dict(row) for row in connection.execute(stmt).mappings()]
+
+
+def _classroom_rows(connection, classroom_ids=None):
+    stmt = select(
+        Student.classroom_id.label('classroom_id'),
+        func.sum(_PRESENT).label('present_count'),
+        func.count(Attendance.id).label('total_count')
+    ).join(Student, Attendance.student_id == Student.id) \
+     .where(Student.classroom_id.isnot(None))
+    if classroom_ids is not None:
+        stmt = stmt.where(Student.classroom_id.in_(classroom_ids))
+    stmt = stmt.group_by(Student.classroom_id)
+    return [dict(row) for row in connection.execute(stmt).mappings()]
+
+
+def _school_row(connection):
+    stmt = select(
+        select(func.coalesce(func.sum(Fee.amount_due), 0.0)).scalar_subquery().label('fees_due'),
+        select(func.coalesce(func.sum(Fee.amount_paid), 0.0)).scalar_subquery().label('fees_paid'),
+        select(func.count(Fee.id)).where(
+            or_(Fee.is_paid == False, Fee.is_paid.is_(None))  # noqa: E712
+        ).scalar_subquery().label('unpaid_fees'),
+        select(func.coalesce(func.sum(FeePayment.amount), 0.0)).where(
+            FeePayment.status == 'completed'
+        ).scalar_subquery().label('payments_completed'),
+        select(func.coalesce(func.sum(_PRESENT), 0)).scalar_subquery().label('attendance_present'),
+        select(func.count(Attendance.id)).scalar_subquery().label('attendance_total')
+    )
+    row = dict(connection.execute(stmt).mappings().one())
+    row['id'] = SCHOOL_ROW
+    return row
+
+
+# --- Maintenance ---
+def refresh_departments(connection, department_ids):
+    keys = [k for k in set(department_ids) if k is not None]
+    replace_rows(connection, _DEPARTMENTS, 'department_id', _department_rows(connection, keys), keys)
+
+
+def refresh_teachers(connection, teacher_ids):
+    keys = [k for k in set(teacher_ids) if k is not None]
+    replace_rows(connection, _TEACHERS, 'teacher_id', _teacher_rows(connection, keys), keys)
+
+
+def refresh_classrooms(connection, classroom_ids):
+    keys = [k for k in set(classroom_ids) if k is not None]
+    replace_rows(connection, _CLASSROOMS, 'classroom_id', _classroom_rows(connection, keys), keys)
+
+
+def refresh_school_totals(connection):
+    replace_rows(connection, _SCHOOL, 'id', [_school_row(connection)], [SCHOOL_ROW])
+
+
+def rebuild(connection=None):
+    """Recompute every snapshot table from the fact tables. The caller commits."""
+    connection = connection or db.session.connection()
+    replace_rows(connection, _DEPARTMENTS, 'department_id', _department_rows(connection))
+    replace_rows(connection, _TEACHERS, 'teacher_id', _teacher_rows(connection))
+    replace_rows(connection, _CLASSROOMS, 'classroom_id', _classroom_rows(connection))
+    replace_rows(connection, _SCHOOL, 'id', [_school_row(connection)])
+
+
+def ensure_seeded():
+    """Build the snapshot once for databases that predate it."""
+    if db.session.get(SchoolStats, SCHOOL_ROW) is None:
+        rebuild()
+        db.session.commit()
+
+
+def _compare(name, key_column, expected_rows, actual_rows):
+    expected = {row[key_column]: row for row in expected_rows}
+    actual = {row[key_column]: row for row in actual_rows}
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, {})
+        have = actual.get(key, {})
+        for column in set(want) | set(have):
+            if column == key_column:
+                continue
+            a, b = float(want.get(column) or 0), float(have.get(column) or 0)
+            if not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6):
+                mismatches.append({
+                    "table": name, "key": key, "column": column,
+                    "expected": a, "actual": b
+                })
+    return mismatches
+
+
+def check(connection=None):
+    """Compare the snapshot with a fresh aggregate; returns a list of mismatches."""
+    connection = connection or db.session.connection()
+
+    def snapshot(table):
+        return [dict(row) for row in connection.execute(select(table)).mappings()]
+
+    return (
+        _compare(_DEPARTMENTS.name, 'department_id', _department_rows(connection), snapshot(_DEPARTMENTS)) +
+        _compare(_TEACHERS.name, 'teacher_id', _teacher_rows(connection), snapshot(_TEACHERS)) +
+        _compare(_CLASSROOMS.name, 'classroom_id', _classroom_rows(connection), snapshot(_CLASSROOMS)) +
+        _compare(_SCHOOL.name, 'id', [_school_row(connection)], snapshot(_SCHOOL))
+    )
+
+
+# --- Reads ---
+def school_totals():
+    row = db.session.get(SchoolStats, SCHOOL_ROW)
+    if row is None:
+        return {column.name: 0 for column in _SCHOOL.columns if column.name != 'id'}
+    return row.to_dict()
+
+
+# --- Write-time listeners ---
+def _apply_result(connection, exam_id, score, sign):
+    if score is None:
+        return
+    department_id = _department_of_exam(connection, exam_id)
+    if department_id is None:
+        return
+    increment(connection, _DEPARTMENTS, {'department_id': department_id},
+              {'score_sum': sign * score, 'score_count': sign})
+
+
+@event.listens_for(Result, 'after_insert')
+def _result_inserted(mapper, connection, target):
+    _apply_result(connection, target.exam_id, target.score, 1)
+
+
+@event.listens_for(Result, 'after_update')
+def _result_updated(mapper, connection, target):
+    if _changed(target, 'score', 'exam_id'):
+        _apply_result(connection, _previous(target, 'exam_id'), _previous(target, 'score'), -1)
+        _apply_result(connection, target.exam_id, target.score, 1)
+
+
+@event.listens_for(Result, 'after_delete')
+def _result_deleted(mapper, connection, target):
+    _apply_result(connection, _previous(target, 'exam_id'), _previous(target, 'score'), -1)
+
+
+def apply_marks(connection, marks, classrooms=None):
+    """Patch the attendance snapshots with signed attendance ``marks``.
+
+    ``classrooms`` maps student ids to classroom ids; it is looked up when
+    omitted.
+    """
+    if classrooms is None:
+        classrooms = _classrooms_of(connection, (mark[0] for mark in marks))
+    teachers, rooms, school = {}, {}, {}
+    for student_id, teacher_id, _, status, sign in marks:
+        present = sign if status == 'present' else 0
+        deltas = {'present_count': present, 'total_count': sign}
+        if teacher_id is not None:
+            accumulate(teachers, (teacher_id,), deltas)
+        if classrooms.get(student_id) is not None:
+            accumulate(rooms, (classrooms[student_id],), deltas)
+        accumulate(school, (SCHOOL_ROW,), {'attendance_present': present, 'attendance_total': sign})
+    increment_many(connection, _TEACHERS, ('teacher_id',), teachers)
+    increment_many(connection, _CLASSROOMS, ('classroom_id',), rooms)
+    increment_many(connection, _SCHOOL, ('id',), school)
+
+
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_update')
+def _attendance_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'teacher_id', 'status'):
+        apply_marks(connection, [_mark(target, -1), _mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_deleted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, -1)])
+
+
+def _apply_fee(connection, amount_due, amount_paid, is_paid, sign):
+    increment(connection, _SCHOOL, {'id': SCHOOL_ROW}, {
+        'fees_due': sign * (amount_due or 0.0),
+        'fees_paid': sign * (amount_paid or 0.0),
+        'unpaid_fees': 0 if is_paid else sign
+    })
+
+
+@event.listens_for(Fee, 'after_insert')
+def _fee_inserted(mapper, connection, target):
+    _apply_fee(connection, target.amount_due, target.amount_paid, target.is_paid, 1)
+
+
+@event.listens_for(Fee, 'after_update')
+def _fee_updated(mapper, connection, target):
+    if _changed(target, 'amount_due', 'amount_paid', 'is_paid'):
+        _apply_fee(connection, _previous(target, 'amount_due'), _previous(target, 'amount_paid'),
+                   _previous(target, 'is_paid'), -1)
+        _apply_fee(connection, target.amount_due, target.amount_paid, target.is_paid, 1)
+
+
+@event.listens_for(Fee, 'after_delete')
+def _fee_deleted(mapper, connection, target):
+    _apply_fee(connection, _previous(target, 'amount_due'), _previous(target, 'amount_paid'),
+               _previous(target, 'is_paid'), -1)
+
+
+def _apply_payment(connection, amount, status, sign):
+    if status == 'completed':
+        increment(connection, _SCHOOL, {'id': SCHOOL_ROW}, {'payments_completed': sign * (amount or 0.0)})
+
+
+@event.listens_for(FeePayment, 'after_insert')
+def _payment_inserted(mapper, connection, target):
+    _apply_payment(connection, target.amount, target.status, 1)
+
+
+@event.listens_for(FeePayment, 'after_update')
+def _payment_updated(mapper, connection, target):
+    if _changed(target, 'amount', 'status'):
+        _apply_payment(connection, _previous(target, 'amount'), _previous(target, 'status'), -1)
+        _apply_payment(connection, target.amount, target.status, 1)
+
+
+@event.listens_for(FeePayment, 'after_delete')
+def _payment_deleted(mapper, connection, target):
+    _apply_payment(connection, _previous(target, 'amount'), _previous(target, 'status'), -1)
+
+
+# Structural changes move whole groups of facts between snapshot keys; those
+# groups are recomputed rather than patched.
+@event.listens_for(Exam, 'after_update')
+def _exam_updated(mapper, connection, target):
+    if _changed(target, 'subject_id'):
+        refresh_departments(connection, [
+            _department_of_subject(connection, _previous(target, 'subject_id')),
+            _department_of_subject(connection, target.subject_id)
+        ])
+
+
+@event.listens_for(Exam, 'after_delete')
+def _exam_deleted(mapper, connection, target):
+    refresh_departments(connection, [_department_of_subject(connection, _previous(target, 'subject_id'))])
+
+
+@event.listens_for(Subject, 'after_update')
+def _subject_updated(mapper, connection, target):
+    if _changed(target, 'department_id'):
+        refresh_departments(connection, [_previous(target, 'department_id'), target.department_id])
+
+
+@event.listens_for(Subject, 'after_delete')
+def _subject_deleted(mapper, connection, target):
+    refresh_departments(connection, [_previous(target, 'department_id')])
+
+
+@event.listens_for(Student, 'after_update')
+def _student_updated(mapper, connection, target):
+    if _changed(target, 'classroom_id'):
+        refresh_classrooms(connection, [_previous(target, 'classroom_id'), target.classroom_id])
+
+
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    refresh_classrooms(connection, [_previous(target, 'classroom_id')])
@@ -0,0 +1,250 @@
+import math
+from sqlalchemy import event, select, func, case, or_
+from ..models import db, Result, Attendance, Fee, FeePayment, Student, StudentSummary
+from .stats_snapshot import _changed, _mark, _previous, track
+from .upsert import accumulate, increment, increment_many, replace_rows
+
+_SUMMARY = StudentSummary.__table__
+_COLUMNS = [column.name for column in _SUMMARY.columns if column.name != 'student_id']
+_TOTALS = [column for column in _COLUMNS if column != 'data_version']
+_PRESENT = case((Attendance.status == 'present', 1), else_=0)
+_UNPAID = case((or_(Fee.is_paid == False, Fee.is_paid.is_(None)), 1), else_=0)  # noqa: E712
+
+
+# --- Fresh aggregates ---
+def _grouped(student_column, student_ids, *columns):
+    stmt = select(student_column.label('student_id'), *columns).where(student_column.isnot(None))
+    if student_ids is not None:
+        stmt = stmt.where(student_column.in_(student_ids))
+    return stmt.group_by(student_column)
+
+
+def _summary_rows(connection, student_ids=None):
+    """One row per student with facts, merged from a grouped query per fact table."""
+    statements = [
+        _grouped(Result.student_id, student_ids,
+                 func.coalesce(func.sum(Result.score), 0.0).label('score_sum'),
+                 func.count(Result.score).label('score_count')),
+        _grouped(Attendance.student_id, student_ids,
+                 func.sum(_PRESENT).label('attendance_present'),
+                 func.count(Attendance.id).label('attendance_total')),
+        _grouped(Fee.student_id, student_ids,
+                 func.coalesce(func.sum(Fee.amount_due), 0.0).label('fees_due'),
+                 func.coalesce(func.sum(Fee.amount_paid), 0.0).label('fees_paid'),
+                 func.sum(_UNPAID).label('unpaid_fees')),
+        _grouped(FeePayment.student_id, student_ids,
+                 func.coalesce(func.sum(FeePayment.amount), 0.0).label('payments_completed'))
+        .where(FeePayment.status == 'completed'),
+    ]
+    rows = {}
+    for stmt in statements:
+        for row in connection.execute(stmt).mappings():
+            merged = rows.setdefault(row['student_id'], dict.fromkeys(_TOTALS, 0))
+            merged.update({key: value or 0 for key, value in row.items()})
+    return list(rows.values())
+
+
+# --- Maintenance ---
+def _versioned(connection, rows, student_ids=None):
+    """``rows`` plus zeroed rows for summaries with no facts left, each a version ahead."""
+    stmt = select(_SUMMARY.c.student_id, _SUMMARY.c.data_version)
+    if student_ids is not None:
+        stmt = stmt.where(_SUMMARY.c.student_id.in_(student_ids))
+    versions = dict(connection.execute(stmt).tuples().all())
+    rows = {row['student_id']: row for row in rows}
+    for student_id in set(versions) - set(rows):
+        rows[student_id] = {'student_id': student_id, **dict.fromkeys(_TOTALS, 0)}
+    for student_id, row in rows.items():
+        row['data_version'] = versions.get(student_id, 0) + 1
+    return list(rows.values())
+
+
+def refresh(connection, student_ids):
+    """Recompute the summaries of ``student_ids`` after a write that bypassed the ORM."""
+    keys = [k for k in set(student_ids) if k is not None]
+    if keys:
+        rows = _versioned(connection, _summary_rows(connection, keys), keys)
+        replace_rows(connection, _SUMMARY, 'student_id', rows, keys)
+
+
+def rebuild(connection=None):
+    """Recompute every student summary from the fact tables. The caller commits."""
+    connection = connection or db.session.connection()
+    replace_rows(connection, _SUMMARY, 'student_id', _versioned(connection, _summary_rows(connection)))
+
+
+def ensure_seeded():
+    """Build the summaries once for databases that predate them."""
+    has_summaries = db.session.query(select(_SUMMARY).exists()).scalar()
+    if not has_summaries and db.session.query(select(Student.id).exists()).scalar():
+        rebuild()
+        db.session.commit()
+
+
+def check(connection=None):
+    """Compare the summaries with a fresh aggregate; returns a list of mismatches.
+
+    A missing summary row reads as all zeros, as it does in the portal.
+    """
+    connection = connection or db.session.connection()
+    expected = {row['student_id']: row for row in _summary_rows(connection)}
+    actual = {row['student_id']: dict(row) for row in connection.execute(select(_SUMMARY)).mappings()}
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want, have = expected.get(key, {}), actual.get(key, {})
+        for column in _TOTALS:
+            a, b = float(want.get(column) or 0), float(have.get(column) or 0)
+            if not math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6):
+                mismatches.append({
+                    "table": _SUMMARY.name, "key": key, "column": column,
+                    "expected": a, "actual": b
+                })
+    return mismatches
+
+
+def reconcile(connection=None):
+    """Recompute the summaries that drifted from the fact tables; returns the students fixed.
+
+    The caller commits.
+    """
+    connection = connection or db.session.connection()
+    student_ids = sorted({m['key'] for m in check(connection)})
+    if student_ids:
+        refresh(connection, student_ids)
+    return student_ids
+
+
+# --- Reads ---
+def summary_of(student_id):
+    """The student's summary by primary key; an empty one if nothing was recorded yet."""
+    return db.session.get(StudentSummary, student_id) or StudentSummary(
+        student_id=student_id, **{column: 0 for column in _COLUMNS}
+    )
+
+
+# --- Write-time listeners ---
+_FEE_FIELDS = ('student_id', 'amount_due', 'amount_paid', 'is_paid')
+
+track(Result, 'student_id', 'score')
+track(Fee, *_FEE_FIELDS)
+track(FeePayment, 'student_id', 'amount', 'status')
+
+
+def _apply(connection, student_id, deltas):
+    if student_id is not None:
+        increment(connection, _SUMMARY, {'student_id': student_id}, {**deltas, 'data_version': 1})
+
+
+def bump(connection, student_ids):
+    """Advance the data version of ``student_ids`` after a change the totals do not track."""
+    for student_id in set(student_ids):
+        _apply(connection, student_id, {})
+
+
+def _apply_result(connection, student_id, score, sign):
+    deltas = {'score_sum': sign * score, 'score_count': sign} if score is not None else {}
+    _apply(connection, student_id, deltas)
+
+
+@event.listens_for(Result, 'after_insert')
+def _result_inserted(mapper, connection, target):
+    _apply_result(connection, target.student_id, target.score, 1)
+
+
+@event.listens_for(Result, 'after_update')
+def _result_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'score'):
+        _apply_result(connection, _previous(target, 'student_id'), _previous(target, 'score'), -1)
+        _apply_result(connection, target.student_id, target.score, 1)
+
+
+@event.listens_for(Result, 'after_delete')
+def _result_deleted(mapper, connection, target):
+    _apply_result(connection, _previous(target, 'student_id'), _previous(target, 'score'), -1)
+
+
+def apply_marks(connection, marks):
+    """Patch the summaries with signed attendance marks (see ``stats_snapshot``)."""
+    totals = {}
+    for student_id, _, _, status, sign in marks:
+        if student_id is not None:
+            accumulate(totals, (student_id,), {
+                'attendance_present': sign if status == 'present' else 0,
+                'attendance_total': sign,
+                'data_version': 1
+            })
+    increment_many(connection, _SUMMARY, ('student_id',), totals)
+
+
+@event.listens_for(Attendance, 'after_insert')
+def _attendance_inserted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_update')
+def _attendance_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'status'):
+        apply_marks(connection, [_mark(target, -1), _mark(target, 1)])
+
+
+@event.listens_for(Attendance, 'after_delete')
+def _attendance_deleted(mapper, connection, target):
+    apply_marks(connection, [_mark(target, -1)])
+
+
+def _apply_fee(connection, student_id, amount_due, amount_paid, is_paid, sign):
+    _apply(connection, student_id, {
+        'fees_due': sign * (amount_due or 0.0),
+        'fees_paid': sign * (amount_paid or 0.0),
+        'unpaid_fees': 0 if is_paid else sign
+    })
+
+
+@event.listens_for(Fee, 'after_insert')
+def _fee_inserted(mapper, connection, target):
+    _apply_fee(connection, *(getattr(target, field) for field in _FEE_FIELDS), 1)
+
+
+@event.listens_for(Fee, 'after_update')
+def _fee_updated(mapper, connection, target):
+    if _changed(target, *_FEE_FIELDS):
+        _apply_fee(connection, *(_previous(target, field) for field in _FEE_FIELDS), -1)
+        _apply_fee(connection, *(getattr(target, field) for field in _FEE_FIELDS), 1)
+
+
+@event.listens_for(Fee, 'after_delete')
+def _fee_deleted(mapper, connection, target):
+    _apply_fee(connection, *(_previous(target, field) for field in _FEE_FIELDS), -1)
+
+
+def _apply_payment(connection, student_id, amount, status, sign):
+    if status == 'completed':
+        _apply(connection, student_id, {'payments_completed': sign * (amount or 0.0)})
+
+
+@event.listens_for(FeePayment, 'after_insert')
+def _payment_inserted(mapper, connection, target):
+    _apply_payment(connection, target.student_id, target.amount, target.status, 1)
+
+
+@event.listens_for(FeePayment, 'after_update')
+def _payment_updated(mapper, connection, target):
+    if _changed(target, 'student_id', 'amount', 'status'):
+        _apply_payment(connection, _previous(target, 'student_id'), _previous(target, 'amount'),
+                       _previous(target, 'status'), -1)
+        _apply_payment(connection, target.student_id, target.amount, target.status, 1)
+
+
+@event.listens_for(FeePayment, 'after_delete')
+def _payment_deleted(mapper, connection, target):
+    _apply_payment(connection, _previous(target, 'student_id'), _previous(target, 'amount'),
+                   _previous(target, 'status'), -1)
+
+
+# Facts left behind by a deleted student keep their summary; recompute it
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    refresh(connection, [target.id])
+
+
+__all__ = ["refresh", "rebuild", "ensure_seeded", "check", "reconcile", "summary_of", "bump", "apply_marks"]
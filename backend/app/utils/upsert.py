@@ -0,0 +1,141 @@
+from sqlalchemy import update, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def supports_on_conflict(bind):
+    return bind.dialect.name in _INSERTS
+
+
+def on_conflict_insert(bind, table):
+    """Dialect-specific INSERT that understands ON CONFLICT (SQLite and Postgres)."""
+    return _INSERTS[bind.dialect.name](table)
+
+
+def increment(connection, table, key, deltas):
+    """Add ``deltas`` to the row identified by ``key``, creating it if missing.
+
+    ``key`` and ``deltas`` map column names to values. Uses a single
+    ``INSERT ... ON CONFLICT DO UPDATE`` where the dialect supports it.
+    """
+    deltas = {col: value for col, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    if supports_on_conflict(connection):
+        stmt = on_conflict_insert(connection, table).values(**key, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={col: table.c[col] + stmt.excluded[col] for col in deltas}
+        )
+        connection.execute(stmt)
+        return
+
+    where = [table.c[col] == value for col, value in key.items()]
+    result = connection.execute(
+        update(table).where(*where).values({col: table.c[col] + value for col, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**key, **deltas))
+
+
+def accumulate(totals, key, deltas):
+    """Sum ``deltas`` into ``totals[key]`` ahead of an ``increment_many``."""
+    row = totals.setdefault(key, {})
+    for col, value in deltas.items():
+        row[col] = row.get(col, 0) + value
+
+
+def increment_many(connection, table, key_columns, totals):
+    """``increment`` for many rows; ``totals`` maps key tuples to deltas.
+
+    Rows whose deltas cancel out are skipped. Where the dialect supports
+    ON CONFLICT, all rows are written with one executemany.
+    """
+    totals = {key: deltas for key, deltas in totals.items() if any(deltas.values())}
+    if not totals:
+        return
+
+    if supports_on_conflict(connection):
+        columns = sorted({col for deltas in totals.values() for col in deltas})
+        stmt = on_conflict_insert(connection, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={col: table.c[col] + stmt.excluded[col] for col in columns}
+        )
+        connection.execute(stmt, [
+            {**dict(zip(key_columns, key)), **{col: deltas.get(col, 0) for col in columns}}
+            for key, deltas in totals.items()
+        ])
+        return
+
+    for key, deltas in totals.items():
+        increment(connection, table, dict(zip(key_columns, key)), deltas)
+
+
+def existing_rows(connection, table, key_columns, keys, columns=()):
+    """``{key: row}`` for the ``keys`` present in ``table``, each row holding ``columns``."""
+    key_expr = tuple_(*(table.c[col] for col in key_columns))
+    rows = connection.execute(
+        select(*(table.c[col] for col in key_columns), *(table.c[col] for col in columns))
+        .where(key_expr.in_(keys))
+    ).tuples()
+    return {tuple(row[:len(key_columns)]): row[len(key_columns):] for row in rows}
+
+
+def upsert_rows(connection, table, key_columns, rows, update_columns, existing=None):
+    """Insert ``rows``, overwriting ``update_columns`` where the key already exists.
+
+    ``key_columns`` must be covered by a unique index. Returns
+    ``(inserted, updated)``. Existing keys are read in one SELECT unless the
+    caller already has them as ``existing``, then all rows are written with
+    one ``INSERT ... ON CONFLICT DO UPDATE``.
+    """
+    if not rows:
+        return 0, 0
+    keys = [tuple(row[col] for col in key_columns) for row in rows]
+    if existing is None:
+        existing = existing_rows(connection, table, key_columns, keys)
+    existing = set(existing)
+
+    if supports_on_conflict(connection):
+        stmt = on_conflict_insert(connection, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={col: stmt.excluded[col] for col in update_columns}
+        )
+        connection.execute(stmt, rows)
+    else:
+        new_rows = [row for row, key in zip(rows, keys) if key not in existing]
+        for row, key in zip(rows, keys):
+            if key in existing:
+                connection.execute(
+                    update(table)
+                    .where(*(table.c[col] == value for col, value in zip(key_columns, key)))
+                    .values({col: row[col] for col in update_columns})
+                )
+        if new_rows:
+            connection.execute(insert(table), new_rows)
+
+    updated = len(set(keys) & existing)
+    return len(set(keys)) - updated, updated
+
+
+def replace_rows(connection, table, key_column, rows, keys=None):
+    """Replace the rows for ``keys`` (or the whole table) with ``rows``."""
+    stmt = table.delete()
+    if keys is not None:
+        keys = [k for k in keys if k is not None]
+        if not keys:
+            return
+        stmt = stmt.where(table.c[key_column].in_(keys))
+    connection.execute(stmt)
+    if rows:
+        connection.execute(insert(table), rows)
+
+
+__all__ = ["supports_on_conflict", "on_conflict_insert", "increment", "accumulate", "increment_many", "existing_rows", "upsert_rows", "replace_rows"]
@@ -0,0 +1,301 @@
+import glob
+import heapq
+import json
+import os
+import re
+import threading
+import atexit
+from datetime import date as date_type
+from flask import current_app
+from sqlalchemy import Date, Integer, String, literal, select, tuple_, union_all
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.util import ClauseAdapter
+from ..models import db, Attendance, Student, Teacher
+from .attendance import ATTENDANCE_KEY, register_rows, write_marks
+from .serialization import loader_plan
+
+DEFAULT_FLUSH_MS = 250
+_EXTENSION = 'attendance_write_behind'
+
+
+def journal_path(app):
+    return app.config.get('ATTENDANCE_JOURNAL') or os.path.join(app.instance_path, 'attendance.journal')
+
+
+def _read_journal(path):
+    """Yield the rows recorded in one journal file, skipping a torn final line."""
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # partial write interrupted by a crash
+            entry_date = date_type.fromisoformat(entry['date'])
+            for student_id, status in entry['marks'].items():
+                yield {
+                    "student_id": int(student_id),
+                    "teacher_id": entry['teacher_id'],
+                    "date": entry_date,
+                    "status": status
+                }
+
+
+def _key(row):
+    return tuple(row[col] for col in ATTENDANCE_KEY)
+
+
+class WriteBehind:
+    """Journal-backed buffer that coalesces attendance registers into batched writes.
+
+    A register is acknowledged once it is appended and fsynced to the
+    journal. A background thread writes everything buffered every
+    ATTENDANCE_FLUSH_MS in one transaction, the latest mark per student,
+    teacher and day winning. The journal is local to the process, so the
+    mode suits single-process deployments such as a single SQLite writer.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.path = journal_path(app)
+        self.interval = app.config.get('ATTENDANCE_FLUSH_MS', DEFAULT_FLUSH_MS) / 1000
+        self.lock = threading.Lock()
+        self.pending = {}    # key -> row, not yet handed to a flush
+        self.in_flight = {}  # key -> row, being written by the current flush
+        self.segments = []   # rotated journal files awaiting a successful flush
+        self.sequence = 0
+        self.stopped = threading.Event()
+        self.journal = None
+        self.thread = None
+
+    # --- Journal ---
+    def _segment_files(self):
+        # Rotated segments are <journal>.<n>; other files beside it are not ours
+        suffix = re.compile(re.escape(self.path) + r'\.(\d+)$')
+        segments = []
+        for path in glob.glob(glob.escape(self.path) + '.*'):
+            match = suffix.match(path)
+            if match:
+                segments.append((int(match.group(1)), path))
+        return [path for _, path in sorted(segments)]
+
+    def replay(self):
+        """Apply journal files left by a previous run, then remove them."""
+        files = self._segment_files()
+        if os.path.exists(self.path):
+            files.append(self.path)
+        if not files:
+            return 0
+        rows = {}
+        for path in files:
+            for row in _read_journal(path):
+                rows[_key(row)] = row
+        write_marks(list(rows.values()))
+        db.session.commit()
+        for path in files:
+            os.remove(path)
+        return len(rows)
+
+    def _open_journal(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.journal = open(self.path, 'ab')
+
+    def _rotate(self):
+        # Called with the lock held: the current journal becomes a numbered segment
+        self.journal.close()
+        self.sequence += 1
+        segment = f"{self.path}.{self.sequence}"
+        os.replace(self.path, segment)
+        self.segments.append(segment)
+        self._open_journal()
+
+    # --- Writers ---
+    def submit(self, teacher_id, date, statuses):
+        """Durably queue one register; returns the number of marks accepted."""
+        rows = register_rows(teacher_id, date, statuses)
+        line = json.dumps({
+            "teacher_id": teacher_id,
+            "date": date.isoformat(),
+            "marks": {str(row["student_id"]): row["status"] for row in rows}
+        }).encode('utf-8') + b'\n'
+        with self.lock:
+            self.journal.write(line)
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            for row in rows:
+                self.pending[_key(row)] = row
+        return len(rows)
+
+    def flush(self):
+        """Write everything buffered in one transaction; returns the counts written."""
+        with self.lock:
+            if not self.pending or self.in_flight:
+                return None
+            batch, self.pending, self.in_flight = self.pending, {}, self.pending
+            self._rotate()
+            segments = list(self.segments)
+
+        try:
+            with self.app.app_context():
+                counts = write_marks(list(batch.values()))
+                db.session.commit()
+        except Exception:
+            with self.app.app_context():
+                db.session.rollback()
+            with self.lock:
+                # Newer submissions win over the batch being retried
+                self.pending = {**batch, **self.pending}
+                self.in_flight = {}
+            raise
+
+        with self.lock:
+            self.in_flight = {}
+            self.segments = [s for s in self.segments if s not in segments]
+        for segment in segments:
+            os.remove(segment)
+        return counts
+
+    def snapshot(self):
+        """Buffered rows not yet committed, keyed by natural key."""
+        with self.lock:
+            return {**self.in_flight, **self.pending}
+
+    # --- Background thread ---
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error("Attendance flush failed, will retry: %s", e)
+
+    def start(self):
+        self._open_journal()
+        self.thread = threading.Thread(target=self._run, name='attendance-flusher', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.thread.join()
+        try:
+            self.flush()
+        except Exception:
+            pass  # left in the journal for replay
+        self.journal.close()
+
+
+def init_app(app):
+    """Replay leftover journals and, when enabled, start the flusher.
+
+    Replay runs even with write-behind switched off so that nothing
+    acknowledged before a restart is lost.
+    """
+    buffer = WriteBehind(app)
+    with app.app_context():
+        buffer.replay()
+    if app.config.get('ATTENDANCE_WRITE_BEHIND'):
+        buffer.start()
+        app.extensions[_EXTENSION] = buffer
+
+
+def get_buffer():
+    return current_app.extensions.get(_EXTENSION)
+
+
+def enabled():
+    return get_buffer() is not None
+
+
+def submit(teacher_id, date, statuses):
+    return get_buffer().submit(teacher_id, date, statuses)
+
+
+# --- Read-your-writes overlay ---
+class Overlay:
+    """Merges buffered marks into the rows of an Attendance list query.
+
+    Rows whose mark is buffered get the buffered status, or are dropped when
+    it no longer satisfies the query's filters. Buffered marks that now match
+    but are not in the query's results are merged in by id; marks with no
+    row yet have no id and are emitted at the end of the last page.
+    """
+
+    def __init__(self, query, buffered):
+        self.buffered = buffered
+        criteria = query.statement.whereclause
+        keys = list(buffered)
+        key_columns = tuple_(*(getattr(Attendance, col) for col in ATTENDANCE_KEY))
+
+        # Which buffered marks satisfy the filters, evaluated in SQL against literal rows
+        pending = union_all(*[select(
+            literal(row["student_id"], Integer).label('student_id'),
+            literal(row["teacher_id"], Integer).label('teacher_id'),
+            literal(row["date"], Date).label('date'),
+            literal(row["status"], String).label('status')
+        ) for row in buffered.values()]).subquery('pending')
+        stmt = select(*(pending.c[col] for col in ATTENDANCE_KEY))
+        if criteria is not None:
+            stmt = stmt.where(ClauseAdapter(pending, adapt_on_names=True).traverse(criteria))
+        self.matching = set(db.session.execute(stmt).tuples())
+
+        # Which of them already have a row, and whether that row matches as stored
+        stored = db.session.query(Attendance.id, *(getattr(Attendance, col) for col in ATTENDANCE_KEY)) \
+            .filter(key_columns.in_(keys)).all()
+        self.ids = {tuple(row[1:]): row[0] for row in stored}
+        listed = db.session.query(Attendance.id).filter(key_columns.in_(keys))
+        if criteria is not None:
+            listed = listed.filter(criteria)
+        already_listed = {row[0] for row in listed}
+        self.extra_keys = [k for k in self.matching if self.ids.get(k) not in already_listed]
+
+    def _patch(self, obj):
+        key = (obj.student_id, obj.teacher_id, obj.date)
+        if key not in self.buffered:
+            return obj
+        if key not in self.matching:
+            return None
+        set_committed_value(obj, 'status', self.buffered[key]["status"])
+        return obj
+
+    def _extras(self, lower, upper):
+        stored_ids = [self.ids[k] for k in self.extra_keys if k in self.ids
+                      and (lower is None or self.ids[k] > lower)
+                      and (upper is None or self.ids[k] <= upper)]
+        stored = Attendance.query.options(*loader_plan(Attendance)) \
+            .filter(Attendance.id.in_(stored_ids)).order_by(Attendance.id).all() if stored_ids else []
+        fresh = []
+        if upper is None:
+            fresh_keys = [k for k in self.extra_keys if k not in self.ids]
+            students = {s.id: s for s in Student.query.options(*loader_plan(Student))
+                        .filter(Student.id.in_({k[0] for k in fresh_keys}))} if fresh_keys else {}
+            teachers = {t.id: t for t in Teacher.query.options(*loader_plan(Teacher))
+                        .filter(Teacher.id.in_({k[1] for k in fresh_keys}))} if fresh_keys else {}
+            for key in sorted(fresh_keys):
+                row = self.buffered[key]
+                obj = Attendance(**row)
+                set_committed_value(obj, 'student', students.get(row["student_id"]))
+                set_committed_value(obj, 'teacher', teachers.get(row["teacher_id"]))
+                fresh.append(obj)
+        return stored, fresh
+
+    def apply(self, rows, lower=None, upper=None):
+        """Overlay an id-ordered stream of rows covering ids in (lower, upper]."""
+        stored, fresh = self._extras(lower, upper)
+        for obj in heapq.merge(rows, stored, key=lambda o: o.id):
+            obj = self._patch(obj)
+            if obj is not None:
+                yield obj
+        yield from fresh
+
+
+def overlay(query):
+    """Overlay for an Attendance list query, or None when nothing is buffered."""
+    buffer = get_buffer()
+    if buffer is None:
+        return None
+    buffered = buffer.snapshot()
+    return Overlay(query, buffered) if buffered else None
+
+
+__all__ = ["WriteBehind", "Overlay", "init_app", "enabled", "submit", "overlay", "journal_path"]
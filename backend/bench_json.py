@@ -0,0 +1,62 @@
+"""
+Serialization throughput on synthetic Result rows.
+
+Compares the stdlib and orjson JSON providers, whole-body vs streamed, on
+Result.to_dict() output (exam, subject and student embedded, dates native).
+
+    python bench_json.py [rows]
+"""
+import sys
+import time
+from datetime import date, datetime, timedelta
+from flask import Flask
+from app.models import Result, Exam, Subject, Student
+from app.utils import json_provider
+from app.utils.json_provider import iter_json_array
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+
+def build_rows(count):
+    subjects = [Subject(id=i, name=f"Subject {i}", department_id=i % 5, created_at=datetime(2024, 1, 1))
+                for i in range(20)]
+    exams = [Exam(id=i, name=f"Exam {i}", date=datetime(2024, 3, 1) + timedelta(days=i),
+                  subject_id=i % 20, subject=subjects[i % 20]) for i in range(200)]
+    students = [Student(id=i, user_id=i, full_name=f"Student {i}", gender="F",
+                        date_of_birth=date(2010, 1, 1) + timedelta(days=i % 365), classroom_id=i % 12)
+                for i in range(2_000)]
+    results = [Result(id=i, exam_id=i % 200, student_id=i % 2_000, score=float(i % 100))
+               for i in range(count)]
+    for result in results:
+        # Set without backref bookkeeping so building rows does not dominate
+        result.__dict__['exam'] = exams[result.exam_id]
+        result.__dict__['student'] = students[result.student_id]
+    return [result.to_dict() for result in results]
+
+
+def timed(label, fn, count):
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} rows/s  {size / 1e6:7.1f} MB")
+
+
+def run(name, rows):
+    app = Flask(__name__)
+    app.config['JSON_PROVIDER'] = name
+    json_provider.init_app(app)
+    print(f"{name} ({type(app.json).__name__})")
+    with app.app_context():
+        timed("dumps (whole body)", lambda: len(app.json.dumpb(rows)), len(rows))
+        timed("streamed array", lambda: sum(len(chunk) for chunk in iter_json_array(rows)), len(rows))
+
+
+if __name__ == '__main__':
+    started = time.perf_counter()
+    rows = build_rows(ROWS)
+    print(f"Built {ROWS:,} Result dicts in {time.perf_counter() - started:.2f}s\n")
+    for name in json_provider.PROVIDERS:
+        if name == 'orjson' and json_provider.orjson is None:
+            print("orjson not installed, skipping")
+            continue
+        run(name, rows)
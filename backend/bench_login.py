@@ -0,0 +1,122 @@
+"""
+Responsiveness of cheap endpoints during a login flood.
+
+Starts the app on a threaded local server backed by a throwaway SQLite
+database and hammers POST /auth/login from many client threads while a
+probe thread times GET /subjects. Runs once with password checks inline
+on the request threads (LOGIN_HASH_WORKERS=0) and once on the bounded
+verification pool.
+
+    python bench_login.py [flood_threads] [seconds]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+FLOOD_THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+SECONDS = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+USERS = 50
+
+workdir = tempfile.mkdtemp(prefix='bench_login_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+os.environ['ATTENDANCE_JOURNAL'] = os.path.join(workdir, 'attendance.journal')
+
+from werkzeug.serving import WSGIRequestHandler, make_server  # noqa: E402
+from app import create_app  # noqa: E402
+from app.models import db, User  # noqa: E402
+from app.utils import passwords  # noqa: E402
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def seed(app):
+    with app.app_context():
+        hashes = passwords.hash_many(f"pw{i}" for i in range(USERS))
+        db.session.add_all([
+            User(username=f"bench{i}", email=f"bench{i}@example.com", password=password_hash, role='admin')
+            for i, password_hash in enumerate(hashes)
+        ])
+        db.session.commit()
+
+
+def request(url, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json', **(headers or {})})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            status = response.status
+            payload = response.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    return status, payload, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+def run(app, base, label, workers):
+    app.config['LOGIN_HASH_WORKERS'] = workers
+    app.extensions.pop('password_pool', None)
+    stop = threading.Event()
+    statuses, login_times, probe_times = {}, [], []
+    lock = threading.Lock()
+    _, body, _ = request(f"{base}/auth/login", {"email": "bench0@example.com", "password": "pw0"})
+    token = json.loads(body)['access_token']
+
+    def flood(n):
+        while not stop.is_set():
+            status, _, elapsed = request(f"{base}/auth/login",
+                                         {"email": f"bench{n % USERS}@example.com", "password": f"pw{n % USERS}"})
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    login_times.append(elapsed)
+
+    def probe():
+        while not stop.is_set():
+            _, _, elapsed = request(f"{base}/subjects", headers={'Authorization': f"Bearer {token}"})
+            probe_times.append(elapsed)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=flood, args=(n,)) for n in range(FLOOD_THREADS)] + \
+        [threading.Thread(target=probe)]
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"{label}")
+    print(f"  logins ok         {statuses.get(200, 0) / SECONDS:8.1f} /s   p50 {percentile(login_times, 50):8.0f} ms"
+          f"   p95 {percentile(login_times, 95):8.0f} ms")
+    print(f"  logins refused    {statuses.get(503, 0) / SECONDS:8.1f} /s   (503, retry later)")
+    print(f"  GET /subjects     {len(probe_times):8d} req  p50 {percentile(probe_times, 50):8.0f} ms"
+          f"   p95 {percentile(probe_times, 95):8.0f} ms")
+
+
+if __name__ == '__main__':
+    app = create_app()
+    seed(app)
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    cpus = os.cpu_count() or 1
+    print(f"{FLOOD_THREADS} login threads for {SECONDS:.0f}s each, {cpus} CPUs, "
+          f"{app.config['PASSWORD_HASH_METHOD']} hashes\n")
+    run(app, base, "inline (LOGIN_HASH_WORKERS=0)", 0)
+    run(app, base, f"verification pool ({cpus} workers, queue {app.config['LOGIN_QUEUE_LIMIT']})", cpus)
+    server.shutdown()
@@ -0,0 +1,124 @@
+"""
+Consistency of the write-maintained aggregates under ORM edits.
+
+Seeds a throwaway SQLite database, then updates and deletes facts through
+instances that were expired by a commit (the usual state of anything loaded
+before the last commit), writes bulk registers, and asserts that every
+aggregate still matches a fresh recomputation.
+
+    python check_aggregates.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+workdir = tempfile.mkdtemp(prefix='check_aggregates_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'check.db')}"
+os.environ['ATTENDANCE_JOURNAL'] = os.path.join(workdir, 'attendance.journal')
+
+from app import create_app  # noqa: E402
+from app.models import (  # noqa: E402
+    db, User, Student, Teacher, Department, Classroom, Subject, Exam, Result, Attendance, Fee, FeePayment
+)
+from app.utils import attendance, attendance_rollups, stats_snapshot, student_summary  # noqa: E402
+
+CHECKS = {
+    'stats snapshot': stats_snapshot.check,
+    'attendance rollups': attendance_rollups.check,
+    'student summary': student_summary.check,
+}
+
+
+def seed():
+    department = Department(name='Sciences')
+    classroom = Classroom(name='1A')
+    teacher_user = User(username='teacher', email='teacher@example.com', password='x', role='teacher')
+    db.session.add_all([department, classroom, teacher_user])
+    db.session.flush()
+    teacher = Teacher(user_id=teacher_user.id, full_name='Teacher', department_id=department.id)
+    subject = Subject(name='Physics', classroom_id=classroom.id, department_id=department.id)
+    db.session.add_all([teacher, subject])
+    db.session.flush()
+    exam = Exam(name='Midterm', subject_id=subject.id)
+    db.session.add(exam)
+    for i in range(3):
+        user = User(username=f'student{i}', email=f'student{i}@example.com', password='x', role='student')
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id, full_name=f'Student {i}', classroom_id=classroom.id)
+        db.session.add(student)
+        db.session.flush()
+        db.session.add_all([
+            Result(student_id=student.id, exam_id=exam.id, score=50 + i),
+            Attendance(student_id=student.id, teacher_id=teacher.id, date=date(2024, 2, 1), status='present'),
+            Fee(student_id=student.id, term='Term 1', amount_due=1000, amount_paid=200, is_paid=False),
+            FeePayment(student_id=student.id, amount=100, payment_method='cash',
+                       reference_number=f'ref{i}', status='completed'),
+        ])
+    db.session.commit()
+
+
+def edit(model, **values):
+    """Load a row, let a commit expire it, then update it."""
+    target = model.query.order_by(model.id).first()
+    db.session.commit()
+    for attr, value in values.items():
+        setattr(target, attr, value)
+    db.session.commit()
+
+
+def remove(model):
+    """Load a row, let a commit expire it, then delete it."""
+    target = model.query.order_by(model.id.desc()).first()
+    db.session.commit()
+    db.session.delete(target)
+    db.session.commit()
+
+
+def register(statuses):
+    """Write a bulk register for 2024-02-02, one of ``statuses`` per student in turn."""
+    teacher = Teacher.query.first()
+    students = Student.query.order_by(Student.id).all()
+    attendance.record_register(teacher.id, date(2024, 2, 2), {
+        student.id: status for student, status in zip(students, statuses)
+    })
+    db.session.commit()
+
+
+def assert_consistent(step):
+    failed = False
+    for name, check in CHECKS.items():
+        mismatches = check()
+        db.session.rollback()
+        for m in mismatches:
+            failed = True
+            print(f"{step}: {name} {m['table']}[{m['key']}].{m['column']}: "
+                  f"expected {m['expected']}, found {m['actual']}")
+    print(f"{step}: {'MISMATCH' if failed else 'ok'}")
+    return not failed
+
+
+if __name__ == '__main__':
+    app = create_app()
+    ok = True
+    with app.app_context():
+        seed()
+        ok &= assert_consistent('seed')
+        for step, action in (
+            ('result score', lambda: edit(Result, score=99)),
+            ('attendance status', lambda: edit(Attendance, status='absent')),
+            ('attendance date', lambda: edit(Attendance, date=date(2024, 3, 1))),
+            ('fee amounts', lambda: edit(Fee, amount_paid=500, is_paid=True)),
+            ('payment status', lambda: edit(FeePayment, status='refunded')),
+            ('register', lambda: register(['present', 'absent', 'late'])),
+            ('register rewritten', lambda: register(['late', 'absent', 'present'])),
+            ('attendance moved', lambda: edit(Attendance, student_id=Student.query.order_by(Student.id.desc()).first().id)),
+            ('result delete', lambda: remove(Result)),
+            ('attendance delete', lambda: remove(Attendance)),
+            ('fee delete', lambda: remove(Fee)),
+            ('payment delete', lambda: remove(FeePayment)),
+        ):
+            action()
+            ok &= assert_consistent(step)
+    sys.exit(0 if ok else 1)
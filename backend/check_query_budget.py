@@ -0,0 +1,72 @@
+"""
+Statement budget of /admin/analytics.
+
+Seeds a throwaway SQLite database and runs the analytics view, past its
+authorization decorators, under ``count_queries(ANALYTICS_QUERY_BUDGET)``.
+Exits non-zero and lists the statements if the view issues more.
+
+    python check_query_budget.py
+"""
+import inspect
+import os
+import sys
+import tempfile
+from datetime import date
+
+workdir = tempfile.mkdtemp(prefix='check_query_budget_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'check.db')}"
+os.environ['ATTENDANCE_JOURNAL'] = os.path.join(workdir, 'attendance.journal')
+
+from app import create_app  # noqa: E402
+from app.models import (  # noqa: E402
+    db, User, Student, Teacher, Department, Classroom, Subject, Exam, Result, Attendance
+)
+from app.utils.analytics import ANALYTICS_QUERY_BUDGET  # noqa: E402
+from app.utils.query_budget import QueryBudgetExceeded, count_queries  # noqa: E402
+
+
+def seed():
+    classroom = Classroom(name='1A')
+    departments = [Department(name='Sciences'), Department(name='Arts')]
+    teacher_user = User(username='teacher', email='teacher@example.com', password='x', role='teacher')
+    db.session.add_all([classroom, teacher_user, *departments])
+    db.session.flush()
+    teacher = Teacher(user_id=teacher_user.id, full_name='Teacher', department_id=departments[0].id)
+    db.session.add(teacher)
+    db.session.flush()
+    exams = []
+    for department in departments:
+        subject = Subject(name=f'{department.name} 1', teacher_id=teacher.id,
+                          classroom_id=classroom.id, department_id=department.id)
+        db.session.add(subject)
+        db.session.flush()
+        exams.append(Exam(name='Midterm', subject_id=subject.id))
+    db.session.add_all(exams)
+    for i in range(10):
+        user = User(username=f'student{i}', email=f'student{i}@example.com', password='x', role='student')
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id, full_name=f'Student {i}', classroom_id=classroom.id)
+        db.session.add(student)
+        db.session.flush()
+        db.session.add_all([Result(student_id=student.id, exam_id=exam.id, score=40 + 6 * i) for exam in exams])
+        db.session.add(Attendance(student_id=student.id, teacher_id=teacher.id, date=date(2024, 2, 1),
+                                  status='present' if i % 3 else 'absent'))
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        seed()
+        db.session.expire_all()
+        # Authorization is not part of the budget; call the view it guards
+        view = inspect.unwrap(app.view_functions['admin_bp.get_analytics'])
+        with app.test_request_context('/admin/analytics'):
+            try:
+                with count_queries(ANALYTICS_QUERY_BUDGET) as counter:
+                    view()
+            except QueryBudgetExceeded as e:
+                print(f"/admin/analytics: {e}")
+                sys.exit(1)
+    print(f"/admin/analytics: {counter.count} of {ANALYTICS_QUERY_BUDGET} statements")
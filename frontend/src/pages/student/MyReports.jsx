@@ -19,7 +19,7 @@ const MyReports = () => {
         studentAPI.getMyResults()
       ])
       setReports(reportsRes.data)
-      setFees(feesRes.data)
+      setFees(feesRes.data.fees || [])
       setResults(resultsRes.data)
     } catch (error) {
       console.error('Failed to fetch reports:', error)